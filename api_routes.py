@@ -0,0 +1,426 @@
+"""
+API Blueprint routes page:
+Implementing the JSON API /api/v1
+list, get, add, update and delete users and movies
+batch movie changes
+routes
+"""
+from flask import Blueprint, abort, current_app, jsonify, request, url_for
+from werkzeug.exceptions import Conflict, HTTPException, default_exceptions
+
+from movieflix.data_backend import CONFLICT_MESSAGE, user_generation, users_data_manager, \
+    users_generation
+from movieflix.data_manager.data_manager_interface import StaleDataError
+from movieflix.http_cache import conditional
+from movieflix.movies_routes import get_movie_query_args
+from movieflix.paging import get_page_args, get_page_urls
+from movieflix.users_routes import validate_user_input
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MOVIE_FIELDS = ('name', 'director', 'year', 'rating', 'poster', 'website')
+
+
+@api_bp.record_once
+def init_api(state):
+    """
+    Set the default API config
+    when the blueprint is registered
+    :param state: BlueprintSetupState
+    """
+    state.app.config.setdefault('API_MAX_BATCH', 1000)
+
+
+def api_error(error: HTTPException):
+    """
+    Handle the errors of the API routes
+    returns:
+        json {'error', 'messages'}, error status
+    """
+    messages = error.description if isinstance(error.description, list) \
+        else [error.description]
+    return jsonify(error=error.name, messages=messages), error.code
+
+
+def is_api_request() -> bool:
+    """
+    Check if the current request is to the API,
+    also when no API route matched its url or method
+    :return:
+        True or False (bool)
+    """
+    return request.blueprint == api_bp.name \
+        or request.path == api_bp.url_prefix \
+        or request.path.startswith(f'{api_bp.url_prefix}/')
+
+
+def api_conflict(_error: StaleDataError):
+    """
+    Handle a change that kept colliding
+    with concurrent changes of the same data
+    returns:
+        json {'error', 'messages'}, 409
+    """
+    return api_error(Conflict([CONFLICT_MESSAGE]))
+
+
+# by status code, app handlers of a code take precedence over blueprint handlers of a class,
+# urls or methods no API route matches are handled by the app, see is_api_request
+for error_code in default_exceptions:
+    api_bp.register_error_handler(error_code, api_error)
+api_bp.register_error_handler(StaleDataError, api_conflict)
+
+
+def get_fields() -> set | None:
+    """
+    Get the sparse fieldset of the request:
+    ?fields=name,year
+    :return:
+        field names (set) |
+        None for all fields
+    """
+    fields = request.args.get('fields', '').strip()
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+def project(item, fields: set | None, id_key: str) -> dict:
+    """
+    Return the fields of an item,
+    its id is always included
+    :param item: dict | record
+    :param fields: field names | None for all fields
+    :param id_key: str
+    :return:
+        item (dict)
+    """
+    if fields is None:
+        return dict(item)
+    return {key: value for key, value in item.items() if key in fields or key == id_key}
+
+
+def page_json(page: dict, items: list) -> dict:
+    """
+    Return a page as the API writes it
+    :param page: dict, see pagination.make_page
+    :param items: the projected items of the page
+    :return:
+        {'items', 'total', 'offset', 'limit', 'next_after', 'links'} (dict)
+    """
+    urls = get_page_urls(page)
+    return {'items': items,
+            'total': page['total'],
+            'offset': page['offset'],
+            'limit': page['limit'],
+            'next_after': page['next_after'],
+            'links': {'prev': urls['prev_url'], 'next': urls['next_url']}}
+
+
+def get_json_body() -> dict:
+    """
+    Get the JSON object body of the request
+    :return:
+        body (dict) |
+        bad request error message
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, ['Request body must be a JSON object'])
+    return body
+
+
+def get_movie_errors(movie: dict, partial: bool = False) -> list:
+    """
+    Validates a movie of a request body and
+    return specific error messages
+    :param movie: dict
+    :param partial: only the given fields are checked,
+        otherwise name is required
+    :return:
+        error messages (list)
+    """
+    error_messages = [f'Unknown movie field {key}' for key in movie
+                      if key not in MOVIE_FIELDS and key != 'movie_id']
+    if 'name' in movie or not partial:
+        name = movie.get('name')
+        if not isinstance(name, str) or len(name) == 0:
+            error_messages.append('Movie name cannot be empty')
+        elif not name[0].isalpha():
+            error_messages.append('Movie name must start with letter')
+    for key in ('director', 'poster', 'website'):
+        if key in movie and not isinstance(movie[key], str):
+            error_messages.append(f'Movie {key} must be a string')
+    if isinstance(movie.get('director'), str) and movie['director'] \
+            and not movie['director'][0].isalpha():
+        error_messages.append('Director name must start with letter')
+    if 'year' in movie:
+        year = movie['year']
+        if not isinstance(year, int) or isinstance(year, bool) \
+                or not (year == 0 or 1000 <= year <= 9999):
+            error_messages.append('Year must be a 4 digit number, or 0 if unknown')
+    if 'rating' in movie:
+        rating = movie['rating']
+        if not isinstance(rating, (int, float)) or isinstance(rating, bool) \
+                or not (rating == 0 or 1.0 <= rating <= 10.0):
+            error_messages.append('Rating must be between 1.0 - 10.0, or 0 if unknown')
+    return error_messages
+
+
+def get_new_movie(movie: dict) -> dict:
+    """
+    Return a movie to add,
+    with the fields of a movie without details as defaults
+    :param movie: dict
+    :return:
+        new movie (dict) |
+        bad request error message
+    """
+    error_messages = get_movie_errors(movie)
+    if 'movie_id' in movie:
+        error_messages.append('New movies cannot have a movie_id')
+    if error_messages:
+        abort(400, error_messages)
+    new_movie = {'name': movie['name'], 'director': '', 'year': 0, 'rating': 0.0,
+                 'poster': '', 'website': ''}
+    new_movie.update(movie)
+    return new_movie
+
+
+def get_movie_update(movie: dict, movie_id: int | None = None) -> dict:
+    """
+    Return the fields of a movie to update
+    :param movie: dict
+    :param movie_id: int | None if movie has its movie_id
+    :return:
+        updated fields with movie_id (dict) |
+        bad request error message
+    """
+    error_messages = get_movie_errors(movie, partial=True)
+    if movie_id is None and not isinstance(movie.get('movie_id'), int):
+        error_messages.append('Updated movies must have a movie_id')
+    if error_messages:
+        abort(400, error_messages)
+    return {**movie, 'movie_id': movie_id if movie_id is not None else movie['movie_id']}
+
+
+@api_bp.route('/users', methods=['GET'])
+@conditional(users_generation)
+def list_users():
+    """
+    Get a page of users, without their movies,
+    ?limit=&offset= or ?limit=&after=<user_id>, ?fields=
+    :return:
+        json page of users
+    """
+    page = users_data_manager.get_users_page(**get_page_args())
+    if page is None:
+        abort(404)
+    fields = get_fields()
+    users = [project({key: value for key, value in user.items() if key != 'movies'},
+                     fields, 'user_id')
+             for user in page['items']]
+    return jsonify(page_json(page, users))
+
+
+@api_bp.route('/users', methods=['POST'])
+def add_user():
+    """
+    Add a user: {"name": "..."}
+    :return:
+        json user, 201 |
+        bad request error message
+    """
+    body = get_json_body()
+    new_user = {'name': body.get('name') if isinstance(body.get('name'), str) else ''}
+    error_messages = validate_user_input(new_user)
+    if error_messages:
+        abort(400, error_messages)
+    new_user['movies'] = []
+    if users_data_manager.add_user(new_user) is None:
+        abort(400, ['Invalid user data'])
+    response = jsonify(new_user)
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_user', user_id=new_user['user_id'])
+    return response
+
+
+@api_bp.route('/users/<int:user_id>', methods=['GET'])
+@conditional(user_generation)
+def get_user(user_id: int):
+    """
+    Get a user with its movies, ?fields=
+    :param user_id: int
+    :return:
+        json user |
+        user not found error message
+    """
+    user = users_data_manager.get_user(user_id)
+    if user is None:
+        abort(404)
+    return jsonify(project(user, get_fields(), 'user_id'))
+
+
+@api_bp.route('/users/<int:user_id>', methods=['PATCH'])
+def update_user(user_id: int):
+    """
+    Rename a user: {"name": "..."}
+    :param user_id: int
+    :return:
+        json user without movies |
+        bad request | user not found error message
+    """
+    body = get_json_body()
+    updated_user = {'user_id': user_id,
+                    'name': body.get('name') if isinstance(body.get('name'), str) else ''}
+    error_messages = validate_user_input(updated_user)
+    if error_messages:
+        abort(400, error_messages)
+    if users_data_manager.update_user(updated_user) is None:
+        abort(404)
+    return jsonify(updated_user)
+
+
+@api_bp.route('/users/<int:user_id>', methods=['DELETE'])
+def delete_user(user_id: int):
+    """
+    Delete a user with its movies
+    :param user_id: int
+    :return:
+        empty response, 204 |
+        user not found error message
+    """
+    if users_data_manager.delete_user(user_id) is None:
+        abort(404)
+    return '', 204
+
+
+@api_bp.route('/users/<int:user_id>/movies', methods=['GET'])
+@conditional(user_generation)
+def list_user_movies(user_id: int):
+    """
+    Get a page of a user's movies,
+    ?limit=&offset= or ?limit=&after=<movie_id>, ?fields=,
+    sorted and filtered like the movies page
+    :param user_id: int
+    :return:
+        json page of movies |
+        user not found error message
+    """
+    page = users_data_manager.get_user_movies_page(user_id, **get_page_args(),
+                                                   query=get_movie_query_args())
+    if page is None:
+        abort(404)
+    fields = get_fields()
+    return jsonify(page_json(page, [project(movie, fields, 'movie_id')
+                                    for movie in page['items']]))
+
+
+@api_bp.route('/users/<int:user_id>/movies', methods=['POST'])
+def add_user_movie(user_id: int):
+    """
+    Add a movie to a user: {"name": "...", "year": ..., ...}
+    :param user_id: int
+    :return:
+        json movie, 201 |
+        bad request | user not found error message
+    """
+    new_movie = get_new_movie(get_json_body())
+    if users_data_manager.add_user_movie(user_id, new_movie) is None:
+        abort(404)
+    response = jsonify(new_movie)
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_user_movie', user_id=user_id,
+                                           movie_id=new_movie['movie_id'])
+    return response
+
+
+@api_bp.route('/users/<int:user_id>/movies/<int:movie_id>', methods=['GET'])
+@conditional(user_generation)
+def get_user_movie(user_id: int, movie_id: int):
+    """
+    Get a user's movie, ?fields=
+    :param user_id: int
+    :param movie_id: int
+    :return:
+        json movie |
+        movie not found error message
+    """
+    movie = users_data_manager.get_user_movie(user_id, movie_id)
+    if movie is None:
+        abort(404)
+    return jsonify(project(movie, get_fields(), 'movie_id'))
+
+
+@api_bp.route('/users/<int:user_id>/movies/<int:movie_id>', methods=['PATCH'])
+def update_user_movie(user_id: int, movie_id: int):
+    """
+    Update fields of a user's movie
+    :param user_id: int
+    :param movie_id: int
+    :return:
+        json movie |
+        bad request | movie not found error message
+    """
+    updated_movie = get_movie_update(get_json_body(), movie_id)
+    if users_data_manager.update_user_movie(user_id, movie_id, updated_movie) is None:
+        abort(404)
+    return jsonify(users_data_manager.get_user_movie(user_id, movie_id))
+
+
+@api_bp.route('/users/<int:user_id>/movies/<int:movie_id>', methods=['DELETE'])
+def delete_user_movie(user_id: int, movie_id: int):
+    """
+    Delete a user's movie
+    :param user_id: int
+    :param movie_id: int
+    :return:
+        empty response, 204 |
+        movie not found error message
+    """
+    if users_data_manager.delete_user_movie(user_id, movie_id) is None:
+        abort(404)
+    return '', 204
+
+
+@api_bp.route('/users/<int:user_id>/movies/batch', methods=['POST'])
+def batch_user_movies(user_id: int):
+    """
+    Add, update and delete many movies of a user in one write:
+    {"create": [movie, ...],
+     "update": [{"movie_id": ..., fields...}, ...],
+     "delete": [movie_id, ...]}
+    nothing is changed if a movie to update or delete is missing
+    :param user_id: int
+    :return:
+        json {'created': [movies], 'updated': [movie ids], 'deleted': [movie ids]} |
+        bad request error message |
+        json {'error', 'messages', 'missing': [movie ids]}, 404
+    """
+    body = get_json_body()
+    unknown = set(body) - {'create', 'update', 'delete'}
+    if unknown:
+        abort(400, [f"Unknown batch operation {', '.join(sorted(unknown))}"])
+    operations = {key: body.get(key, []) for key in ('create', 'update', 'delete')}
+    if not all(isinstance(operation, list) for operation in operations.values()):
+        abort(400, ['Batch create, update and delete must be lists'])
+    if sum(map(len, operations.values())) > current_app.config['API_MAX_BATCH']:
+        abort(400, [f"At most {current_app.config['API_MAX_BATCH']} "
+                    f"movies can be changed at once"])
+    if not all(isinstance(movie, dict) for movie in operations['create'] + operations['update']) \
+            or not all(isinstance(movie_id, int) for movie_id in operations['delete']):
+        abort(400, ['Batch movies must be JSON objects and deleted movies movie ids'])
+
+    new_movies = [get_new_movie(movie) for movie in operations['create']]
+    results = users_data_manager.change_user_movies(
+        user_id, new_movies,
+        [get_movie_update(movie) for movie in operations['update']],
+        operations['delete'])
+    if results is None:
+        abort(404)
+    if results['missing']:
+        response = jsonify(error='Not Found', messages=['No such movies, nothing was changed'],
+                           missing=results['missing'])
+        response.status_code = 404
+        return response
+    return jsonify(created=new_movies, updated=results['updated'], deleted=results['deleted'])
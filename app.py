@@ -3,21 +3,29 @@ API routes for users movies web app using Flask
 Using
 Users Blueprint
 Movies Blueprint
+Posters Blueprint
+API Blueprint
 """
 from flask import Flask, render_template
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 
-from users_routes import users_bp
-from movies_routes import movies_bp
+from movieflix import compression
+from movieflix import data_backend
+from movieflix import http_cache
+from movieflix import instrumentation
+from movieflix import json_provider
+from movieflix import omdb_backend
+from movieflix import paging
+from movieflix import poster_backend
+from movieflix import static_assets
+from movieflix.data_manager.data_manager_interface import StaleDataError
+from movieflix.users_routes import users_bp
+from movieflix.movies_routes import movies_bp
+from movieflix.posters_routes import posters_bp
+from movieflix.api_routes import api_bp, api_error, is_api_request
 
-app = Flask(__name__)
-app.register_blueprint(users_bp)
-app.register_blueprint(movies_bp)
 
-CORS(app)
-
-
-@app.route('/')
 def home():
     """
     Home page
@@ -27,17 +35,18 @@ def home():
     return render_template('index.html')
 
 
-@app.errorhandler(404)
-def page_not_found(_error):
+def page_not_found(error):
     """
     Handle 404, Not Found Error
     returns:
-        Page Not Found page, 404
+        Page Not Found page, 404 |
+        json error of API urls, 404
     """
+    if is_api_request():
+        return api_error(error)
     return render_template('404.html'), 404
 
 
-@app.errorhandler(400)
 def bad_request_error(error):
     """
     Handle 400, Bad Request Error
@@ -47,7 +56,29 @@ def bad_request_error(error):
     return render_template('400.html', errors=error.description), 400
 
 
-@app.errorhandler(500)
+def conflict_error(_error: StaleDataError):
+    """
+    Handle a change that kept colliding
+    with concurrent changes of the same data
+    returns:
+        Conflict page, 409
+    """
+    return render_template('409.html', errors=[data_backend.CONFLICT_MESSAGE]), 409
+
+
+def http_error(error: HTTPException):
+    """
+    Handle the other HTTP errors,
+    e.g. 405, Method Not Allowed
+    returns:
+        json error of API urls |
+        the error's own page
+    """
+    if is_api_request():
+        return api_error(error)
+    return error
+
+
 def internal_server_error(_error):
     """
     Handle 500, Internal Server Error
@@ -57,5 +88,61 @@ def internal_server_error(_error):
     return render_template('500.html'), 500
 
 
+def create_app(config: dict | None = None) -> Flask:
+    """
+    Application factory:
+    build the app with one data backend
+    shared by the users and movies blueprints
+    :param config: app config overrides, e.g.
+        {'DATA_BACKEND': 'sqlite', 'DATA_FILE': 'data/movies.db'}
+        settings can also be given as MOVIEFLIX_* environment variables
+    :return:
+        Flask app
+    """
+    app = Flask(__name__)
+    app.config.from_prefixed_env('MOVIEFLIX')
+    if config:
+        app.config.update(config)
+
+    instrumentation.init_app(app)
+    data_backend.init_app(app)
+    omdb_backend.init_app(app)
+    paging.init_app(app)
+    http_cache.init_app(app)
+    poster_backend.init_app(app)
+    compression.init_app(app)
+    static_assets.init_app(app)
+    app.json = json_provider.RecordJSONProvider(app)
+    app.register_blueprint(users_bp)
+    app.register_blueprint(movies_bp)
+    app.register_blueprint(posters_bp)
+    app.register_blueprint(api_bp)
+
+    app.add_url_rule('/', view_func=home)
+    app.register_error_handler(404, page_not_found)
+    app.register_error_handler(400, bad_request_error)
+    app.register_error_handler(StaleDataError, conflict_error)
+    app.register_error_handler(500, internal_server_error)
+    app.register_error_handler(HTTPException, http_error)
+
+    CORS(app)
+    return app
+
+
+def __getattr__(name: str):
+    """
+    Build the module level app on first access,
+    for `gunicorn app:app` and `flask --app app run`,
+    without building one whenever app.py is imported
+    :param name: module attribute
+    :return:
+        Flask app
+    """
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 if __name__ == "__main__":
-    app.run(port=5002)
+    create_app().run(port=5002)
@@ -0,0 +1,92 @@
+"""
+Compare two benchmark results files,
+e.g. a branch against the commit it started from
+
+Usage: python -m movieflix.benchmarks.compare baseline.json current.json
+           [--metric p50] [--threshold 0.1] [--fail]
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('mean', 'min', 'p50', 'p95', 'p99', 'max')
+
+
+def load_results(path) -> dict:
+    """
+    Return the results of a results file by name
+    :param path: file written by write_results
+    :return:
+        {name: result} (dict)
+    """
+    with open(path, encoding='utf-8') as file:
+        return {result['name']: result for result in json.load(file)['results']}
+
+
+def compare(baseline: dict, current: dict, metric: str = 'p50',
+            threshold: float = 0.1) -> list:
+    """
+    Return the benchmarks of both results with their change,
+    a ratio above 1 + threshold is a regression,
+    below 1 - threshold an improvement
+    :param baseline: {name: result} (dict)
+    :param current: {name: result} (dict)
+    :param metric: timing compared, see METRICS
+    :param threshold: relative change ignored as noise
+    :return:
+        [{'name', 'baseline', 'current', 'ratio', 'change'}] (list),
+        change 'regression' | 'improvement' | ''
+    """
+    rows = []
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name][metric], result[metric]
+        ratio = after / before if before else float('inf')
+        change = ''
+        if ratio > 1 + threshold:
+            change = 'regression'
+        elif ratio < 1 - threshold:
+            change = 'improvement'
+        rows.append({'name': name, 'baseline': before, 'current': after,
+                     'ratio': ratio, 'change': change})
+    return rows
+
+
+def main():
+    """
+    Print the comparison of two results files,
+    exit with 1 on regressions with --fail
+    """
+    parser = argparse.ArgumentParser(description='Compare benchmark results')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--metric', choices=METRICS, default='p50')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change ignored as noise')
+    parser.add_argument('--fail', action='store_true', help='exit with 1 on regressions')
+    args = parser.parse_args()
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    rows = compare(baseline, current, args.metric, args.threshold)
+    if not rows:
+        sys.exit('The results have no benchmark in common')
+
+    width = max(len(row['name']) for row in rows)
+    print(f"{'benchmark':{width}} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for row in rows:
+        print(f"{row['name']:{width}} {row['baseline'] * 1000:12.3f} "
+              f"{row['current'] * 1000:12.3f} {row['ratio']:7.2f} {row['change']}")
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name}: only in {'baseline' if name in baseline else 'current'}")
+
+    regressions = sum(row['change'] == 'regression' for row in rows)
+    print(f'{regressions} regressions, '
+          f"{sum(row['change'] == 'improvement' for row in rows)} improvements "
+          f'of {args.metric} beyond {args.threshold:.0%}')
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
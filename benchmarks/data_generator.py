@@ -0,0 +1,166 @@
+"""
+Synthetic users and movies of any size,
+with the field sizes of movies added through OMDb
+and films shared between users
+
+Usage: python -m movieflix.benchmarks.data_generator data/bench
+           [--backend json|journal|sharded|sqlite] [--no-catalog]
+           [--users 1000] [--movies 100] [--films 20000] [--seed 1]
+"""
+import argparse
+import json
+import os
+import random
+import string
+
+from movieflix.data_backend import DEFAULT_CONFIG, catalog_file_name
+from movieflix.data_manager.json_codecs import get_codec
+from movieflix.data_manager.movie_catalog import CATALOG_FIELDS, imdb_id_of
+from movieflix.data_manager.sharded_data_manager import ShardedDataManager
+from movieflix.data_manager.sqlite_data_manager import SQLiteDataManager
+
+BACKENDS = ('json', 'journal', 'sharded', 'sqlite')
+
+TITLE_WORDS = ('the', 'last', 'night', 'return', 'of', 'king', 'dark', 'star', 'love', 'war',
+               'city', 'lost', 'river', 'man', 'woman', 'secret', 'house', 'blue', 'summer',
+               'dead', 'road', 'dream', 'empire', 'ghost', 'heart', 'island', 'journey',
+               'kingdom', 'legend', 'midnight', 'mountain', 'ocean', 'shadow', 'silent',
+               'storm', 'time', 'wild', 'winter', 'world', 'zero', 'amélie', 'léon')
+FIRST_NAMES = ('James', 'Christopher', 'Steven', 'Sofia', 'Greta', 'Martin', 'Akira', 'Agnès',
+               'Jean-Pierre', 'Kathryn', 'Hayao', 'Denis', 'Bong', 'Céline', 'Quentin')
+LAST_NAMES = ('Cameron', 'Nolan', 'Spielberg', 'Coppola', 'Gerwig', 'Scorsese', 'Kurosawa',
+              'Varda', 'Jeunet', 'Bigelow', 'Miyazaki', 'Villeneuve', 'Joon-ho', 'Sciamma',
+              'Tarantino')
+USER_NAMES = ('Alice', 'Bob', 'Chloé', 'Dmitri', 'Emma', 'Farid', 'Grace', 'Hiro', 'Ingrid',
+              'Jamal', 'Kenji', 'Lena', 'Mateo', 'Nora', 'Olga', 'Priya', 'Zoë')
+
+
+def generate_film(rng: random.Random, imdb_number: int) -> dict:
+    """
+    Return a film as OMDb enrichment stores it
+    :param rng: random.Random
+    :param imdb_number: number of its imdbID
+    :return:
+        {'name', 'director', 'year', 'rating', 'poster', 'website'} (dict)
+    """
+    words = rng.sample(TITLE_WORDS, rng.randint(1, 5))
+    poster_id = ''.join(rng.choices(string.ascii_letters + string.digits, k=40))
+    return {'name': ' '.join(words).title(),
+            'director': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'year': rng.randint(1920, 2024),
+            'rating': round(rng.uniform(1.0, 9.9), 1),
+            'poster': f'https://m.media-amazon.com/images/M/MV5B{poster_id}@._V1_SX300.jpg',
+            'website': f'https://www.imdb.com/title/tt{imdb_number:07d}/'}
+
+
+def generate_users(users: int, movies_per_user: int, films: int | None = None,
+                   seed: int = 1) -> list:
+    """
+    Return users holding movies_per_user movies each,
+    picked among films distinct films
+    :param users: number of users
+    :param movies_per_user: int
+    :param films: distinct films, by default a fifth of all movies
+    :param seed: the same seed generates the same users
+    :return:
+        [{'user_id', 'name', 'movies': [{'movie_id', 'name', ...}]}] (list)
+    """
+    rng = random.Random(seed)
+    films = films or max(movies_per_user, users * movies_per_user // 5)
+    film_pool = [generate_film(rng, imdb_number)
+                 for imdb_number in rng.sample(range(1, 10_000_000), films)]
+    return [{'user_id': user_id,
+             'name': f'{rng.choice(USER_NAMES)} {user_id}',
+             'movies': [{'movie_id': movie_id, **film}
+                        for movie_id, film in enumerate(
+                            rng.sample(film_pool, min(movies_per_user, films)), start=1)]}
+            for user_id in range(1, users + 1)]
+
+
+def to_catalog(users: list) -> tuple:
+    """
+    Return users as stored with a movie catalog:
+    movies as references and one record per film
+    :param users: list, see generate_users
+    :return:
+        (users with movie references (list), catalog records (list))
+    """
+    records = {}
+    stored_users = []
+    for user in users:
+        references = []
+        for movie in user['movies']:
+            imdb_id = imdb_id_of(movie)
+            records.setdefault(imdb_id, {'imdb_id': imdb_id,
+                                         **{key: movie[key] for key in CATALOG_FIELDS}})
+            references.append({'movie_id': movie['movie_id'], 'imdb_id': imdb_id})
+        stored_users.append({**user, 'movies': references})
+    return stored_users, list(records.values())
+
+
+def write_dataset(directory, users: list, backend: str = 'json', catalog: bool = True,
+                  shards: int | None = 64) -> dict:
+    """
+    Store users in directory the way a data backend stores them,
+    without going through one write per user
+    :param directory: directory to create the data in
+    :param users: list, see generate_users
+    :param backend: 'json' | 'journal' | 'sharded' | 'sqlite'
+    :param catalog: store movies as references to a movie catalog
+        (ignored by 'sqlite')
+    :param shards: shard files of 'sharded', None for a file per user
+    :return:
+        the app config of the data (dict), DATA_* settings
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend!r}')
+    os.makedirs(directory, exist_ok=True)
+    file_names = {'sharded': 'users', 'sqlite': 'movies.db'}
+    config = {'DATA_BACKEND': backend,
+              'DATA_FILE': os.path.join(directory, file_names.get(backend, 'movies.json')),
+              'DATA_CATALOG': catalog and backend != 'sqlite',
+              'DATA_CATALOG_FILE': None,
+              'DATA_SHARDS': shards or 0}
+    codec = get_codec('json')
+
+    stored_users = users
+    if config['DATA_CATALOG']:
+        stored_users, records = to_catalog(users)
+        with open(catalog_file_name({**DEFAULT_CONFIG, **config}), 'wb') as file:
+            file.write(codec.dumps(records))
+    if backend == 'sharded':
+        ShardedDataManager(config['DATA_FILE'], shards).import_items(stored_users)
+    elif backend == 'sqlite':
+        data_manager = SQLiteDataManager(config['DATA_FILE'])
+        data_manager.import_items(stored_users)
+        data_manager.close()
+    else:
+        with open(config['DATA_FILE'], 'wb') as file:
+            file.write(codec.dumps(stored_users))
+    return config
+
+
+def main():
+    """
+    Write a generated users file
+    """
+    parser = argparse.ArgumentParser(description='Generate users and movies data')
+    parser.add_argument('directory', help='directory to write the data in')
+    parser.add_argument('--backend', choices=BACKENDS, default='json')
+    parser.add_argument('--no-catalog', dest='catalog', action='store_false',
+                        help='store whole movies instead of catalog references')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--movies', type=int, default=100, help='movies per user')
+    parser.add_argument('--films', type=int, default=None,
+                        help='distinct films (default: a fifth of all movies)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    users = generate_users(args.users, args.movies, args.films, args.seed)
+    config = write_dataset(args.directory, users, args.backend, args.catalog)
+    print(f"Wrote {args.users} users with {args.movies} movies each to {config['DATA_FILE']}")
+    print(f'Run the app on it with: {json.dumps(config)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Microbenchmarks of the data layer:
+every DataManagerInterface and Users method,
+on generated users of every data backend
+
+Usage: python -m movieflix.benchmarks.data_layer [--users 1000] [--movies 100]
+           [--backends json journal sharded sqlite] [--no-catalog]
+           [--iterations 200] [--durability always] [--output results.json]
+"""
+import argparse
+import random
+import shutil
+import tempfile
+
+from movieflix.benchmarks.data_generator import BACKENDS, generate_users, write_dataset
+from movieflix.benchmarks.harness import measure, print_results, write_results
+from movieflix.data_backend import DEFAULT_CONFIG, create_users_data_manager
+
+PAGE_SIZE = 50
+
+
+def new_movie(number: int) -> dict:
+    """
+    Return a movie to add
+    :param number: int
+    :return:
+        dict
+    """
+    return {'name': f'Benchmark Movie {number}',
+            'director': 'James Cameron',
+            'year': 1997,
+            'rating': 7.9,
+            'poster': 'https://m.media-amazon.com/images/M/benchmark@._V1_SX300.jpg',
+            'website': f'https://www.imdb.com/title/tt9{number:06d}/'}
+
+
+def data_manager_benchmarks(users, rng: random.Random, user_count: int) -> dict:
+    """
+    Return the benchmarks of the DataManagerInterface methods
+    :param users: Users, its data manager is benchmarked
+    :param rng: random.Random picking users
+    :param user_count: number of generated users
+    :return:
+        {name: (function(iteration), calls relative to iterations)} (dict)
+    """
+    data_manager = users.data_manager
+    items = data_manager.get_all_data()
+    added_ids = []
+
+    def add_item(iteration):
+        item = {'name': f'Benchmark User {iteration}',
+                'movies': [{'movie_id': 1, **new_movie(iteration)}]}
+        data_manager.add_item(item)
+        added_ids.append(item['user_id'])
+
+    def update_item(_iteration):
+        user = data_manager.get_item_by_id(rng.randint(1, user_count))
+        data_manager.update_item({**user, 'name': user['name']})
+
+    def delete_item(_iteration):
+        if added_ids:
+            data_manager.delete_item(added_ids.pop())
+
+    return {
+        'get_all_data': (lambda _: data_manager.get_all_data(), 0.1),
+        'get_page': (lambda _: data_manager.get_page(
+            PAGE_SIZE, rng.randrange(0, max(user_count - PAGE_SIZE, 1))), 1),
+        'get_item_by_id': (lambda _: data_manager.get_item_by_id(rng.randint(1, user_count)), 1),
+        'get_generation': (lambda _: data_manager.get_generation(), 1),
+        'generate_new_id': (lambda _: data_manager.generate_new_id(items, 'user_id'), 1),
+        'add_item': (add_item, 0.25),
+        'update_item': (update_item, 0.25),
+        'delete_item': (delete_item, 0.25),
+    }
+
+
+def users_benchmarks(users, rng: random.Random, user_count: int, movie_count: int) -> dict:
+    """
+    Return the benchmarks of the Users methods
+    :param users: Users
+    :param rng: random.Random picking users and movies
+    :param user_count: number of generated users
+    :param movie_count: movies per generated user
+    :return:
+        {name: (function(iteration), calls relative to iterations)} (dict)
+    """
+    added_movies = []
+    added_users = []
+
+    def user_id():
+        return rng.randint(1, user_count)
+
+    def movie_id():
+        return rng.randint(1, movie_count)
+
+    def add_user_movie(iteration):
+        movie = new_movie(iteration)
+        target = user_id()
+        users.add_user_movie(target, movie)
+        added_movies.append((target, movie['movie_id']))
+
+    def delete_user_movie(_iteration):
+        if added_movies:
+            users.delete_user_movie(*added_movies.pop())
+
+    def add_user(iteration):
+        user = {'name': f'Benchmark User {iteration}', 'movies': []}
+        users.add_user(user)
+        added_users.append(user['user_id'])
+
+    def delete_user(_iteration):
+        if added_users:
+            users.delete_user(added_users.pop())
+
+    def change_user_movies(iteration):
+        target = user_id()
+        result = users.change_user_movies(
+            target, new_movies=[new_movie(iteration), new_movie(iteration + 1)],
+            updated_movies=[{'movie_id': movie_id(), 'rating': 8.0}])
+        users.change_user_movies(target, deleted_movie_ids=result['created'])
+
+    return {
+        'get_all_users': (lambda _: users.get_all_users(), 0.1),
+        'get_users_page': (lambda _: users.get_users_page(
+            PAGE_SIZE, rng.randrange(0, max(user_count - PAGE_SIZE, 1))), 1),
+        'get_user': (lambda _: users.get_user(user_id()), 1),
+        'get_user_movies': (lambda _: users.get_user_movies(user_id()), 1),
+        'get_user_movies_page': (lambda _: users.get_user_movies_page(
+            user_id(), PAGE_SIZE), 1),
+        'get_user_movies_page_sorted': (lambda _: users.get_user_movies_page(
+            user_id(), PAGE_SIZE, query={'sort': 'rating', 'descending': True}), 1),
+        'get_user_movies_page_search': (lambda _: users.get_user_movies_page(
+            user_id(), PAGE_SIZE, query={'search': 'star', 'year_from': 1990}), 1),
+        'get_user_movie': (lambda _: users.get_user_movie(user_id(), movie_id()), 1),
+        'add_user_movie': (add_user_movie, 0.25),
+        'update_user_movie': (lambda _: users.update_user_movie(
+            user_id(), movie_id(), {'rating': round(rng.uniform(1, 10), 1)}), 0.25),
+        'delete_user_movie': (delete_user_movie, 0.25),
+        'add_user': (add_user, 0.25),
+        'update_user': (lambda _: users.update_user(
+            {'user_id': (target := user_id()), 'name': f'Renamed {target}'}), 0.25),
+        'delete_user': (delete_user, 0.25),
+        'change_user_movies': (change_user_movies, 0.25),
+    }
+
+
+def run_backend(backend: str, generated: list, args) -> list:
+    """
+    Run every benchmark on one backend, on a fresh copy of the data
+    :param backend: data backend name
+    :param generated: generated users
+    :param args: command line arguments
+    :return:
+        list of result dicts
+    """
+    directory = tempfile.mkdtemp(prefix=f'movieflix-bench-{backend}-')
+    try:
+        config = write_dataset(directory, generated, backend, args.catalog, args.shards or None)
+        config = {**DEFAULT_CONFIG, **config, 'DATA_DURABILITY': args.durability}
+        users = create_users_data_manager(config)
+        rng = random.Random(args.seed)
+        benchmarks = {f'DataManager.{name}': benchmark for name, benchmark in
+                      data_manager_benchmarks(users, rng, args.users).items()}
+        benchmarks.update({f'Users.{name}': benchmark for name, benchmark in
+                           users_benchmarks(users, rng, args.users, args.movies).items()})
+
+        results = []
+        for name, (function, share) in benchmarks.items():
+            if args.filter and args.filter not in name:
+                continue
+            iterations = max(3, int(args.iterations * share))
+            results.append({'name': f'{backend}/{name}',
+                            'backend': backend,
+                            'operation': name,
+                            **measure(function, iterations)})
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    """
+    Run the data layer benchmarks and print or write their results
+    """
+    parser = argparse.ArgumentParser(description='Data layer benchmarks')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--movies', type=int, default=100, help='movies per user')
+    parser.add_argument('--films', type=int, default=None, help='distinct films')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--no-catalog', dest='catalog', action='store_false')
+    parser.add_argument('--shards', type=int, default=64)
+    parser.add_argument('--durability', choices=('always', 'batch', 'none'), default='always')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='calls of each read, writes and full reads get fewer')
+    parser.add_argument('--filter', default='', help='only run benchmarks containing this')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    generated = generate_users(args.users, args.movies, args.films, args.seed)
+    results = []
+    for backend in args.backends:
+        results.extend(run_backend(backend, generated, args))
+    print_results(results)
+    if args.output:
+        write_results(args.output, 'data_layer', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
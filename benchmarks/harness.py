@@ -0,0 +1,133 @@
+"""
+Timing and results of the benchmark suites:
+per call timings summarized into percentiles,
+written as JSON with the environment they ran in
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from movieflix.data_manager.json_codecs import available_codecs
+
+
+def percentile(sorted_times: list, fraction: float) -> float:
+    """
+    Return a percentile of sorted timings,
+    the nearest rank one
+    :param sorted_times: list of seconds, sorted
+    :param fraction: 0.5 for the median, 0.95...
+    :return:
+        seconds (float)
+    """
+    rank = max(0, min(len(sorted_times) - 1, round(fraction * len(sorted_times)) - 1))
+    return sorted_times[rank]
+
+
+def summarize(times: list) -> dict:
+    """
+    Return the summary of per call timings
+    :param times: list of seconds
+    :return:
+        {'calls', 'mean', 'min', 'p50', 'p95', 'p99', 'max', 'ops_per_second'} (dict),
+        durations in seconds
+    """
+    sorted_times = sorted(times)
+    total = sum(sorted_times)
+    return {'calls': len(sorted_times),
+            'mean': total / len(sorted_times),
+            'min': sorted_times[0],
+            'p50': percentile(sorted_times, 0.5),
+            'p95': percentile(sorted_times, 0.95),
+            'p99': percentile(sorted_times, 0.99),
+            'max': sorted_times[-1],
+            'ops_per_second': len(sorted_times) / total if total else float('inf')}
+
+
+def measure(function, iterations: int, warmup: int = 1) -> dict:
+    """
+    Time iterations calls of function, after warmup untimed calls
+    :param function: function(iteration)
+    :param iterations: int
+    :param warmup: int
+    :return:
+        summary (dict), see summarize
+    """
+    for iteration in range(warmup):
+        function(iteration)
+    times = []
+    for iteration in range(iterations):
+        start = time.perf_counter()
+        function(iteration)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def git_commit() -> str | None:
+    """
+    Return the commit of the benchmarked code
+    :return:
+        commit hash (str) |
+        None outside of a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict:
+    """
+    Return what the results depend on besides the code
+    :return:
+        dict
+    """
+    return {'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'codecs': available_codecs(),
+            'commit': git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+
+
+def write_results(path, suite: str, parameters: dict, results: list, **sections):
+    """
+    Write a suite's results as JSON:
+    {'suite', 'environment', 'parameters', 'results': [{'name', ..., summary}], **sections}
+    :param path: file name, '-' for stdout
+    :param suite: suite name
+    :param parameters: the suite's command line parameters
+    :param results: list of result dicts, each with a unique 'name'
+    :param sections: other top level entries, e.g. totals
+    """
+    document = {'suite': suite,
+                'environment': environment(),
+                'parameters': parameters,
+                'results': results,
+                **sections}
+    content = json.dumps(document, indent=2)
+    if path == '-':
+        print(content)
+        return
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content + '\n')
+
+
+def print_results(results: list):
+    """
+    Print a table of results
+    :param results: list of result dicts
+    """
+    width = max(len(result['name']) for result in results)
+    print(f"{'benchmark':{width}} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} "
+          f"{'ops/s':>9}")
+    for result in results:
+        print(f"{result['name']:{width}} {result['calls']:6d} {result['p50'] * 1000:9.3f} "
+              f"{result['p95'] * 1000:9.3f} {result['mean'] * 1000:9.3f} "
+              f"{result['ops_per_second']:9.0f}")
@@ -0,0 +1,64 @@
+"""
+Throughput benchmark of the JSON codecs:
+loading and dumping a users file, as dicts and as records,
+with every installed codec, dumping the json.dump layout
+or the compact format (--compact)
+
+Usage: python -m movieflix.benchmarks.json_codecs [--movies 100000] [--repeat 5] [--compact]
+"""
+import argparse
+import time
+
+from movieflix.benchmarks.memory_records import generate_users
+from movieflix.data_manager.json_codecs import available_codecs, get_codec
+from movieflix.data_manager.records import User
+
+
+def best_time(function, repeat: int) -> float:
+    """
+    Return the fastest of repeat runs of function
+    :param function: function()
+    :param repeat: int
+    :return:
+        seconds (float)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """
+    Print the load and dump throughput of every installed codec
+    """
+    parser = argparse.ArgumentParser(description='JSON codecs throughput')
+    parser.add_argument('--movies', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--compact', action='store_true', help='dump the compact format')
+    args = parser.parse_args()
+
+    content = generate_users(args.movies).encode('utf-8')
+    megabytes = len(content) / 2 ** 20
+    print(f'{args.movies} movies, {megabytes:.1f} MiB')
+    print(f"{'codec':8} {'load':>10} {'load records':>14} {'dump':>10} {'dump records':>14}")
+    for name in available_codecs():
+        codec = get_codec(name, compact=args.compact)
+        users = codec.loads(content)
+        records = [User.from_dict(user) for user in users]
+        assert codec.dumps(records) == get_codec('json', compact=args.compact).dumps(users)
+
+        load = best_time(lambda: codec.loads(content), args.repeat)
+        load_records = best_time(
+            lambda: [User.from_dict(user) for user in codec.loads(content)], args.repeat)
+        dump = best_time(lambda: codec.dumps(users), args.repeat)
+        dump_records = best_time(lambda: codec.dumps(records), args.repeat)
+        print(f'{name:8} ' + ' '.join(f'{megabytes / seconds:.0f} MiB/s'.rjust(width)
+                                      for seconds, width in ((load, 10), (load_records, 14),
+                                                             (dump, 10), (dump_records, 14))))
+
+
+if __name__ == '__main__':
+    main()
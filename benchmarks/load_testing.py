@@ -0,0 +1,520 @@
+"""
+Load test: many concurrent clients driving a mix of reads and writes
+against the app served by the Flask dev server or gunicorn,
+on generated data and a fake OMDb, followed by data integrity checks
+
+Usage: python -m movieflix.benchmarks.load_testing [--server dev|gunicorn] [--clients 16]
+           [--duration 10] [--backend json] [--users 100] [--movies 20] [--hot-users 10]
+           [--omdb-latency 0.05] [--mix view_user=4,add_movie=1] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+
+import requests
+
+from movieflix.benchmarks.data_generator import BACKENDS, generate_users, write_dataset
+from movieflix.benchmarks.harness import summarize, write_results
+from movieflix.data_backend import DEFAULT_CONFIG, create_users_data_manager
+from movieflix.omdb.fake_server import FakeOMDbServer
+from movieflix.posters.fake_server import FakeImageServer
+
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKLOAD = {'list_users': 2,
+            'view_user': 4,
+            'view_movies': 2,
+            'view_movie': 2,
+            'add_movie': 1,
+            'update_movie': 1,
+            'delete_movie': 1}
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    Return the operation weights of a --mix argument
+    :param mix: 'view_user=4,add_movie=1', unlisted operations are not run
+    :return:
+        {operation: weight} (dict)
+    """
+    weights = {}
+    for part in mix.split(','):
+        operation, _, weight = part.partition('=')
+        if operation.strip() not in WORKLOAD:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation {operation!r}, choose from {', '.join(WORKLOAD)}")
+        weights[operation.strip()] = float(weight or 1)
+    return weights
+
+
+def free_port() -> int:
+    """
+    Return a TCP port nothing listens on
+    :return:
+        int
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server: str, port: int, workers: int, threads: int) -> list:
+    """
+    Return the command serving the app
+    :param server: 'dev' | 'gunicorn'
+    :param port: int
+    :param workers: gunicorn worker processes
+    :param threads: gunicorn threads per worker
+    :return:
+        list
+    """
+    if server == 'gunicorn':
+        if find_spec('gunicorn') is None:
+            sys.exit('gunicorn is not installed, pip install gunicorn or use --server dev')
+        return [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers), '--threads', str(threads), 'app:create_app()']
+    return [sys.executable, '-m', 'flask', '--app', 'app:create_app()', 'run',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--with-threads', '--no-reload', '--no-debugger']
+
+
+class AppServer:
+    """
+    The app served in a subprocess, configured with
+    MOVIEFLIX_* environment variables,
+    package_parent is the directory the movieflix package is imported from
+    """
+    def __init__(self, config: dict, server: str = 'dev', workers: int = 4, threads: int = 4,
+                 log_file=None, package_parent=None):
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.command = server_command(server, self.port, workers, threads)
+        self.config = config
+        self.log_file = log_file or os.devnull
+        self.package_parent = package_parent
+        self._process = None
+        self._log = None
+
+    def _environment(self) -> dict:
+        """
+        Return the environment of the server:
+        the config, and app.py with the movieflix package importable
+        """
+        environment = dict(os.environ)
+        environment['PYTHONPATH'] = os.pathsep.join(
+            path for path in (APP_DIRECTORY, self.package_parent, environment.get('PYTHONPATH'))
+            if path)
+        for key, value in self.config.items():
+            environment[f'MOVIEFLIX_{key}'] = json.dumps(value)
+        return environment
+
+    def start(self, timeout: float = 30.0):
+        """
+        Start the server and wait until it answers
+        :param timeout: seconds
+        :return:
+            self
+        """
+        self._log = open(self.log_file, 'wb')  # pylint: disable=consider-using-with
+        self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+            self.command, cwd=APP_DIRECTORY, env=self._environment(),
+            stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f'The server exited with {self._process.returncode}, '
+                                   f'see {self.log_file}')
+            try:
+                requests.get(f'{self.url}/', timeout=1)
+                return self
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f'The server did not answer within {timeout}s, see {self.log_file}')
+
+    def stop(self):
+        """
+        Stop the server, killing it if it does not exit
+        """
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        if self._log:
+            self._log.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class Client:
+    """
+    One simulated user: a thread with its own session,
+    picking operations by weight until the deadline.
+    Its writes only touch the movies it added,
+    what it expects of them is checked afterwards
+    """
+    def __init__(self, number: int, url: str, weights: dict, user_count: int,
+                 movie_count: int, hot_users: int, seed: int, timeout: float):
+        self.number = number
+        self.url = url
+        self.weights = weights
+        self.user_count = user_count
+        self.movie_count = movie_count
+        self.hot_users = hot_users
+        self.rng = random.Random(seed * 1000 + number)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.times = {operation: [] for operation in WORKLOAD}
+        self.times['find_movie'] = []
+        self.errors = {operation: 0 for operation in self.times}
+        self.partial_reads = {operation: 0 for operation in self.times}
+        self.added = 0
+        # (user_id, name): {'movie_id', 'rating', 'state': 'present' | 'deleted' | 'unknown'}
+        self.expected = {}
+
+    def request(self, operation: str, method: str, path: str, expected_status: int,
+                **kwargs) -> requests.Response | None:
+        """
+        Make a timed request, counting errors
+        :return:
+            Response with the expected status | None
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url + path, timeout=self.timeout,
+                                            allow_redirects=False, **kwargs)
+        except requests.RequestException:
+            self.times[operation].append(time.perf_counter() - start)
+            self.errors[operation] += 1
+            return None
+        self.times[operation].append(time.perf_counter() - start)
+        if response.status_code != expected_status:
+            self.errors[operation] += 1
+            return None
+        return response
+
+    def read_page(self, operation: str, path: str):
+        """
+        Read an HTML page, a page cut short is a partial read
+        """
+        response = self.request(operation, 'GET', path, 200)
+        if response is not None and not response.text.rstrip().endswith('</html>'):
+            self.partial_reads[operation] += 1
+
+    def hot_user_id(self) -> int:
+        """
+        Return one of the users all clients write to
+        """
+        return self.rng.randint(1, min(self.hot_users, self.user_count))
+
+    def list_users(self):
+        """
+        Read a page of the users list
+        """
+        self.read_page('list_users', f'/users?offset={self.rng.randrange(self.user_count)}')
+
+    def view_user(self):
+        """
+        Read a user's movies page
+        """
+        self.read_page('view_user', f'/users/{self.hot_user_id()}')
+
+    def view_movie(self):
+        """
+        Read the update page of a generated movie
+        """
+        self.read_page('view_movie', f'/users/{self.hot_user_id()}/update_movie/'
+                                     f'{self.rng.randint(1, self.movie_count)}')
+
+    def view_movies(self):
+        """
+        Read a user's movies through the API, every generated movie
+        must be there, none is ever deleted
+        """
+        response = self.request('view_movies', 'GET', f'/api/v1/users/{self.hot_user_id()}'
+                                                      f'/movies?fields=movie_id&limit=500', 200)
+        if response is None:
+            return
+        try:
+            page = response.json()
+            movie_ids = {movie['movie_id'] for movie in page['items']}
+        except (ValueError, KeyError, TypeError):
+            self.partial_reads['view_movies'] += 1
+            return
+        if len(page['items']) != min(page['total'], 500) \
+                or (self.movie_count <= 500 and not movie_ids >= set(range(1, self.movie_count + 1))):
+            self.partial_reads['view_movies'] += 1
+
+    def add_movie(self):
+        """
+        Add a movie named after the client through the form,
+        its details come from the fake OMDb
+        """
+        user_id = self.hot_user_id()
+        self.added += 1
+        name = f'Load {self.number} {self.added}'
+        response = self.request('add_movie', 'POST', f'/users/{user_id}/add_movie', 302,
+                                data={'name': name})
+        # the fake OMDb rates every movie 7.9
+        self.expected[(user_id, name)] = {'movie_id': None, 'rating': 7.9,
+                                          'state': 'unknown' if response is None else 'present'}
+
+    def own_movie(self):
+        """
+        Return one of the movies this client added and did not delete,
+        finding its movie id the first time
+        :return:
+            ((user_id, name), expectation) | None
+        """
+        movies = [(key, expected) for key, expected in self.expected.items()
+                  if expected['state'] == 'present']
+        if not movies:
+            return None
+        (user_id, name), expected = self.rng.choice(movies)
+        if expected['movie_id'] is None:
+            response = self.request('find_movie', 'GET', f'/api/v1/users/{user_id}/movies',
+                                    200, params={'prefix': name, 'fields': 'movie_id,name'})
+            if response is None:
+                return None
+            movie_ids = [movie['movie_id'] for movie in response.json()['items']
+                         if movie['name'] == name]
+            if len(movie_ids) != 1:
+                # lost or added twice, the integrity checks report it
+                expected['state'] = 'unknown'
+                return None
+            expected['movie_id'] = movie_ids[0]
+        return (user_id, name), expected
+
+    def update_movie(self):
+        """
+        Rate one of the client's movies
+        """
+        movie = self.own_movie()
+        if movie is None:
+            self.add_movie()
+            return
+        (user_id, name), expected = movie
+        rating = round(self.rng.uniform(1, 10), 1)
+        response = self.request('update_movie', 'POST',
+                                f"/users/{user_id}/update_movie/{expected['movie_id']}", 302,
+                                data={'name': name, 'director': 'James Cameron',
+                                      'year': '1997', 'rating': str(rating)})
+        if response is None:
+            expected['state'] = 'unknown'
+        else:
+            expected['rating'] = rating
+
+    def delete_movie(self):
+        """
+        Delete one of the client's movies
+        """
+        movie = self.own_movie()
+        if movie is None:
+            self.add_movie()
+            return
+        (user_id, _), expected = movie
+        response = self.request('delete_movie', 'GET',
+                                f"/users/{user_id}/delete_movie/{expected['movie_id']}", 302)
+        expected['state'] = 'unknown' if response is None else 'deleted'
+
+    def run(self, deadline: float):
+        """
+        Run operations until the deadline
+        :param deadline: time.monotonic() to stop at
+        """
+        operations, weights = list(self.weights), list(self.weights.values())
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(operations, weights)[0])()
+        self.session.close()
+
+
+def check_integrity(config: dict, generated: list, clients: list) -> dict:
+    """
+    Check the stored data once the server stopped:
+    acknowledged adds, updates and deletes must all be there,
+    the generated users and movies unchanged
+    :param config: DATA_* settings of the data
+    :param generated: generated users
+    :param clients: Client list
+    :return:
+        {'lost_adds', 'lost_updates', 'lost_deletes', 'duplicates',
+         'changed_users', 'checked_writes'} (dict) of counts
+    """
+    users = create_users_data_manager({**DEFAULT_CONFIG, **config})
+    report = {'lost_adds': 0, 'lost_updates': 0, 'lost_deletes': 0, 'duplicates': 0,
+              'changed_users': 0, 'checked_writes': 0}
+    stored = {}
+    for user in generated:
+        movies = users.get_user_movies(user['user_id'])
+        stored[user['user_id']] = movies or []
+        generated_movies = {(movie['movie_id'], movie['name']) for movie in user['movies']}
+        if movies is None or not generated_movies <= {(movie['movie_id'], movie['name'])
+                                                      for movie in movies}:
+            report['changed_users'] += 1
+        elif len({movie['movie_id'] for movie in movies}) != len(movies):
+            report['duplicates'] += 1
+
+    for client in clients:
+        for (user_id, name), expected in client.expected.items():
+            if expected['state'] == 'unknown':
+                continue
+            report['checked_writes'] += 1
+            found = [movie for movie in stored[user_id] if movie['name'] == name]
+            if expected['state'] == 'deleted':
+                report['lost_deletes'] += bool(found)
+            elif not found:
+                report['lost_adds'] += 1
+            elif len(found) > 1:
+                report['duplicates'] += 1
+            elif found[0]['rating'] != expected['rating']:
+                report['lost_updates'] += 1
+    close = getattr(users.data_manager, 'close', None)
+    if close:
+        close()
+    return report
+
+
+def summarize_clients(clients: list, elapsed: float) -> tuple:
+    """
+    Return the results of every operation and the totals
+    :param clients: Client list
+    :param elapsed: seconds the clients ran
+    :return:
+        (list of result dicts, totals (dict))
+    """
+    results = []
+    for operation in clients[0].times:
+        times = [seconds for client in clients for seconds in client.times[operation]]
+        if not times:
+            continue
+        errors = sum(client.errors[operation] for client in clients)
+        results.append({'name': operation,
+                        **summarize(times),
+                        'errors': errors,
+                        'error_rate': errors / len(times),
+                        'partial_reads': sum(client.partial_reads[operation]
+                                             for client in clients),
+                        'throughput': len(times) / elapsed})
+    total = sum(result['calls'] for result in results)
+    errors = sum(result['errors'] for result in results)
+    return results, {'requests': total,
+                     'seconds': elapsed,
+                     'throughput': total / elapsed,
+                     'errors': errors,
+                     'error_rate': errors / total if total else 0.0}
+
+
+def print_report(results: list, totals: dict, integrity: dict):
+    """
+    Print the results table, the totals and the integrity checks
+    """
+    width = max(len(result['name']) for result in results)
+    print(f"{'operation':{width}} {'calls':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'errors':>7} {'partial':>7}")
+    for result in results:
+        print(f"{result['name']:{width}} {result['calls']:7d} {result['throughput']:8.1f} "
+              f"{result['p50'] * 1000:9.2f} {result['p95'] * 1000:9.2f} "
+              f"{result['p99'] * 1000:9.2f} {result['errors']:7d} {result['partial_reads']:7d}")
+    print(f"{totals['requests']} requests in {totals['seconds']:.1f}s, "
+          f"{totals['throughput']:.1f} req/s, {totals['error_rate']:.2%} errors")
+    print('integrity: ' + ', '.join(f'{key} {value}' for key, value in integrity.items()))
+
+
+def main():
+    """
+    Run a load test and print or write its results,
+    exit with 1 with --fail if data was lost or changed
+    """
+    import movieflix  # pylint: disable=import-outside-toplevel
+    # the server imports app.py and the movieflix package from where this run found it
+    package_parent = os.path.dirname(list(movieflix.__path__)[0])
+
+    parser = argparse.ArgumentParser(description='Load test against a local server')
+    parser.add_argument('--server', choices=('dev', 'gunicorn'), default='dev')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--backend', choices=BACKENDS, default='json')
+    parser.add_argument('--no-catalog', dest='catalog', action='store_false')
+    parser.add_argument('--durability', choices=('always', 'batch', 'none'), default='always')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--movies', type=int, default=20, help='movies per user')
+    parser.add_argument('--hot-users', type=int, default=10,
+                        help='users the writes and movie views go to')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--mix', type=parse_mix, default=WORKLOAD,
+                        help='operation weights, e.g. view_user=4,add_movie=1')
+    parser.add_argument('--omdb-latency', type=float, default=0.05,
+                        help='seconds the fake OMDb waits before answering')
+    parser.add_argument('--timeout', type=float, default=30.0, help='request timeout')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='keep the data and server log')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--fail', action='store_true', help='exit with 1 on integrity errors')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='movieflix-load-')
+    generated = generate_users(args.users, args.movies, seed=args.seed)
+    data_config = write_dataset(directory, generated, args.backend, args.catalog)
+    data_config['DATA_DURABILITY'] = args.durability
+    try:
+        with FakeImageServer() as images, \
+                FakeOMDbServer(latency=args.omdb_latency, poster_base_url=images.url) as omdb:
+            config = {**data_config,
+                      'OMDB_URL': omdb.url,
+                      'OMDB_ASYNC_ENRICHMENT': False,
+                      'OMDB_CACHE_FILE': os.path.join(directory, 'omdb_cache.db'),
+                      'POSTER_CACHE_DIR': os.path.join(directory, 'posters'),
+                      'POSTER_ALLOWED_HOSTS': [urlsplit(images.url).hostname],
+                      'POSTER_PREFETCH': False}
+            log_file = os.path.join(directory, 'server.log')
+            with AppServer(config, args.server, args.workers, args.threads, log_file,
+                           package_parent) as server:
+                clients = [Client(number, server.url, args.mix, args.users, args.movies,
+                                  args.hot_users, args.seed, args.timeout)
+                           for number in range(1, args.clients + 1)]
+                start = time.monotonic()
+                threads = [threading.Thread(target=client.run, args=(start + args.duration,))
+                           for client in clients]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.monotonic() - start
+
+        results, totals = summarize_clients(clients, elapsed)
+        integrity = check_integrity(data_config, generated, clients)
+        print_report(results, totals, integrity)
+        if args.output:
+            write_results(args.output, 'load_test',
+                          {**vars(args), 'mix': args.mix}, results,
+                          totals=totals, integrity=integrity)
+    finally:
+        if args.keep:
+            print(f'Data and server log kept in {directory}')
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    if args.fail and any(value for key, value in integrity.items() if key != 'checked_writes'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Memory benchmark of the users and movies records:
+the memory held by movies loaded as plain dicts
+compared to User and Movie records
+
+Usage: python -m movieflix.benchmarks.memory_records [--movies 100000]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from movieflix.data_manager.records import User
+
+
+def generate_users(movies_count: int, movies_per_user: int = 100) -> str:
+    """
+    Return the JSON of users holding movies_count movies
+    :param movies_count: int
+    :param movies_per_user: int
+    :return:
+        JSON file content (str)
+    """
+    users = []
+    for user_id in range(1, movies_count // movies_per_user + 1):
+        movies = [{"movie_id": movie_id,
+                   "name": f"Movie {user_id}-{movie_id}",
+                   "director": "James Cameron",
+                   "year": 1950 + movie_id % 70,
+                   "rating": round(movie_id % 100 / 10, 1),
+                   "poster": f"https://m.media-amazon.com/images/M/{user_id}{movie_id}.jpg",
+                   "website": f"https://www.imdb.com/title/tt{user_id:04d}{movie_id:03d}"}
+                  for movie_id in range(1, movies_per_user + 1)]
+        users.append({"user_id": user_id, "name": f"User {user_id}", "movies": movies})
+    return json.dumps(users)
+
+
+def measure(load) -> int:
+    """
+    Return the memory held by the result of load
+    :param load: function() -> loaded data
+    :return:
+        bytes (int)
+    """
+    gc.collect()
+    tracemalloc.start()
+    data = load()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def main():
+    """
+    Print the memory per movie of dicts and records
+    """
+    parser = argparse.ArgumentParser(description='Memory of users and movies records')
+    parser.add_argument('--movies', type=int, default=100_000)
+    args = parser.parse_args()
+
+    content = generate_users(args.movies)
+    dicts = measure(lambda: json.loads(content))
+    records = measure(lambda: [User.from_dict(user) for user in json.loads(content)])
+
+    print(f'{args.movies} movies')
+    print(f'dicts:   {dicts / 2 ** 20:8.1f} MiB {dicts / args.movies:6.0f} bytes per movie')
+    print(f'records: {records / 2 ** 20:8.1f} MiB {records / args.movies:6.0f} bytes per movie')
+    print(f'saved:   {(dicts - records) / args.movies:6.0f} bytes per movie '
+          f'({1 - records / dicts:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+End-to-end benchmarks of the main routes:
+pages, forms and JSON API requests made with the Flask
+test client on generated users, OMDb served by a local fake
+
+Usage: python -m movieflix.benchmarks.routes [--users 1000] [--movies 100]
+           [--backends json] [--iterations 100] [--omdb-latency 0] [--output results.json]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from flask import url_for
+
+from movieflix.benchmarks.data_generator import BACKENDS, generate_users, write_dataset
+from movieflix.benchmarks.harness import measure, print_results, write_results
+from movieflix.omdb.fake_server import FakeOMDbServer
+
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_create_app():
+    """
+    Return the app factory, app.py imports its modules
+    the way it does when run from its directory
+    :return:
+        create_app function
+    """
+    if APP_DIRECTORY not in sys.path:
+        sys.path.insert(0, APP_DIRECTORY)
+    from app import create_app  # pylint: disable=import-outside-toplevel
+    return create_app
+
+
+def request(client, method: str, url: str, expected_status: int, **kwargs):
+    """
+    Make a request and read its whole body
+    :param client: Flask test client
+    :param method: 'GET', 'POST'...
+    :param url: str
+    :param expected_status: the benchmark is broken if the status differs
+    :param kwargs: passed to the test client, e.g. data, json, headers
+    :return:
+        Response
+    """
+    response = client.open(url, method=method, **kwargs)
+    try:
+        response.get_data()
+    finally:
+        response.close()
+    if response.status_code != expected_status:
+        raise RuntimeError(f'{method} {url} answered {response.status_code}, '
+                           f'expected {expected_status}')
+    return response
+
+
+def route_benchmarks(client, rng: random.Random, user_count: int, movie_count: int) -> dict:
+    """
+    Return the benchmarks of the main routes
+    :param client: Flask test client
+    :param rng: random.Random picking users and movies
+    :param user_count: number of generated users
+    :param movie_count: movies per generated user
+    :return:
+        {name: (function(iteration), calls relative to iterations)} (dict)
+    """
+    added_movies = {}
+    etags = {}
+    gzip = {'Accept-Encoding': 'gzip'}
+    with client.application.test_request_context():
+        stylesheet = url_for('static', filename='style.css')
+
+    def user_id():
+        return rng.randint(1, user_count)
+
+    def movie_id():
+        return rng.randint(1, movie_count)
+
+    def conditional_get(_iteration):
+        if not etags:
+            # the pages are fetched once, before the timed calls
+            for target in range(1, min(user_count, 20) + 1):
+                etags[target] = request(client, 'GET', f'/users/{target}', 200).headers['ETag']
+        target = rng.choice(list(etags))
+        request(client, 'GET', f'/users/{target}', 304, headers={'If-None-Match': etags[target]})
+
+    def add_movie(iteration):
+        target = user_id()
+        request(client, 'POST', f'/users/{target}/add_movie', 302,
+                data={'name': f'Benchmark Movie {iteration}'})
+        added_movies[target] = added_movies.get(target, 0) + 1
+
+    def delete_movie(_iteration):
+        # new movies get the highest movie id plus 1, the last added is deleted first
+        if added_movies:
+            target = next(iter(added_movies))
+            movie = movie_count + added_movies[target]
+            request(client, 'GET', f'/users/{target}/delete_movie/{movie}', 302)
+            added_movies[target] -= 1
+            if not added_movies[target]:
+                del added_movies[target]
+
+    def update_movie(_iteration):
+        request(client, 'POST', f'/users/{user_id()}/update_movie/{movie_id()}', 302,
+                data={'name': 'Updated Movie', 'director': 'James Cameron',
+                      'year': '1997', 'rating': str(round(rng.uniform(1, 10), 1))})
+
+    def api_batch(iteration):
+        target = user_id()
+        response = client.post(f'/api/v1/users/{target}/movies/batch', json={
+            'create': [{'name': f'Batch Movie {iteration}', 'year': 1997}],
+            'update': [{'movie_id': movie_id(), 'rating': 8.0}]})
+        created = [movie['movie_id'] for movie in response.get_json()['created']]
+        request(client, 'POST', f'/api/v1/users/{target}/movies/batch', 200,
+                json={'delete': created})
+
+    return {
+        'GET /': (lambda _: request(client, 'GET', '/', 200), 1),
+        'GET /users': (lambda _: request(client, 'GET', '/users', 200), 1),
+        'GET /users?limit=500': (lambda _: request(client, 'GET', '/users?limit=500', 200), 0.25),
+        'GET /users/<id>': (lambda _: request(client, 'GET', f'/users/{user_id()}', 200), 1),
+        'GET /users/<id> gzip': (lambda _: request(
+            client, 'GET', f'/users/{user_id()}', 200, headers=gzip), 1),
+        'GET /users/<id>?sort=rating': (lambda _: request(
+            client, 'GET', f'/users/{user_id()}?sort=rating&order=desc', 200), 1),
+        'GET /users/<id>?q=star': (lambda _: request(
+            client, 'GET', f'/users/{user_id()}?q=star', 200), 1),
+        'GET /users/<id> 304': (conditional_get, 1),
+        'GET /users/<id>/update_movie/<id>': (lambda _: request(
+            client, 'GET', f'/users/{user_id()}/update_movie/{movie_id()}', 200), 1),
+        'POST /users/<id>/add_movie': (add_movie, 0.25),
+        'POST /users/<id>/update_movie/<id>': (update_movie, 0.25),
+        'GET /users/<id>/delete_movie/<id>': (delete_movie, 0.25),
+        'GET /api/v1/users/<id>': (lambda _: request(
+            client, 'GET', f'/api/v1/users/{user_id()}', 200), 1),
+        'GET /api/v1/users/<id>/movies?fields': (lambda _: request(
+            client, 'GET', f'/api/v1/users/{user_id()}/movies?fields=name,year&limit=100',
+            200), 1),
+        'PATCH /api/v1/users/<id>/movies/<id>': (lambda _: request(
+            client, 'PATCH', f'/api/v1/users/{user_id()}/movies/{movie_id()}', 200,
+            json={'rating': 8.5}), 0.25),
+        'POST /api/v1/users/<id>/movies/batch': (api_batch, 0.25),
+        'GET /static/style.css gzip': (lambda _: request(
+            client, 'GET', stylesheet, 200, headers=gzip), 1),
+    }
+
+
+def run_backend(backend: str, generated: list, omdb_url: str, args) -> list:
+    """
+    Run every route benchmark on one backend, on a fresh copy of the data
+    :param backend: data backend name
+    :param generated: generated users
+    :param omdb_url: url of the fake OMDb
+    :param args: command line arguments
+    :return:
+        list of result dicts
+    """
+    directory = tempfile.mkdtemp(prefix=f'movieflix-bench-{backend}-')
+    try:
+        config = write_dataset(directory, generated, backend, args.catalog)
+        config.update({'DATA_DURABILITY': args.durability,
+                       'OMDB_URL': omdb_url,
+                       'OMDB_ASYNC_ENRICHMENT': False,
+                       'OMDB_CACHE_FILE': os.path.join(directory, 'omdb_cache.db'),
+                       'POSTER_CACHE_DIR': os.path.join(directory, 'posters'),
+                       'POSTER_PREFETCH': False})
+        app = import_create_app()(config)
+        client = app.test_client()
+        rng = random.Random(args.seed)
+
+        results = []
+        for name, (function, share) in route_benchmarks(client, rng, args.users,
+                                                         args.movies).items():
+            if args.filter and args.filter not in name:
+                continue
+            iterations = max(3, int(args.iterations * share))
+            results.append({'name': f'{backend}/{name}',
+                            'backend': backend,
+                            'route': name,
+                            **measure(function, iterations)})
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    """
+    Run the route benchmarks and print or write their results
+    """
+    parser = argparse.ArgumentParser(description='Route benchmarks')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--movies', type=int, default=100, help='movies per user')
+    parser.add_argument('--films', type=int, default=None, help='distinct films')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['json'])
+    parser.add_argument('--no-catalog', dest='catalog', action='store_false')
+    parser.add_argument('--durability', choices=('always', 'batch', 'none'), default='always')
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='requests of each page, writes get fewer')
+    parser.add_argument('--omdb-latency', type=float, default=0.0,
+                        help='seconds the fake OMDb waits before answering')
+    parser.add_argument('--filter', default='', help='only run benchmarks containing this')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    generated = generate_users(args.users, args.movies, args.films, args.seed)
+    results = []
+    with FakeOMDbServer(latency=args.omdb_latency) as omdb:
+        for backend in args.backends:
+            results.extend(run_backend(backend, generated, omdb.url, args))
+    print_results(results)
+    if args.output:
+        write_results(args.output, 'routes', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Bulk import of movies:
+parsing lists of titles,
+looking them up concurrently
+and adding them to a user in one write
+"""
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from movieflix.data_manager.users import Users
+from movieflix.omdb.cache import normalize_title
+
+TITLE_KEYS = ('title', 'name', 'Title', 'Name')
+
+
+def _title_of(entry) -> str:
+    """
+    Return the title of a JSON list entry:
+    a string or an object with a title or name key
+    :param entry: str | dict
+    :return:
+        title (str)
+    """
+    if isinstance(entry, dict):
+        for key in TITLE_KEYS:
+            if key in entry:
+                return str(entry[key])
+        return ''
+    return str(entry)
+
+
+def parse_titles(content: str, filename: str = '') -> List[str]:
+    """
+    Return the movie titles of an import file or text:
+    a JSON list of titles or of objects with a title,
+    a CSV file with a title or name column (otherwise its first column)
+    or one title per line
+    :param content: str
+    :param filename: name of the uploaded file, decides the format
+    :return:
+        titles in file order, without blanks (List[str])
+    """
+    stripped = content.strip()
+    if filename.endswith('.json') or stripped.startswith(('[', '{')):
+        entries = json.loads(stripped or '[]')
+        if isinstance(entries, dict):
+            entries = entries.get('titles', [])
+        titles = [_title_of(entry) for entry in entries]
+    elif filename.endswith('.csv'):
+        rows = list(csv.reader(io.StringIO(stripped)))
+        column = 0
+        if rows and any(key in rows[0] for key in TITLE_KEYS):
+            column = next(rows[0].index(key) for key in TITLE_KEYS if key in rows[0])
+            rows = rows[1:]
+        titles = [row[column] for row in rows if len(row) > column]
+    else:
+        titles = stripped.splitlines()
+    return [title.strip() for title in titles if title.strip()]
+
+
+def fetch_movie_infos(titles: List[str], lookup: Callable[[str], dict | None],
+                      max_workers: int = 8) -> dict:
+    """
+    Look up every distinct title once,
+    at most max_workers at a time,
+    a lookup raising an error counts as failed
+    :param titles: List[str]
+    :param lookup: function(title) -> movie info (dict) |
+        empty dict if not found | None if it failed
+    :param max_workers: int
+    :return:
+        {normalized title: movie info (dict) | None} (dict)
+    """
+    distinct_titles = {}
+    for title in titles:
+        distinct_titles.setdefault(normalize_title(title), title)
+
+    def safe_lookup(title: str) -> dict | None:
+        try:
+            return lookup(title)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        movie_infos = executor.map(safe_lookup, distinct_titles.values())
+        return dict(zip(distinct_titles, movie_infos))
+
+
+def import_status(movie_info: dict | None) -> str:
+    """
+    Return the import status of a title's lookup result
+    :param movie_info: dict | None
+    :return:
+        'found' | 'not_found' | 'empty' (str)
+    """
+    if movie_info is None:
+        return 'empty'
+    return 'found' if movie_info else 'not_found'
+
+
+def import_movies(users: Users, user_id: int, titles: List[str],
+                  lookup: Callable[[str], dict | None],
+                  empty_info: Callable[[str], dict],
+                  max_workers: int = 8) -> List[dict] | None:
+    """
+    Look up titles concurrently and add them to a user in one write
+    :param users: Users
+    :param user_id: int
+    :param titles: List[str]
+    :param lookup: function(title) -> movie info (dict) |
+        empty dict if not found | None if it failed
+    :param empty_info: function(title) -> movie info used when the lookup found nothing
+    :param max_workers: int
+    :return:
+        per title results [{'title', 'movie_id', 'name', 'status'}],
+            status 'found', 'not_found' or 'empty' if the lookup failed (List[dict]) |
+        None if the user does not exist
+    """
+    if users.get_user(user_id) is None:
+        return None
+
+    movie_infos = fetch_movie_infos(titles, lookup, max_workers)
+    new_movies = []
+    for title in titles:
+        movie_info = movie_infos[normalize_title(title)]
+        new_movies.append(dict(movie_info) if movie_info else empty_info(title))
+
+    if users.add_user_movies(user_id, new_movies) is None:
+        return None
+
+    return [{'title': title,
+             'movie_id': new_movie['movie_id'],
+             'name': new_movie['name'],
+             'status': import_status(movie_infos[normalize_title(title)])}
+            for title, new_movie in zip(titles, new_movies)]
@@ -0,0 +1,139 @@
+"""
+Compression of the app's responses:
+text responses above a size threshold, streamed pages included,
+are sent gzip or brotli encoded to clients accepting it
+"""
+import zlib
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency, responses are gzip encoded without it
+    brotli = None
+
+DEFAULT_CONFIG = {'COMPRESS_MIN_SIZE': 1024,
+                  'COMPRESS_LEVEL': 6,
+                  'COMPRESS_MIMETYPES': ('text/html', 'text/css', 'text/plain',
+                                         'application/json', 'application/javascript',
+                                         'image/svg+xml')}
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# brotli quality matching the cost of a gzip level
+BROTLI_QUALITY = {level: min(level - 1, 11) for level in range(1, 10)}
+
+
+def available_encodings() -> list:
+    """
+    Return the content encodings the app can write,
+    preferred first
+    :return:
+        ['br', 'gzip'] | ['gzip'] (list)
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def accepted_encoding() -> str | None:
+    """
+    Return the best encoding the current request accepts
+    :return:
+        'br' | 'gzip' (str) |
+        None for an uncompressed response
+    """
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(content: bytes, encoding: str, level: int = 6) -> bytes:
+    """
+    Compress content with an encoding
+    :param content: bytes
+    :param encoding: 'br' | 'gzip'
+    :param level: 1 (fastest) to 9 (smallest)
+    :return:
+        compressed content (bytes)
+    """
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY[level])
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_stream(chunks, encoding: str, level: int = 6):
+    """
+    Compress a streamed response chunk by chunk,
+    every chunk is flushed so the client renders it at once
+    :param chunks: iterable of bytes
+    :param encoding: 'br' | 'gzip'
+    :param level: 1 (fastest) to 9 (smallest)
+    :return:
+        generator of compressed chunks (bytes)
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY[level])
+        for chunk in chunks:
+            compressed = compressor.process(chunk) + compressor.flush()
+            if compressed:
+                yield compressed
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response for the current request:
+    successful text responses of COMPRESS_MIMETYPES of at least
+    COMPRESS_MIN_SIZE bytes, and streamed ones of any size.
+    Files sent as is (direct passthrough) and already encoded
+    responses are left alone.
+
+    A compressed response's ETag is made weak, since its bytes
+    differ from the uncompressed response's, weak comparison
+    still answers If-None-Match with 304.
+    :param response: Response
+    :return:
+        Response
+    """
+    config = current_app.config
+    if response.status_code != 200 or response.direct_passthrough \
+            or 'Content-Encoding' in response.headers \
+            or response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    level = config['COMPRESS_LEVEL']
+    if response.is_streamed:
+        chunks = response.response
+        response.response = compress_stream(response.iter_encoded(), encoding, level)
+        if hasattr(chunks, 'close'):
+            response.call_on_close(chunks.close)
+        response.headers.pop('Content-Length', None)
+    else:
+        content = response.get_data()
+        if len(content) < config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress(content, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app: Flask):
+    """
+    Set the default compression config
+    and compress the app's responses
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.after_request(compress_response)
@@ -0,0 +1,180 @@
+"""
+Data backend of the app:
+one Users data manager per app,
+built from the app config and shared by all blueprints
+"""
+import os
+
+from flask import Flask, current_app
+from werkzeug.local import LocalProxy
+
+from movieflix.data_manager.catalog_data_manager import CatalogDataManager
+from movieflix.data_manager.file_utils import atomic_write
+from movieflix.data_manager.journaled_data_manager import JournaledJSONDataManager
+from movieflix.data_manager.json_codecs import get_codec
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.json_users import catalog_file_of
+from movieflix.data_manager.movie_catalog import MovieCatalog
+from movieflix.data_manager.records import Movie, User
+from movieflix.data_manager.sharded_data_manager import ShardedDataManager
+from movieflix.data_manager.sqlite_data_manager import SQLiteDataManager
+from movieflix.data_manager.users import Users
+
+EXTENSION_NAME = 'users_data_manager'
+
+CONFLICT_MESSAGE = 'The data was changed by other requests at the same time, please try again'
+
+DEFAULT_CONFIG = {'DATA_BACKEND': 'json',
+                  'DATA_FILE': 'data/movies.json',
+                  'DATA_CACHE': True,
+                  'DATA_DURABILITY': 'always',
+                  'DATA_COMPACT_THRESHOLD': 100,
+                  'DATA_SHARDS': 64,
+                  'DATA_CODEC': 'auto',
+                  'DATA_JSON_COMPACT': False,
+                  'DATA_CATALOG': False,
+                  'DATA_CATALOG_FILE': None}
+
+
+def create_codec(config):
+    """
+    Return the JSON codec of the JSON backends,
+    writing the json.dump layout unless DATA_JSON_COMPACT
+    :param config: app config (dict like)
+    :return:
+        codec
+    """
+    return get_codec(config['DATA_CODEC'], compact=config['DATA_JSON_COMPACT'])
+
+
+def catalog_file_name(config) -> str:
+    """
+    Return the movie catalog file,
+    by default <DATA_FILE without extension>.catalog.json
+    :param config: app config (dict like)
+    :return:
+        file name (str)
+    """
+    return config['DATA_CATALOG_FILE'] or catalog_file_of(config['DATA_FILE'])
+
+
+def create_movie_catalog(config) -> MovieCatalog:
+    """
+    Build the movie catalog stored next to the JSON data file,
+    in the same format as the data file
+    :param config: app config (dict like)
+    :return:
+        MovieCatalog
+    """
+    file_name = catalog_file_name(config)
+    if not os.path.exists(file_name):
+        atomic_write(file_name, b'[]')
+    if config['DATA_BACKEND'] == 'journal':
+        data_manager = JournaledJSONDataManager(file_name, 'imdb_id',
+                                                compact_threshold=config['DATA_COMPACT_THRESHOLD'],
+                                                durability=config['DATA_DURABILITY'],
+                                                record_type=Movie,
+                                                codec=create_codec(config))
+    else:
+        data_manager = JSONDataManager(file_name, 'imdb_id', cache=True,
+                                       durability=config['DATA_DURABILITY'],
+                                       record_type=Movie,
+                                       codec=create_codec(config))
+    return MovieCatalog(data_manager)
+
+
+def create_users_data_manager(config) -> Users:
+    """
+    Build the Users data manager for the configured backend:
+    'json', 'journal', 'sharded' (DATA_FILE is the shards
+    directory) or 'sqlite',
+    with DATA_CATALOG the JSON backends store movies
+    as references to a shared movie catalog
+    :param config: app config (dict like)
+    :return:
+        Users
+    """
+    backend = config['DATA_BACKEND']
+    if backend == 'json':
+        data_manager = JSONDataManager(config['DATA_FILE'], 'user_id',
+                                       cache=config['DATA_CACHE'],
+                                       durability=config['DATA_DURABILITY'],
+                                       record_type=User,
+                                       codec=create_codec(config))
+    elif backend == 'journal':
+        data_manager = JournaledJSONDataManager(config['DATA_FILE'], 'user_id',
+                                                compact_threshold=config['DATA_COMPACT_THRESHOLD'],
+                                                durability=config['DATA_DURABILITY'],
+                                                record_type=User,
+                                                codec=create_codec(config))
+    elif backend == 'sharded':
+        data_manager = ShardedDataManager(config['DATA_FILE'],
+                                          shard_count=config['DATA_SHARDS'] or None,
+                                          cache=config['DATA_CACHE'],
+                                          durability=config['DATA_DURABILITY'],
+                                          record_type=User,
+                                          codec=create_codec(config))
+    elif backend == 'sqlite':
+        data_manager = SQLiteDataManager(config['DATA_FILE'])
+    else:
+        raise ValueError(f'Unknown DATA_BACKEND {backend!r}')
+    if config['DATA_CATALOG'] and backend in ('json', 'journal', 'sharded'):
+        data_manager = CatalogDataManager(data_manager, create_movie_catalog(config))
+    return Users(data_manager)
+
+
+def init_app(app: Flask):
+    """
+    Set the default data config
+    and build the app's Users data manager
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.extensions[EXTENSION_NAME] = create_users_data_manager(app.config)
+
+
+def get_users_data_manager() -> Users:
+    """
+    Return the Users data manager of the current app
+    :return:
+        Users
+    """
+    return current_app.extensions[EXTENSION_NAME]
+
+
+def get_movie_catalog() -> MovieCatalog | None:
+    """
+    Return the movie catalog of the current app
+    :return:
+        MovieCatalog |
+        None if the app has no catalog
+    """
+    data_manager = get_users_data_manager().data_manager
+    if isinstance(data_manager, CatalogDataManager):
+        return data_manager.catalog
+    return None
+
+
+def users_generation():
+    """
+    Return the generation of all users of the current app,
+    the version of the users listing
+    :return:
+        generation | None
+    """
+    return get_users_data_manager().get_generation()
+
+
+def user_generation(user_id: int, **_view_args):
+    """
+    Return the generation of a user of the current app,
+    the version of the user's pages
+    :param user_id: int
+    :return:
+        generation | None
+    """
+    return get_users_data_manager().get_generation(user_id)
+
+
+users_data_manager: Users = LocalProxy(get_users_data_manager)
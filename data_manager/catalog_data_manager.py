@@ -0,0 +1,194 @@
+"""
+CatalogDataManager class implemented DataManagerInterface
+for storing users' movies as references to a MovieCatalog
+"""
+import threading
+from collections import OrderedDict
+from typing import List
+
+from .data_manager_interface import DataManagerInterface
+from .item_index import ItemIndex
+from .movie_catalog import MovieCatalog
+from .pagination import paginate
+
+
+class CatalogDataManager(DataManagerInterface):
+    """
+    A users data manager storing each movie
+    as a reference to its film in a MovieCatalog
+
+    Users are read and written in the same shape as without
+    a catalog: movies are resolved on read and turned into
+    references before the wrapped data manager writes them.
+    The resolved movies of the last max_cached_users users are
+    kept while neither their stored movies nor the catalog change,
+    so repeated reads return the same movies list.
+    The generation is the pair of the users' and the catalog's.
+    """
+    def __init__(self, data_manager: DataManagerInterface, catalog: MovieCatalog,
+                 max_cached_users=256):
+        self._data_manager = data_manager
+        self._catalog = catalog
+        self._max_cached_users = max_cached_users
+        self._resolved_movies = OrderedDict()
+        self._lock = threading.Lock()
+        self._users_index = None
+
+    @property
+    def catalog(self) -> MovieCatalog:
+        """
+        Return the movie catalog
+        :return:
+            MovieCatalog
+        """
+        return self._catalog
+
+    def get_generation(self, item_id=None) -> tuple | None:
+        """
+        Return the generations of the users and the catalog
+        :param item_id: user_id, passed to the users' data manager
+        :return:
+            (users generation, catalog generation) (tuple) |
+            None if the users data source does not track generations
+        """
+        generation = self._data_manager.get_generation(item_id)
+        if generation is None:
+            return None
+        return generation, self._catalog.get_generation()
+
+    def _resolve_user(self, user: dict) -> dict:
+        """
+        Return a stored user with resolved movies
+        :param user: dict
+        :return:
+            user (dict),
+                a user without movies, e.g. a listing summary, as is
+        """
+        if 'movies' not in user:
+            return user
+        references = user['movies']
+        catalog_generation = self._catalog.get_generation()
+        with self._lock:
+            cached = self._resolved_movies.get(user['user_id'])
+            if cached is not None and cached[0] is references \
+                    and cached[1] == catalog_generation:
+                self._resolved_movies.move_to_end(user['user_id'])
+                return {**user, 'movies': cached[2]}
+
+        movies = [self._catalog.resolve(reference) for reference in references]
+        with self._lock:
+            self._resolved_movies[user['user_id']] = (references, catalog_generation, movies)
+            self._resolved_movies.move_to_end(user['user_id'])
+            while len(self._resolved_movies) > self._max_cached_users:
+                self._resolved_movies.popitem(last=False)
+        return {**user, 'movies': movies}
+
+    def _store_user(self, user: dict) -> dict:
+        """
+        Return a user to store, with movie references
+        :param user: dict
+        :return:
+            user (dict)
+        """
+        if 'movies' not in user:
+            return dict(user)
+        return {**user, 'movies': [self._catalog.reference(movie) for movie in user['movies']]}
+
+    def get_all_data(self) -> List[dict] | None:
+        """
+        Return a list of all users with resolved movies
+        :return:
+            A list of dictionaries representing all the users
+        """
+        users = self._data_manager.get_all_data()
+        if users is None:
+            return None
+        return [self._resolve_user(user) for user in users]
+
+    def get_page(self, limit: int, offset: int = 0, after=None) -> dict | None:
+        """
+        Return a page of users,
+        resolving only the movies of the page's users
+        :param limit: page size
+        :param offset: position of the first user
+        :param after: user_id of the last user of the previous page
+        :return:
+            page (dict), see pagination.make_page |
+            None
+        """
+        page = self._data_manager.get_page(limit, offset, after)
+        if page is None:
+            users = self._data_manager.get_all_data()
+            if users is None:
+                return None
+            if self._users_index is None or not self._users_index.is_valid_for(users):
+                self._users_index = ItemIndex(users, 'user_id')
+            page = paginate(users, 'user_id', limit, offset, after,
+                            self._users_index.find_position)
+        return {**page, 'items': [self._resolve_user(user) for user in page['items']]}
+
+    def get_item_by_id(self, item_id) -> dict | None:
+        """
+        Return the specific user with resolved movies
+        given user_id
+        :return:
+            user (dict) |
+            None
+        """
+        user = self._data_manager.get_item_by_id(item_id)
+        if user is None:
+            return None
+        return self._resolve_user(user)
+
+    def generate_new_id(self, items: list, key=None) -> int:
+        """
+        Return 1 if items is empty
+        otherwise, return the highest id_key plus 1
+        :param items: list
+        :param key: str
+        :return:
+            new item id (int) |
+            1 if items is empty (int)
+        """
+        return self._data_manager.generate_new_id(items, key)
+
+    def add_item(self, new_item: dict) -> bool:
+        """
+        Add a new user, storing its movies as references
+        :param new_item: (dict)
+        :return:
+            Successfully add user, True (bool)
+        """
+        stored = self._store_user(new_item)
+        result = self._data_manager.add_item(stored)
+        new_item['user_id'] = stored['user_id']
+        return result
+
+    def update_item(self, updated_item: dict, expected_generation=None) -> bool | None:
+        """
+        Update a user, storing its movies as references
+        :param updated_item: dict
+        :param expected_generation: generation the update was based on,
+            only the users' generation is checked, StaleDataError
+            is raised if the users changed since
+        :return:
+            True for success update user (bool) |
+            None
+        """
+        if expected_generation is not None:
+            expected_generation = expected_generation[0]
+        return self._data_manager.update_item(self._store_user(updated_item),
+                                              expected_generation)
+
+    def delete_item(self, item_id: int) -> bool | None:
+        """
+        Delete a user based on user_id,
+        the catalog keeps the user's films
+        :param item_id: int
+        :return:
+            True for success delete user (bool) |
+            None
+        """
+        with self._lock:
+            self._resolved_movies.pop(item_id, None)
+        return self._data_manager.delete_item(item_id)
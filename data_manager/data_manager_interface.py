@@ -6,6 +6,13 @@ from abc import ABC, abstractmethod
 from typing import List
 
 
+class StaleDataError(Exception):
+    """
+    Raised when a write is based on data
+    that has changed since it was read
+    """
+
+
 class DataManagerInterface(ABC):
     """
     An Interface Class that reading file,
@@ -55,11 +62,40 @@ class DataManagerInterface(ABC):
             1 if items is empty (int)
         """
 
+    def get_generation(self, item_id=None):
+        """
+        Return a value that changes whenever the data changes,
+        to be passed to update_item as expected_generation
+        :param item_id: id of the item about to be read or updated,
+            data sources storing items apart may return a value
+            that only changes with the data of this item
+        :return:
+            generation |
+            None if the data source does not track generations
+        """
+        return None
+
+    def get_page(self, limit: int, offset: int = 0, after=None) -> dict | None:
+        """
+        Return a page of items read from the data source,
+        starting at offset or right after the item with id after
+        :param limit: page size
+        :param offset: position of the first item
+        :param after: id of the last item of the previous page
+        :return:
+            page (dict), see pagination.make_page |
+            None if the data source cannot page,
+            the caller then pages get_all_data()
+        """
+        return None
+
     @abstractmethod
-    def update_item(self, updated_item: dict) -> bool | None:
+    def update_item(self, updated_item: dict, expected_generation=None) -> bool | None:
         """
         Update item with updated_item
         :param updated_item: dict
+        :param expected_generation: generation the update was based on,
+            StaleDataError is raised if the data changed since
         :return:
             True for success update item (bool) |
             None
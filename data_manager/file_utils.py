@@ -0,0 +1,92 @@
+"""
+File helpers shared by the file based data managers:
+atomic, optionally fsynced file replacement
+and atomic creation
+"""
+import os
+import tempfile
+
+
+def fsync_directory(directory: str):
+    """
+    Flush a directory entry change (e.g. a rename) to disk,
+    no-op on platforms that cannot open directories
+    :param directory: str
+    """
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    dir_fd = os.open(directory or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def atomic_write(file_name, content: bytes, fsync: bool = True) -> os.stat_result:
+    """
+    Replace file_name with content atomically:
+    write to a temp file in the same directory,
+    optionally fsync it and rename it over file_name.
+    Readers see either the old or the new file, never a partial one.
+    :param file_name: str | os.PathLike
+    :param content: bytes
+    :param fsync: flush the file and the directory entry to disk
+    :return:
+        stat of the new file (os.stat_result)
+    """
+    file_name = os.fspath(file_name)
+    directory = os.path.dirname(file_name)
+    fd, temp_name = tempfile.mkstemp(dir=directory or '.',
+                                     prefix=f'.{os.path.basename(file_name)}.',
+                                     suffix='.tmp')
+    try:
+        with open(fd, 'wb') as file:
+            file.write(content)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+            try:
+                os.chmod(temp_name, os.stat(file_name).st_mode & 0o777)
+            except FileNotFoundError:
+                os.chmod(temp_name, 0o644)
+            stat_result = os.fstat(file.fileno())
+        os.replace(temp_name, file_name)
+    except BaseException:
+        try:
+            os.remove(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    if fsync:
+        fsync_directory(directory)
+    return stat_result
+
+
+def atomic_create(file_name, content: bytes) -> bool:
+    """
+    Create file_name with content unless it exists:
+    the content is written to a temp file that is then
+    hard linked to file_name, so concurrent creators never
+    overwrite each other and readers never see a partial file
+    :param file_name: str | os.PathLike
+    :param content: bytes
+    :return:
+        True if the file was created,
+        False if it already existed (bool)
+    """
+    file_name = os.fspath(file_name)
+    fd, temp_name = tempfile.mkstemp(dir=os.path.dirname(file_name) or '.',
+                                     prefix=f'.{os.path.basename(file_name)}.',
+                                     suffix='.tmp')
+    try:
+        with open(fd, 'wb') as file:
+            file.write(content)
+        os.chmod(temp_name, 0o644)
+        try:
+            os.link(temp_name, file_name)
+        except FileExistsError:
+            return False
+    finally:
+        os.remove(temp_name)
+    return True
@@ -0,0 +1,111 @@
+"""
+ItemIndex class
+Indexing a list of dict items by their id key
+"""
+from typing import List
+
+
+class ItemIndex:
+    """
+    An id -> list position index
+    and the highest id
+    of a list of items
+    """
+    def __init__(self, items: List[dict], id_key: str):
+        self.items = items
+        self._id_key = id_key
+        self._positions = {item[id_key]: position
+                           for position, item in enumerate(items)}
+        self._max_id = max(self._positions, default=0)
+
+    def is_valid_for(self, items: List[dict]) -> bool:
+        """
+        Check if the index was built for the given list of items
+        :param items: List[dict]
+        :return:
+            True if the index describes items (bool)
+        """
+        return self.items is items
+
+    def copy(self, items: List[dict]):
+        """
+        Return an index of items,
+        a copy of the indexed list
+        :param items: List[dict]
+        :return:
+            index of items (same type as self)
+        """
+        index = self.__class__.__new__(self.__class__)
+        index.__dict__.update(self.__dict__)
+        index.items = items
+        index._positions = dict(self._positions)  # pylint: disable=protected-access
+        return index
+
+    def find_position(self, item_id) -> int | None:
+        """
+        Return the list position of item_id
+        :param item_id: item id
+        :return:
+            position (int) |
+            None
+        """
+        return self._positions.get(item_id)
+
+    def find(self, item_id) -> dict | None:
+        """
+        Return the item given item_id
+        :param item_id: item id
+        :return:
+            an item (dict) |
+            None
+        """
+        position = self._positions.get(item_id)
+        if position is None:
+            return None
+        return self.items[position]
+
+    def generate_new_id(self) -> int:
+        """
+        Return the highest id plus 1
+        :return:
+            new item id (int)
+        """
+        return self._max_id + 1
+
+    def add(self, new_item: dict):
+        """
+        Append new_item to the items list
+        :param new_item: dict with id_key
+        """
+        item_id = new_item[self._id_key]
+        self.items.append(new_item)
+        self._positions[item_id] = len(self.items) - 1
+        if not self._max_id or item_id > self._max_id:
+            self._max_id = item_id
+
+    def replace(self, position: int, item: dict):
+        """
+        Replace the item at position with an item of the same id
+        :param position: int
+        :param item: dict with id_key
+        """
+        self.items[position] = item
+
+    def remove(self, item_id) -> dict | None:
+        """
+        Remove an item from the items list
+        and shift the positions of the following items
+        :param item_id: item id
+        :return:
+            removed item (dict) |
+            None
+        """
+        position = self._positions.pop(item_id, None)
+        if position is None:
+            return None
+        item = self.items.pop(position)
+        for moved_position in range(position, len(self.items)):
+            self._positions[self.items[moved_position][self._id_key]] = moved_position
+        if item_id == self._max_id:
+            self._max_id = max(self._positions, default=0)
+        return item
@@ -0,0 +1,261 @@
+"""
+JournaledJSONDataManager class extending JSONDataManager
+for managing data from a json snapshot file
+plus an append-only journal of changes
+"""
+import os
+import time
+from typing import List
+
+from movieflix.profiling import stages
+
+from .file_utils import atomic_write
+from .json_data_manager import JSONDataManager, DURABILITY_ALWAYS
+
+
+class JournaledJSONDataManager(JSONDataManager):
+    """
+    A class for managing data
+    in a JSON snapshot file and a JSON-lines journal
+
+    Every change is appended to the journal as one small record
+    instead of rewriting the snapshot. The data is the snapshot
+    with the journal replayed on top of it. Once the journal holds
+    compact_threshold records it is folded back into the snapshot.
+
+    Replaying a record is idempotent ('add' inserts or replaces,
+    'update' merges, 'delete' ignores missing items), so a crash
+    between writing the snapshot and emptying the journal is safe.
+    """
+    def __init__(self, file_name, id_key, journal_file=None,
+                 compact_threshold=100,
+                 durability=DURABILITY_ALWAYS, fsync_batch_size=10,
+                 lock_file=None, record_type=None, codec='auto'):
+        super().__init__(file_name, id_key, cache=True,
+                         durability=durability,
+                         fsync_batch_size=fsync_batch_size,
+                         lock_file=lock_file,
+                         record_type=record_type,
+                         codec=codec)
+        self._journal_file = journal_file or f'{os.fspath(file_name)}.journal'
+        self._compact_threshold = compact_threshold
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_torn = False
+
+    @property
+    def journal_records(self) -> int:
+        """
+        Return the number of records in the journal
+        :return:
+            number of records (int)
+        """
+        return self._journal_records
+
+    def _journal_stat(self) -> os.stat_result | None:
+        """
+        Return the stat of the journal file
+        :return:
+            os.stat_result |
+            None if there is no journal
+        """
+        try:
+            return os.stat(self._journal_file)
+        except FileNotFoundError:
+            return None
+
+    def get_generation(self, item_id=None) -> tuple | None:
+        """
+        Return the signatures of the snapshot and the journal on disk
+        :param item_id: unused, all items share the files
+        :return:
+            (snapshot signature, journal inode, journal size) (tuple) |
+            None if the snapshot does not exist
+        """
+        snapshot_generation = super().get_generation()
+        if snapshot_generation is None:
+            return None
+        journal_stat = self._journal_stat()
+        if journal_stat is None:
+            return snapshot_generation, None, 0
+        return snapshot_generation, journal_stat.st_ino, journal_stat.st_size
+
+    def _read_file(self) -> List[dict] | None:
+        """
+        Reading the snapshot with the journal replayed on top of it,
+        only the journal records appended since the last read
+        are replayed while the snapshot is unchanged
+        :return:
+            snapshot and journal content (List[dict]) |
+            None
+        """
+        with self._load_lock:
+            return self._read_snapshot_and_journal()
+
+    def _read_snapshot_and_journal(self) -> List[dict] | None:
+        """
+        Reading the snapshot and replaying the new journal records
+        :return:
+            snapshot and journal content (List[dict]) |
+            None
+        """
+        journal_stat = self._journal_stat()
+        journal_inode = journal_stat.st_ino if journal_stat else None
+        journal_size = journal_stat.st_size if journal_stat else 0
+
+        cached_items = self._cached_items
+        cached_signature = self._cached_signature
+        items = super()._read_file()
+        if items is None:
+            self._journal_inode = None
+            return None
+
+        reloaded = items is not cached_items or self._cached_signature != cached_signature
+        if not reloaded and (journal_inode != self._journal_inode
+                             or journal_size < self._journal_offset):
+            self._invalidate_cache()
+            items = super()._read_file()
+            reloaded = True
+            if items is None:
+                return None
+        if reloaded:
+            self._journal_offset = 0
+            self._journal_records = 0
+            self._journal_torn = False
+
+        self._journal_inode = journal_inode
+        if journal_size > self._journal_offset:
+            self._replay_journal(items)
+        return items
+
+    def _replay_journal(self, items: List[dict]):
+        """
+        Apply the journal records after the last replayed offset
+        :param items: List[dict]
+        """
+        start = time.perf_counter()
+        try:
+            with open(self._journal_file, 'rb') as file:
+                file.seek(self._journal_offset)
+                content = file.read()
+        except FileNotFoundError:
+            return
+
+        self._journal_torn = False
+        for line in content.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                # a crash during an append left a partial record
+                self._journal_torn = True
+                break
+            self._journal_offset += len(line)
+            if line.strip():
+                self._apply_record(items, self._codec.loads(line))
+                self._journal_records += 1
+        stages.record('storage_read', time.perf_counter() - start, len(content))
+
+    def _apply_record(self, items: List[dict], record: dict):
+        """
+        Apply one journal record to items
+        :param items: List[dict]
+        :param record: {'op': 'add' | 'update' | 'delete', 'item': dict}
+        """
+        item = record['item']
+        index = self._get_index(items)
+        position = index.find_position(item[self._id_key])
+        if record['op'] == 'add':
+            if position is None:
+                index.add(self._to_record(item))
+            else:
+                index.replace(position, self._to_record(item))
+        elif record['op'] == 'update':
+            if position is not None:
+                items[position].update(item)
+        elif record['op'] == 'delete':
+            index.remove(item[self._id_key])
+
+    def _write_change(self, items: List[dict], operation: str, item: dict) -> bool | None:
+        """
+        Append a change record to the journal,
+        compact the journal once it reaches compact_threshold records
+        :param items: List[dict], all items after the change
+        :param operation: 'add' | 'update' | 'delete'
+        :param item: dict, the added item, the update or the deleted id
+        :return:
+            True for successful written to the journal (bool)
+            None
+        """
+        record = self._codec.dumps({'op': operation, 'item': item}) + b'\n'
+        fsync = self._should_fsync()
+        start = time.perf_counter()
+        try:
+            if self._journal_torn:
+                os.truncate(self._journal_file, self._journal_offset)
+                self._journal_torn = False
+            with open(self._journal_file, 'ab') as file:
+                file.write(record)
+                file.flush()
+                if fsync:
+                    os.fsync(file.fileno())
+                journal_stat = os.fstat(file.fileno())
+        except FileNotFoundError:
+            self._invalidate_cache()
+            return None
+        finally:
+            seconds = time.perf_counter() - start
+            self._write_seconds += seconds
+            stages.record('storage_write', seconds, len(record))
+
+        self._writes += 1
+        self._fsyncs += fsync
+        self._journal_inode = journal_stat.st_ino
+        self._journal_offset = journal_stat.st_size
+        self._journal_records += 1
+
+        if self._journal_records >= self._compact_threshold:
+            return self._compact()
+        return True
+
+    def compact(self) -> bool | None:
+        """
+        Fold the journal into the snapshot file
+        and start an empty journal
+        :return:
+            True for successful compaction (bool)
+            None
+        """
+        with self._write_locked():
+            return self._compact()
+
+    def _compact(self) -> bool | None:
+        """
+        Fold the journal into the snapshot file,
+        the write lock must be held
+        :return:
+            True for successful compaction (bool)
+            None
+        """
+        items = self._read_file()
+        if items is None:
+            return None
+        return self._write_all(items)
+
+    def _write_all(self, items: List[dict]) -> bool | None:
+        """
+        Write all items to the snapshot file
+        and start an empty journal
+        :param items: List[dict], all items after the changes
+        :return:
+            True for successful written snapshot (bool)
+            None
+        """
+        if self._write_file(items) is None:
+            return None
+
+        journal_stat = atomic_write(self._journal_file, b'',
+                                    fsync=self._durability == DURABILITY_ALWAYS)
+        self._journal_inode = journal_stat.st_ino
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_torn = False
+        return True
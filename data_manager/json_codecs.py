@@ -0,0 +1,184 @@
+"""
+JSON codecs for the JSON data managers:
+orjson or msgspec when installed, the stdlib json module otherwise
+
+By default every codec writes the layout of json.dump, which wrote
+the files before the codecs: ', ' and ': ' separators, \\u escapes
+for non-ASCII. Existing files, those kept in git included, are
+rewritten byte-for-byte the same. orjson and msgspec cannot write
+that layout, and rewriting their output costs more than the stdlib
+encoder, so they only read in this layout and the stdlib json
+module writes.
+
+With compact=True (the DATA_JSON_COMPACT setting) every codec writes
+a canonical compact format instead: no whitespace, UTF-8 text
+without \\u escapes. Switching a deployment to it rewrites each
+file once, on its first write.
+
+Files are byte-for-byte the same whichever codec wrote them, in the
+compact format for the values the app stores (strings, integers
+and floats between 1e-4 and 1e16; outside that range orjson and
+msgspec write exponents as 1e16 where json writes 1e+16, which every
+codec reads back to the same value).
+"""
+import json
+
+from .records import record_to_json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+
+def dump_encoder() -> json.JSONEncoder:
+    """
+    Return a stdlib encoder writing the layout of json.dump,
+    records included
+    :return:
+        json.JSONEncoder
+    """
+    return json.JSONEncoder(default=record_to_json)
+
+
+class StdlibCodec:
+    """
+    The stdlib json module
+    """
+    name = 'json'
+
+    def __init__(self, compact: bool = False):
+        if compact:
+            self._encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False,
+                                             default=record_to_json)
+        else:
+            self._encoder = dump_encoder()
+        self._decoder = json.JSONDecoder()
+
+    def loads(self, content: bytes):
+        """
+        Decode JSON content
+        :param content: bytes
+        :return:
+            decoded value
+        """
+        return self._decoder.decode(content.decode('utf-8'))
+
+    def dumps(self, value) -> bytes:
+        """
+        Encode a value as JSON
+        :param value: JSON value, records included
+        :return:
+            bytes
+        """
+        return self._encoder.encode(value).encode('utf-8')
+
+
+class OrjsonCodec:
+    """
+    orjson, compact UTF-8 output is its only format,
+    the json.dump layout is written by the stdlib encoder
+    """
+    name = 'orjson'
+
+    def __init__(self, compact: bool = False):
+        self._encoder = None if compact else dump_encoder()
+
+    @staticmethod
+    def loads(content: bytes):
+        """
+        Decode JSON content
+        :param content: bytes
+        :return:
+            decoded value
+        """
+        return orjson.loads(content)
+
+    def dumps(self, value) -> bytes:
+        """
+        Encode a value as JSON
+        :param value: JSON value, records included
+        :return:
+            bytes
+        """
+        if self._encoder is not None:
+            return self._encoder.encode(value).encode('utf-8')
+        return orjson.dumps(value, default=record_to_json)
+
+
+class MsgspecCodec:
+    """
+    msgspec, with reused encoder and decoder,
+    the json.dump layout is written by the stdlib encoder
+
+    It decodes untyped, to the same dicts and lists as the other
+    codecs, as the data managers build their own records;
+    a typed decoder would need the records to be msgspec Structs.
+    """
+    name = 'msgspec'
+
+    def __init__(self, compact: bool = False):
+        self._dump_encoder = None if compact else dump_encoder()
+        self._encoder = msgspec.json.Encoder(enc_hook=record_to_json)
+        self._decoder = msgspec.json.Decoder()
+
+    def loads(self, content: bytes):
+        """
+        Decode JSON content
+        :param content: bytes
+        :return:
+            decoded value
+        """
+        return self._decoder.decode(content)
+
+    def dumps(self, value) -> bytes:
+        """
+        Encode a value as JSON
+        :param value: JSON value, records included
+        :return:
+            bytes
+        """
+        if self._dump_encoder is not None:
+            return self._dump_encoder.encode(value).encode('utf-8')
+        return self._encoder.encode(value)
+
+
+CODECS = {'orjson': (OrjsonCodec, orjson),
+          'msgspec': (MsgspecCodec, msgspec),
+          'json': (StdlibCodec, json)}
+
+
+def available_codecs() -> list:
+    """
+    Return the names of the codecs that can be used,
+    fastest first
+    :return:
+        codec names (list)
+    """
+    return [name for name, (_, module) in CODECS.items() if module is not None]
+
+
+def get_codec(name: str = 'auto', compact: bool = False):
+    """
+    Return a codec by name,
+    'auto' is the fastest installed codec
+    :param name: 'auto' | 'orjson' | 'msgspec' | 'json'
+    :param compact: write the compact format instead of the json.dump layout
+    :return:
+        codec
+    :raises:
+        ValueError for an unknown or not installed codec
+    """
+    if name == 'auto':
+        name = available_codecs()[0]
+    if name not in CODECS:
+        raise ValueError(f'Unknown codec {name!r}, use one of {list(CODECS)} or auto')
+    codec_class, module = CODECS[name]
+    if module is None:
+        raise ValueError(f'Codec {name!r} is not installed')
+    return codec_class(compact)
@@ -2,21 +2,210 @@
 JSONDataManager class implemented DataManagerInterface
 for managing data from json file
 """
-import json
+import os
+import threading
+import time
 from abc import ABC
+from contextlib import contextmanager
 from typing import List
 
-from .data_manager_interface import DataManagerInterface
+from movieflix.profiling import stages
+
+from .data_manager_interface import DataManagerInterface, StaleDataError
+from .file_utils import atomic_write
+from .item_index import ItemIndex
+from .json_codecs import get_codec
+from .locking import FileLock, ReadWriteLock
+
+DURABILITY_ALWAYS = 'always'
+DURABILITY_BATCH = 'batch'
+DURABILITY_NONE = 'none'
+DURABILITY_MODES = (DURABILITY_ALWAYS, DURABILITY_BATCH, DURABILITY_NONE)
 
 
 class JSONDataManager(DataManagerInterface, ABC):
     """
     A class for managing data
     to and from a JSON file
+
+    With cache=True the parsed file content is kept in memory
+    and only reloaded when the file's mtime, size or inode changes.
+    Cached items are shared between calls, callers that modify
+    an item are expected to write it back with update_item.
+
+    An id -> list position index and the highest id are rebuilt
+    whenever the file is loaded and kept up to date on every
+    mutation, so lookups and id allocation do not scan the items.
+
+    Writes replace the file atomically. durability chooses when
+    the new file is fsynced: on every write ('always'),
+    on every fsync_batch_size-th write ('batch') or never ('none').
+
+    Reads share a lock within the process, writes hold it
+    exclusively together with an advisory lock on lock_file
+    (default <file_name>.lock) so writers in other processes
+    are serialized as well. The generation is a write counter kept
+    in the lock file together with the file's (mtime, size, inode),
+    the counter changes with every write even if a rewrite
+    repeats the stat of an earlier version of the file.
+
+    With a record_type, e.g. records.User, items are kept
+    as compact records instead of dicts.
+
+    The file is parsed and written by codec, by default orjson or
+    msgspec when installed and the json module otherwise; all of
+    them write the same bytes, the json.dump layout unless the codec
+    is compact (see json_codecs).
     """
-    def __init__(self, file_name, id_key):
+    def __init__(self, file_name, id_key, cache=False,
+                 durability=DURABILITY_ALWAYS, fsync_batch_size=10,
+                 lock_file=None, record_type=None, codec='auto'):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f'durability must be one of {DURABILITY_MODES}')
         self._file_name = file_name
         self._id_key = id_key
+        self._record_type = record_type
+        self._codec = get_codec(codec) if isinstance(codec, str) else codec
+        self._cache = cache
+        self._durability = durability
+        self._fsync_batch_size = fsync_batch_size
+        self._writes = 0
+        self._fsyncs = 0
+        self._write_seconds = 0.0
+        self._cached_items = None
+        self._cached_signature = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._indexed = None
+        self._lock = ReadWriteLock()
+        self._load_lock = threading.RLock()
+        self._file_lock = FileLock(lock_file or f'{os.fspath(file_name)}.lock')
+
+    @property
+    def cache_stats(self) -> dict:
+        """
+        Return the cache hit and miss counters
+        :return:
+            {'hits': int, 'misses': int} (dict)
+        """
+        return {'hits': self._cache_hits,
+                'misses': self._cache_misses}
+
+    @property
+    def write_stats(self) -> dict:
+        """
+        Return the number of writes, fsyncs
+        and the total time spent writing
+        :return:
+            {'writes': int, 'fsyncs': int, 'seconds': float} (dict)
+        """
+        return {'writes': self._writes,
+                'fsyncs': self._fsyncs,
+                'seconds': self._write_seconds}
+
+    @contextmanager
+    def _write_locked(self):
+        """
+        Hold the in-process and the file lock exclusively
+        for a read-modify-write cycle
+        """
+        with self._lock.write_locked():
+            with self._file_lock.locked():
+                yield
+
+    def _should_fsync(self) -> bool:
+        """
+        Check if the next write must be fsynced
+        according to the durability mode
+        :return:
+            True to fsync (bool)
+        """
+        if self._durability == DURABILITY_ALWAYS:
+            return True
+        if self._durability == DURABILITY_BATCH:
+            return (self._writes + 1) % self._fsync_batch_size == 0
+        return False
+
+    @staticmethod
+    def _signature(stat_result: os.stat_result, counter: int) -> tuple:
+        """
+        Return the values identifying a version of the file
+        :param stat_result: os.stat_result
+        :param counter: write counter of the lock file
+        :return:
+            (counter, mtime_ns, size, inode) (tuple)
+        """
+        return (counter,
+                stat_result.st_mtime_ns,
+                stat_result.st_size,
+                stat_result.st_ino)
+
+    def _file_signature(self) -> tuple | None:
+        """
+        Return the signature of the file on disk
+        :return:
+            (counter, mtime_ns, size, inode) (tuple) |
+            None if the file does not exist
+        """
+        counter = self._file_lock.read_counter()
+        try:
+            return self._signature(os.stat(self._file_name), counter)
+        except FileNotFoundError:
+            return None
+
+    def get_generation(self, item_id=None) -> tuple | None:
+        """
+        Return the signature of the file on disk
+        :param item_id: unused, all items share the file
+        :return:
+            (counter, mtime_ns, size, inode) (tuple) |
+            None if the file does not exist
+        """
+        return self._file_signature()
+
+    def _check_generation(self, expected_generation):
+        """
+        Raise StaleDataError if the data changed
+        since expected_generation
+        :param expected_generation: generation | None to skip the check
+        """
+        if expected_generation is not None \
+                and expected_generation != self.get_generation():
+            raise StaleDataError(f'{self._file_name} changed since it was read')
+
+    def _invalidate_cache(self):
+        """
+        Drop the cached file content
+        and its index
+        """
+        self._cached_items = None
+        self._cached_signature = None
+        self._indexed = None
+
+    def _to_record(self, item: dict) -> dict:
+        """
+        Return item as a record_type record
+        :param item: dict
+        :return:
+            record | item if there is no record_type
+        """
+        if self._record_type is None:
+            return item
+        return self._record_type.from_dict(item)
+
+    def _get_index(self, items: List[dict]) -> ItemIndex:
+        """
+        Return the index of items,
+        building it if the last index was for other items
+        :param items: List[dict]
+        :return:
+            index (ItemIndex)
+        """
+        index = self._indexed
+        if index is None or not index.is_valid_for(items):
+            index = ItemIndex(items, self._id_key)
+            self._indexed = index
+        return index
 
     def _read_file(self) -> List[dict] | None:
         """
@@ -25,30 +214,122 @@ class JSONDataManager(DataManagerInterface, ABC):
             json file content (List[dict]) |
             None
         """
-        try:
-            with open(self._file_name, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return None
-        except FileExistsError:
-            return None
+        if self._cache and self._cached_items is not None:
+            signature = self._file_signature()
+            if signature is None:
+                self._invalidate_cache()
+                return None
+            if signature == self._cached_signature:
+                self._cache_hits += 1
+                return self._cached_items
+
+        with self._load_lock:
+            start = time.perf_counter()
+            try:
+                # the counter is read first, a write in between is seen as a change next time
+                counter = self._file_lock.read_counter()
+                with open(self._file_name, 'rb') as file:
+                    signature = self._signature(os.fstat(file.fileno()), counter)
+                    if self._cache and signature == self._cached_signature:
+                        # loaded by another thread meanwhile
+                        self._cache_hits += 1
+                        return self._cached_items
+                    content = file.read()
+                    items = self._codec.loads(content)
+            except FileNotFoundError:
+                return None
+            except FileExistsError:
+                return None
+
+            if items is not None:
+                if self._record_type is not None:
+                    items = [self._to_record(item) for item in items]
+                self._get_index(items)
+            stages.record('storage_read', time.perf_counter() - start, len(content))
+            if self._cache:
+                self._cache_misses += 1
+                self._cached_items = items
+                self._cached_signature = signature
+            return items
 
     def _write_file(self, items: List[dict]) -> bool | None:
         """
-        Write a list of dict to a json file
+        Write a list of dict to a json file atomically
         :param items: List[dict]
         :return:
             True for successful written to file (bool)
             None
         """
+        fsync = self._should_fsync()
+        start = time.perf_counter()
+        content = self._codec.dumps(items)
         try:
-            with open(self._file_name, 'w', encoding='utf-8') as file:
-                json.dump(items, file)
-                return True
+            stat_result = atomic_write(self._file_name, content, fsync=fsync)
         except FileNotFoundError:
+            self._invalidate_cache()
             return None
         except FileExistsError:
+            self._invalidate_cache()
             return None
+        except BaseException:
+            # the cached items were changed in place for a write that did not happen
+            self._invalidate_cache()
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self._write_seconds += seconds
+            stages.record('storage_write', seconds, len(content))
+
+        counter = self._file_lock.increment_counter()
+        self._writes += 1
+        self._fsyncs += fsync
+        if self._cache:
+            self._cached_items = items
+            self._cached_signature = self._signature(stat_result, counter)
+        return True
+
+    def _write_change(self, items: List[dict], operation: str, item: dict) -> bool | None:
+        """
+        Persist a change made to items,
+        the whole file is rewritten
+        :param items: List[dict], all items after the change
+        :param operation: 'add' | 'update' | 'delete'
+        :param item: dict, the added item, the update or the deleted id
+        :return:
+            True for successful written to file (bool)
+            None
+        """
+        return self._write_file(items)
+
+    def _write_all(self, items: List[dict]) -> bool | None:
+        """
+        Persist many changes made to items at once,
+        the whole file is rewritten
+        :param items: List[dict], all items after the changes
+        :return:
+            True for successful written to file (bool)
+            None
+        """
+        return self._write_file(items)
+
+    def _persist(self, write, *args) -> bool | None:
+        """
+        Persist changes made in place to the read items,
+        dropping the cache and index if they were not written
+        :param write: _write_change | _write_all
+        :param args: its arguments
+        :return:
+            True for successful written to file (bool)
+            None
+        """
+        try:
+            result = write(*args)
+        except BaseException:
+            self._invalidate_cache()
+            raise
+        if result is None:
+            self._invalidate_cache()
+        return result
 
     def get_all_data(self) -> List[dict] | None:
         """
@@ -56,7 +337,8 @@ class JSONDataManager(DataManagerInterface, ABC):
         :return:
             A list of dictionaries representing all the data
         """
-        return self._read_file()
+        with self._lock.read_locked():
+            return self._read_file()
 
     def get_item_by_id(self, item_id) -> dict | None:
         """
@@ -66,11 +348,10 @@ class JSONDataManager(DataManagerInterface, ABC):
             item (dict) |
             None
         """
-        items = self._read_file()
-        if items:
-            for item in items:
-                if item[self._id_key] == item_id:
-                    return item
+        with self._lock.read_locked():
+            items = self._read_file()
+            if items:
+                return self._get_index(items).find(item_id)
         return None
 
     def generate_new_id(self, items: list, key=None) -> int:
@@ -83,37 +364,92 @@ class JSONDataManager(DataManagerInterface, ABC):
             new item id (int) |
             1 if items is empty (int)
         """
+        index = self._indexed
+        if items is not None and index is not None and index.is_valid_for(items) \
+                and key in (None, self._id_key):
+            return index.generate_new_id()
         if items:
             return max(item[key or self._id_key] for item in items) + 1
         return 1
 
-    def add_item(self, new_item: dict) -> bool:
+    def add_item(self, new_item: dict) -> bool | None:
         """
         Add new item to json file
         :param new_item: (dict)
         :return:
-            Successfully add item, True (bool)
+            Successfully add item, True (bool) |
+            None if it could not be written
         """
-        items = self._read_file()
-        new_item.update({self._id_key: self.generate_new_id(items)})
-        items.append(new_item)
-        self._write_file(items)
-        return True
+        with self._write_locked():
+            items = self._read_file()
+            new_item.update({self._id_key: self.generate_new_id(items)})
+            self._get_index(items).add(self._to_record(new_item))
+            return self._persist(self._write_change, items, 'add', new_item)
 
-    def update_item(self, updated_item: dict) -> bool | None:
+    def put_item(self, item: dict) -> bool | None:
+        """
+        Add an item under its own id,
+        or replace the item that has this id,
+        for items with natural keys such as an imdbID
+        :param item: dict with id_key
+        :return:
+            True for successful written to file (bool) |
+            None
+        """
+        with self._write_locked():
+            items = self._read_file()
+            if items is None:
+                return None
+            index = self._get_index(items)
+            record = self._to_record(item)
+            position = index.find_position(item[self._id_key])
+            if position is None:
+                index.add(record)
+            else:
+                index.replace(position, record)
+            return self._persist(self._write_change, items, 'add', item)
+
+    def put_items(self, new_items: List[dict]) -> bool | None:
+        """
+        Add or replace many items under their own ids
+        in one write, e.g. when importing data
+        :param new_items: List[dict] with id_key
+        :return:
+            True for successful written to file (bool) |
+            None
+        """
+        with self._write_locked():
+            items = self._read_file()
+            if items is None:
+                return None
+            index = self._get_index(items)
+            for item in new_items:
+                record = self._to_record(item)
+                position = index.find_position(item[self._id_key])
+                if position is None:
+                    index.add(record)
+                else:
+                    index.replace(position, record)
+            return self._persist(self._write_all, items)
+
+    def update_item(self, updated_item: dict, expected_generation=None) -> bool | None:
         """
         Update item with updated_item
         :param updated_item: dict
+        :param expected_generation: generation the update was based on,
+            StaleDataError is raised if the file changed since
         :return:
             True for success update item (bool) |
             None
         """
-        items = self._read_file()
-        for item in items:
-            if item[self._id_key] == updated_item[self._id_key]:
-                item.update(updated_item)
-                self._write_file(items)
-                return True
+        with self._write_locked():
+            self._check_generation(expected_generation)
+            items = self._read_file()
+            if items:
+                item = self._get_index(items).find(updated_item[self._id_key])
+                if item is not None:
+                    item.update(updated_item)
+                    return self._persist(self._write_change, items, 'update', updated_item)
         return None
 
     def delete_item(self, item_id: int) -> bool | None:
@@ -124,11 +460,9 @@ class JSONDataManager(DataManagerInterface, ABC):
             True for success delete item (bool) |
             None
         """
-        items = self._read_file()
-        if items:
-            for item in items:
-                if item[self._id_key] == item_id:
-                    items.remove(item)
-                    self._write_file(items)
-                    return True
+        with self._write_locked():
+            items = self._read_file()
+            if items and self._get_index(items).remove(item_id) is not None:
+                return self._persist(self._write_change, items, 'delete',
+                                     {self._id_key: item_id})
         return None
@@ -0,0 +1,43 @@
+"""
+Reading the users of a JSON data file,
+stored with or without a movie catalog,
+e.g. to migrate them to another backend
+"""
+import os
+from typing import List
+
+from .catalog_data_manager import CatalogDataManager
+from .json_data_manager import JSONDataManager
+from .movie_catalog import MovieCatalog
+from .records import Movie, User
+from .users import Users
+
+
+def catalog_file_of(json_file) -> str:
+    """
+    Return the default movie catalog file of a JSON data file,
+    <json_file without extension>.catalog.json
+    :param json_file: path of the JSON data file
+    :return:
+        file name (str)
+    """
+    return f'{os.path.splitext(os.fspath(json_file))[0]}.catalog.json'
+
+
+def read_json_users(json_file, catalog_file=None) -> List[dict] | None:
+    """
+    Return all users of a JSON data file in the shape the app reads them,
+    with their movies resolved from its movie catalog if it has one
+    :param json_file: path of the JSON data file
+    :param catalog_file: path of the movie catalog,
+        by default the one catalog_file_of gives for json_file
+    :return:
+        A list of dictionaries representing all the users |
+        None if json_file does not exist
+    """
+    catalog_file = catalog_file or catalog_file_of(json_file)
+    data_manager = JSONDataManager(json_file, 'user_id', record_type=User)
+    if os.path.exists(catalog_file):
+        catalog = MovieCatalog(JSONDataManager(catalog_file, 'imdb_id', record_type=Movie))
+        data_manager = CatalogDataManager(data_manager, catalog)
+    return Users(data_manager).get_all_users()
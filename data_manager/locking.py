@@ -0,0 +1,120 @@
+"""
+Locks for sharing a data source
+between threads and processes
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+COUNTER_WIDTH = 20
+
+
+class ReadWriteLock:
+    """
+    A lock held by many readers or one writer,
+    waiting writers are preferred over new readers
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read_locked(self):
+        """
+        Hold the lock shared for the with block
+        """
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        """
+        Hold the lock exclusively for the with block
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class FileLock:
+    """
+    An advisory lock on a lock file,
+    shared by all processes using the same lock file.
+    Without fcntl (Windows) only the in-process locks apply.
+
+    The lock file also holds a counter the lock holders
+    increment on every write, so every write has its own
+    generation even when the data file's stat repeats.
+    """
+    def __init__(self, lock_file):
+        self._lock_file = os.fspath(lock_file)
+
+    @contextmanager
+    def locked(self, shared=False):
+        """
+        Hold the file lock for the with block
+        :param shared: take a shared instead of an exclusive lock
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_file, 'a', encoding='utf-8') as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def read_counter(self) -> int:
+        """
+        Return the write counter stored in the lock file
+        :return:
+            int, 0 before the first write
+        """
+        try:
+            with open(self._lock_file, 'rb') as file:
+                content = file.read(COUNTER_WIDTH)
+        except FileNotFoundError:
+            return 0
+        return int(content) if content.strip() else 0
+
+    def increment_counter(self) -> int:
+        """
+        Increment the write counter,
+        the lock must be held exclusively
+        :return:
+            the new counter (int)
+        """
+        fd = os.open(self._lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        with open(fd, 'r+b') as file:
+            content = file.read(COUNTER_WIDTH)
+            counter = (int(content) if content.strip() else 0) + 1
+            file.seek(0)
+            # one fixed size write, readers never see a partial counter
+            file.write(b'%019d\n' % counter)
+        return counter
@@ -0,0 +1,75 @@
+"""
+Move the movies of a movies json file into a movie catalog
+usage:
+    python -m movieflix.data_manager.migrate_json_to_catalog data/movies.json
+then run the app with DATA_CATALOG set
+"""
+import argparse
+import os
+
+from movieflix.data_manager.file_utils import atomic_write
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.json_users import catalog_file_of, read_json_users
+from movieflix.data_manager.movie_catalog import CATALOG_FIELDS, MovieCatalog, imdb_id_of
+from movieflix.data_manager.records import Movie, User
+
+
+def migrate(json_file, catalog_file=None) -> int | None:
+    """
+    Store one catalog record per film of json_file's movies,
+    taking the details of its first movie, and rewrite the users
+    with references to the records and their own edits;
+    movies without an IMDb url stay whole. Films already
+    in the catalog keep their record, so the migration can be rerun
+    :param json_file: path of the json file
+    :param catalog_file: path of the movie catalog to create or update,
+        by default <json_file without extension>.catalog.json
+    :return:
+        number of migrated users (int) |
+        None if json_file does not exist
+    """
+    users = read_json_users(json_file, catalog_file)
+    if users is None:
+        return None
+    catalog_file = catalog_file or catalog_file_of(json_file)
+    if not os.path.exists(catalog_file):
+        atomic_write(catalog_file, b'[]')
+    catalog_data_manager = JSONDataManager(catalog_file, 'imdb_id', record_type=Movie)
+    catalog = MovieCatalog(catalog_data_manager)
+
+    records = {}
+    for user in users:
+        for movie in user.get('movies', []):
+            imdb_id = imdb_id_of(movie)
+            if imdb_id is not None and imdb_id not in records and catalog.get(imdb_id) is None:
+                records[imdb_id] = {'imdb_id': imdb_id,
+                                    **{key: movie[key] for key in CATALOG_FIELDS if key in movie}}
+    if records:
+        catalog_data_manager.put_items(list(records.values()))
+
+    stored_users = [{**user, 'movies': [catalog.reference(movie) for movie in user['movies']]}
+                    if 'movies' in user else user for user in users]
+    JSONDataManager(json_file, 'user_id', record_type=User).put_items(stored_users)
+    return len(stored_users)
+
+
+def main():
+    """
+    Parse the command line and run the migration
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('json_file', help='movies json file to migrate')
+    parser.add_argument('--catalog', help='movie catalog to create or update '
+                                          '(default: <json_file>.catalog.json)')
+    args = parser.parse_args()
+
+    migrated = migrate(args.json_file, args.catalog)
+    if migrated is None:
+        parser.error(f'{args.json_file} not found')
+    catalog_file = args.catalog or catalog_file_of(args.json_file)
+    print(f'Moved the movies of {migrated} users into {catalog_file}, '
+          f'run the app with DATA_CATALOG set')
+
+
+if __name__ == '__main__':
+    main()
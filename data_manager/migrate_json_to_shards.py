@@ -0,0 +1,53 @@
+"""
+Migrate a movies json file into a directory of user shards
+usage:
+    python -m movieflix.data_manager.migrate_json_to_shards data/movies.json data/users
+"""
+import argparse
+
+from movieflix.data_manager.json_users import read_json_users
+from movieflix.data_manager.sharded_data_manager import ShardedDataManager
+
+
+def migrate(json_file, directory, shard_count: int | None = 64,
+            catalog_file=None) -> int | None:
+    """
+    Import all users and movies of json_file,
+    with the details of catalog movies, into directory,
+    keeping their user_id and movie_id
+    :param json_file: path of the json file
+    :param directory: directory of the shards and the manifest
+    :param shard_count: number of shards | None for a file per user
+    :param catalog_file: path of the movie catalog of json_file,
+        by default <json_file without extension>.catalog.json if it exists
+    :return:
+        number of imported users (int) |
+        None if json_file does not exist
+    """
+    users = read_json_users(json_file, catalog_file)
+    if users is None:
+        return None
+    return ShardedDataManager(directory, shard_count).import_items(users)
+
+
+def main():
+    """
+    Parse the command line and run the migration
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('json_file', help='movies json file to import')
+    parser.add_argument('directory', help='shards directory to create or update')
+    parser.add_argument('--shards', type=int, default=64,
+                        help='number of shards, 0 for a file per user (default: 64)')
+    parser.add_argument('--catalog', help='movie catalog of the json file '
+                                          '(default: <json_file>.catalog.json if it exists)')
+    args = parser.parse_args()
+
+    imported = migrate(args.json_file, args.directory, args.shards or None, args.catalog)
+    if imported is None:
+        parser.error(f'{args.json_file} not found')
+    print(f'Imported {imported} users into {args.directory}')
+
+
+if __name__ == '__main__':
+    main()
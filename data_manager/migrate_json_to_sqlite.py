@@ -0,0 +1,53 @@
+"""
+Migrate a movies json file into a SQLite database
+usage:
+    python -m movieflix.data_manager.migrate_json_to_sqlite data/movies.json data/movies.db
+"""
+import argparse
+
+from movieflix.data_manager.json_users import read_json_users
+from movieflix.data_manager.sqlite_data_manager import SQLiteDataManager
+
+
+def migrate(json_file, database, catalog_file=None) -> int | None:
+    """
+    Import all users and movies of json_file,
+    with the details of catalog movies, into database,
+    keeping their user_id and movie_id
+    :param json_file: path of the json file
+    :param database: path of the SQLite database
+    :param catalog_file: path of the movie catalog of json_file,
+        by default <json_file without extension>.catalog.json if it exists
+    :return:
+        number of imported users (int) |
+        None if json_file does not exist
+    """
+    users = read_json_users(json_file, catalog_file)
+    if users is None:
+        return None
+    data_manager = SQLiteDataManager(database)
+    try:
+        return data_manager.import_items(users)
+    finally:
+        data_manager.close()
+
+
+def main():
+    """
+    Parse the command line and run the migration
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('json_file', help='movies json file to import')
+    parser.add_argument('database', help='SQLite database to create or update')
+    parser.add_argument('--catalog', help='movie catalog of the json file '
+                                          '(default: <json_file>.catalog.json if it exists)')
+    args = parser.parse_args()
+
+    imported = migrate(args.json_file, args.database, args.catalog)
+    if imported is None:
+        parser.error(f'{args.json_file} not found')
+    print(f'Imported {imported} users into {args.database}')
+
+
+if __name__ == '__main__':
+    main()
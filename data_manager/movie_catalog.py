@@ -0,0 +1,111 @@
+"""
+MovieCatalog class
+One shared record per film, keyed by imdbID,
+that users' movies refer to
+"""
+import re
+
+from .json_data_manager import JSONDataManager
+from .records import Movie
+
+CATALOG_FIELDS = ('name', 'director', 'year', 'rating', 'poster', 'website')
+IMDB_ID_PATTERN = re.compile(r'/title/(tt\d+)')
+
+
+def imdb_id_of(movie: dict) -> str | None:
+    """
+    Return the imdbID of a movie,
+    taken from its IMDb website url
+    :param movie: dict
+    :return:
+        imdbID (str) |
+        None if the movie has no IMDb url
+    """
+    match = IMDB_ID_PATTERN.search(movie.get('website') or '')
+    return match.group(1) if match else None
+
+
+class MovieCatalog:
+    """
+    A catalog of film records keyed by 'imdb_id',
+    stored by a JSONDataManager
+
+    Records hold the movie details fetched from OMDb only.
+    A user's movie is stored as a reference:
+    {'movie_id', 'imdb_id'} plus the fields in which
+    the user's movie differs from the catalog record,
+    such as the user's own rating.
+    Movies without an imdbID or a catalog record are stored whole.
+    """
+    def __init__(self, data_manager: JSONDataManager):
+        self._data_manager = data_manager
+
+    def get_generation(self):
+        """
+        Return a value that changes whenever the catalog changes
+        :return:
+            generation
+        """
+        return self._data_manager.get_generation()
+
+    def get(self, imdb_id: str) -> dict | None:
+        """
+        Return the record of a film
+        :param imdb_id: str
+        :return:
+            record (dict) |
+            None
+        """
+        return self._data_manager.get_item_by_id(imdb_id)
+
+    def put(self, movie_info: dict) -> str | None:
+        """
+        Store the catalog fields of OMDb movie info as the record of its film,
+        an unchanged record is not written again
+        :param movie_info: dict
+        :return:
+            imdbID (str) |
+            None if the movie has no imdbID
+        """
+        imdb_id = imdb_id_of(movie_info)
+        if imdb_id is None:
+            return None
+        record = {'imdb_id': imdb_id}
+        record.update({key: movie_info[key] for key in CATALOG_FIELDS if key in movie_info})
+        if self.get(imdb_id) != record:
+            self._data_manager.put_item(record)
+        return imdb_id
+
+    def reference(self, movie: dict) -> dict:
+        """
+        Return the reference to store for a user's movie,
+        the user's edits are kept as overrides of the catalog record
+        :param movie: dict
+        :return:
+            {'movie_id', 'imdb_id', overrides...} (dict) |
+            a copy of movie if it has no imdbID or its film is not in the catalog
+        """
+        imdb_id = imdb_id_of(movie)
+        record = self.get(imdb_id) if imdb_id is not None else None
+        if record is None:
+            return dict(movie)
+        reference = {'movie_id': movie['movie_id'], 'imdb_id': imdb_id}
+        reference.update({key: value for key, value in movie.items()
+                          if key not in reference
+                          and (key not in CATALOG_FIELDS or record.get(key) != value)})
+        return reference
+
+    def resolve(self, reference: dict) -> dict:
+        """
+        Return the user's movie a reference stands for
+        :param reference: dict
+        :return:
+            movie (Movie), the shape of a movie without catalog
+        """
+        record = self.get(reference['imdb_id']) if 'imdb_id' in reference else None
+        if record is None:
+            return reference
+        movie = Movie(movie_id=reference['movie_id'])
+        movie.update((key, value) for key, value in record.items() if key != 'imdb_id')
+        movie.update((key, value) for key, value in reference.items() if key != 'imdb_id')
+        return movie
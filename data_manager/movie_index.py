@@ -0,0 +1,247 @@
+"""
+UserMovieIndex class
+Indexing a user's list of movies by movie_id,
+by name, year and rating order
+and by the words of their names
+"""
+import re
+from bisect import bisect_left, bisect_right
+from typing import List
+
+from .item_index import ItemIndex
+
+SORT_KEYS = ('name', 'year', 'rating')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def _sort_value(movie: dict, key: str):
+    """
+    Return the value a movie is sorted by
+    :param movie: dict
+    :param key: 'name' | 'year' | 'rating'
+    :return:
+        casefolded name (str) | number (float) |
+        None if the movie has no usable value
+    """
+    value = movie.get(key)
+    if key == 'name':
+        return str(value).casefold() if value else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _words(text: str) -> List[str]:
+    """
+    Return the casefolded words of a text
+    :param text: str
+    :return:
+        words (List[str])
+    """
+    return WORD_PATTERN.findall(str(text).casefold())
+
+
+class UserMovieIndex(ItemIndex):
+    """
+    A movie_id -> list position index
+    and the highest movie_id
+    of one user's list of movies
+
+    The sort indexes (one per SORT_KEYS key), the word index
+    and the director index are built on first use and kept
+    until the movies change, so repeated queries neither
+    re-sort nor rescan the movies.
+    """
+    def __init__(self, movies: List[dict]):
+        super().__init__(movies, 'movie_id')
+        self._sort_indexes = {}
+        self._word_index = None
+        self._director_index = None
+
+    @property
+    def movies(self) -> List[dict]:
+        """
+        Return the indexed list of movies
+        :return:
+            movies (List[dict])
+        """
+        return self.items
+
+    def _invalidate_views(self):
+        """
+        Drop the sort, word and director indexes,
+        they are rebuilt on the next query
+        """
+        self._sort_indexes = {}
+        self._word_index = None
+        self._director_index = None
+
+    def copy(self, items: List[dict]):
+        """
+        Return an index of a copy of the movies,
+        without the sort, word and director indexes
+        """
+        index = super().copy(items)
+        index._invalidate_views()  # pylint: disable=protected-access
+        return index
+
+    def add(self, new_item: dict):
+        """
+        Append a movie and drop the query indexes
+        """
+        super().add(new_item)
+        self._invalidate_views()
+
+    def replace(self, position: int, item: dict):
+        """
+        Replace a movie and drop the query indexes
+        """
+        super().replace(position, item)
+        self._invalidate_views()
+
+    def remove(self, item_id) -> dict | None:
+        """
+        Remove a movie and drop the query indexes
+        """
+        item = super().remove(item_id)
+        self._invalidate_views()
+        return item
+
+    def _sort_index(self, key: str) -> tuple:
+        """
+        Return the sort index of key
+        :param key: 'name' | 'year' | 'rating'
+        :return:
+            (sorted values, their positions,
+             positions of movies without a value) (tuple)
+        """
+        sort_index = self._sort_indexes.get(key)
+        if sort_index is None:
+            keyed = []
+            missing = []
+            for position, movie in enumerate(self.items):
+                value = _sort_value(movie, key)
+                if value is None:
+                    missing.append(position)
+                else:
+                    keyed.append((value, position))
+            keyed.sort()
+            sort_index = ([value for value, _ in keyed],
+                          [position for _, position in keyed],
+                          missing)
+            self._sort_indexes[key] = sort_index
+        return sort_index
+
+    def _words_index(self) -> tuple:
+        """
+        Return the word index of the movie names
+        :return:
+            (sorted distinct words, {word: set of positions}) (tuple)
+        """
+        if self._word_index is None:
+            positions = {}
+            for position, movie in enumerate(self.items):
+                for word in _words(movie.get('name', '')):
+                    positions.setdefault(word, set()).add(position)
+            self._word_index = (sorted(positions), positions)
+        return self._word_index
+
+    def _directors_index(self) -> dict:
+        """
+        Return the director index
+        :return:
+            {casefolded director: set of positions} (dict)
+        """
+        if self._director_index is None:
+            self._director_index = {}
+            for position, movie in enumerate(self.items):
+                director = str(movie.get('director') or '').casefold()
+                self._director_index.setdefault(director, set()).add(position)
+        return self._director_index
+
+    def _range_positions(self, key: str, low=None, high=None) -> set:
+        """
+        Return the positions of movies with low <= value <= high
+        :param key: 'name' | 'year' | 'rating'
+        :param low: lowest value or None
+        :param high: highest value or None
+        :return:
+            positions (set)
+        """
+        values, positions, _ = self._sort_index(key)
+        start = bisect_left(values, low) if low is not None else 0
+        end = bisect_right(values, high) if high is not None else len(values)
+        return set(positions[start:end])
+
+    def _search_positions(self, text: str) -> set:
+        """
+        Return the positions of movies with a name word
+        starting with each word of text
+        :param text: str
+        :return:
+            positions (set)
+        """
+        words, word_positions = self._words_index()
+        matches = None
+        for query_word in _words(text):
+            start = bisect_left(words, query_word)
+            end = bisect_left(words, query_word + '\uffff', start)
+            positions = set().union(*(word_positions[word] for word in words[start:end]))
+            matches = positions if matches is None else matches & positions
+        return matches if matches is not None else set(range(len(self.items)))
+
+    def _prefix_positions(self, prefix: str) -> set:
+        """
+        Return the positions of movies with a name starting with prefix
+        :param prefix: str
+        :return:
+            positions (set)
+        """
+        prefix = prefix.casefold()
+        values, positions, _ = self._sort_index('name')
+        start = bisect_left(values, prefix)
+        end = bisect_left(values, prefix + '\uffff', start)
+        return set(positions[start:end])
+
+    def query(self, sort: str | None = None, descending: bool = False,
+              year_from=None, year_to=None, min_rating=None,
+              director: str | None = None, search: str | None = None,
+              prefix: str | None = None) -> List[int]:
+        """
+        Return the positions of the movies matching all given filters
+        :param sort: 'name' | 'year' | 'rating' | None for list order
+        :param descending: reverse the sort order,
+            movies without a value stay last
+        :param year_from: lowest year
+        :param year_to: highest year
+        :param min_rating: lowest rating
+        :param director: director name, case insensitive
+        :param search: words the name words start with, e.g. 'dark kni'
+        :param prefix: start of the name
+        :return:
+            positions in self.movies (List[int])
+        """
+        filters = []
+        if year_from is not None or year_to is not None:
+            filters.append(self._range_positions('year', year_from, year_to))
+        if min_rating is not None:
+            filters.append(self._range_positions('rating', min_rating))
+        if director:
+            filters.append(self._directors_index().get(director.casefold(), set()))
+        if search:
+            filters.append(self._search_positions(search))
+        if prefix:
+            filters.append(self._prefix_positions(prefix))
+        matches = set.intersection(*filters) if filters else None
+
+        if sort is None:
+            if matches is None:
+                return list(range(len(self.items)))
+            return sorted(matches)
+
+        _, ordered, missing = self._sort_index(sort)
+        ordered = ordered[::-1] if descending else ordered
+        if matches is None:
+            return ordered + missing
+        return [position for position in ordered + missing if position in matches]
@@ -0,0 +1,58 @@
+"""
+Pagination of lists of items
+by offset or by cursor
+"""
+from typing import Callable, List
+
+
+def make_page(items: List[dict], total: int, offset: int, limit: int, id_key: str) -> dict:
+    """
+    Return a page of items with the offsets
+    and cursor of the neighbouring pages
+    :param items: the items of the page
+    :param total: number of items of all pages
+    :param offset: position of the first item of the page
+    :param limit: page size
+    :param id_key: str
+    :return:
+        {'items', 'total', 'offset', 'limit',
+         'prev_offset', 'next_offset', 'next_after'} (dict),
+            prev_offset, next_offset and next_after are None
+            when there is no previous or next page
+    """
+    has_next = offset + len(items) < total
+    return {'items': items,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'prev_offset': max(offset - limit, 0) if offset > 0 else None,
+            'next_offset': offset + len(items) if has_next else None,
+            'next_after': items[-1][id_key] if has_next and items else None}
+
+
+def paginate(items: List[dict], id_key: str, limit: int, offset: int = 0, after=None,
+             find_position: Callable | None = None) -> dict:
+    """
+    Return a page of items,
+    starting at offset or right after the item with id after
+    :param items: all items, ordered by increasing id
+    :param id_key: str
+    :param limit: page size
+    :param offset: position of the first item
+    :param after: id of the last item of the previous page,
+        takes precedence over offset
+    :param find_position: function(id) -> position | None,
+        e.g. ItemIndex.find_position, otherwise items are scanned
+    :return:
+        page (dict), see make_page
+    """
+    if after is not None:
+        position = find_position(after) if find_position else None
+        if position is not None:
+            offset = position + 1
+        else:
+            # the cursor item is gone, continue at the next higher id
+            offset = next((position for position, item in enumerate(items)
+                           if item[id_key] > after), len(items))
+    offset = min(max(offset, 0), len(items))
+    return make_page(items[offset:offset + limit], len(items), offset, limit, id_key)
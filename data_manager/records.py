@@ -0,0 +1,210 @@
+"""
+User and Movie record classes
+Compact in-memory records of the users and movies
+read from JSON, used like the dicts they are stored as
+"""
+from collections.abc import Mapping
+
+MOVIE_FIELDS = ('movie_id', 'name', 'director', 'year', 'rating', 'poster', 'website',
+                'imdb_id')
+USER_FIELDS = ('user_id', 'name', 'movies')
+
+
+class Record(Mapping):
+    """
+    A record keeping its fields in __slots__
+    instead of a per record dict
+
+    Records are read and updated like dicts:
+    a field that is not set is a missing key, keys that are
+    not fields are kept in a small extra dict.
+    Templates read fields and extra keys as attributes (movie.name).
+    """
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, data=(), **fields):
+        self._extra = None
+        self.update(data, **fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Return the record of a dict,
+        a record of this class is returned as is
+        :param data: dict
+        :return:
+            record (same type as cls)
+        """
+        if type(data) is cls:  # pylint: disable=unidiomatic-typecheck
+            return data
+        record = cls.__new__(cls)
+        record._extra = None
+        field_set = cls._FIELD_SET
+        for key, value in data.items():
+            if key in field_set:
+                setattr(record, key, value)
+            else:
+                record[key] = value
+        return record
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __getattr__(self, name):
+        # only called for names that are not set fields
+        extra = object.__getattribute__(self, '_extra')
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._fields_dict())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self._fields_dict()!r})'
+
+    def get(self, key, default=None):
+        """
+        Return the value of key or default
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, data=(), **fields):
+        """
+        Set the keys of data and fields, like dict.update
+        """
+        items = data.items() if isinstance(data, Mapping) else data
+        for key, value in items:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def _fields_dict(self) -> dict:
+        """
+        Return the keys and values of the record as a dict
+        :return:
+            dict
+        """
+        data = {}
+        for field in self.FIELDS:
+            try:
+                # skips __getattr__ for fields that are not set
+                data[field] = object.__getattribute__(self, field)
+            except AttributeError:
+                pass
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def to_dict(self) -> dict:
+        """
+        Return the record as a dict
+        :return:
+            dict
+        """
+        return self._fields_dict()
+
+
+class Movie(Record):
+    """
+    A user's movie or a movie catalog record
+    """
+    __slots__ = MOVIE_FIELDS
+    FIELDS = MOVIE_FIELDS
+
+
+class User(Record):
+    """
+    A user with a list of Movie records
+    """
+    __slots__ = USER_FIELDS
+    FIELDS = USER_FIELDS
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Return the user record of a dict,
+        with Movie records
+        :param data: dict
+        :return:
+            User
+        """
+        user = super().from_dict(data)
+        if user is not data and 'movies' in data:
+            user['movies'] = data['movies']
+        return user
+
+    def __setitem__(self, key, value):
+        if key == 'movies' and not all(type(movie) is Movie  # pylint: disable=unidiomatic-typecheck
+                                       for movie in value):
+            value = [Movie.from_dict(movie) for movie in value]
+        super().__setitem__(key, value)
+
+    def to_dict(self) -> dict:
+        """
+        Return the user as a dict of plain dicts
+        :return:
+            dict
+        """
+        user = self._fields_dict()
+        if 'movies' in user:
+            user['movies'] = [movie.to_dict() for movie in user['movies']]
+        return user
+
+
+def record_to_json(value):
+    """
+    json.dumps default function
+    writing records as JSON objects
+    :param value: object json cannot serialize itself
+    :return:
+        dict
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {value.__class__.__name__} is not JSON serializable')
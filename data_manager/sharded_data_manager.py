@@ -0,0 +1,249 @@
+"""
+ShardedDataManager class implemented DataManagerInterface
+for managing users stored in many small json files
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import List
+
+from .data_manager_interface import DataManagerInterface
+from .file_utils import atomic_create
+from .item_index import ItemIndex
+from .json_data_manager import JSONDataManager, DURABILITY_ALWAYS
+from .pagination import paginate
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FIELDS = ('user_id', 'name')
+
+
+class ShardedDataManager(DataManagerInterface):
+    """
+    A users data manager keeping each bucket of users
+    in its own JSON file in directory, plus a manifest
+    of the users' ids and names
+
+    A user is stored in shard user_id % shard_count
+    (shard-<bucket>.json), with shard_count=None every user
+    has a file of its own (user-<user_id>.json).
+    Every shard is a JSONDataManager with its own locks,
+    so reading or writing a user parses and rewrites only
+    the user's shard and writers of different shards do
+    not wait for each other.
+
+    The manifest is enough for the users listing: get_page
+    returns the users' manifest entries, without movies.
+    It also allocates new user ids. A new user is listed in
+    the manifest before its shard is written, a deleted user
+    is removed from the manifest first.
+
+    get_generation(user_id) is the generation of the user's
+    shard, so a user's update only conflicts with writes
+    to the same shard, get_generation() the generation of
+    the manifest, the version of the users listing.
+    The data managers of the last max_open_shards shards
+    used are kept.
+    """
+    def __init__(self, directory, shard_count: int | None = 64, cache=False,
+                 durability=DURABILITY_ALWAYS, record_type=None, codec='auto',
+                 max_open_shards=256):
+        if shard_count is not None and shard_count < 1:
+            raise ValueError('shard_count must be a positive number or None')
+        self._directory = os.fspath(directory)
+        self._shard_count = shard_count
+        self._options = {'cache': cache,
+                         'durability': durability,
+                         'record_type': record_type,
+                         'codec': codec}
+        self._max_open_shards = max_open_shards
+        self._shards = OrderedDict()
+        self._shards_lock = threading.Lock()
+        self._manifest_index = None
+
+        os.makedirs(self._directory, exist_ok=True)
+        manifest_file = os.path.join(self._directory, MANIFEST_FILE)
+        atomic_create(manifest_file, b'[]')
+        self._manifest = JSONDataManager(manifest_file, 'user_id', **self._options)
+
+    def _shard_name(self, user_id) -> str:
+        """
+        Return the file name of the shard storing a user
+        :param user_id: int
+        :return:
+            file name (str)
+        """
+        if self._shard_count is None:
+            return f'user-{user_id}.json'
+        return f'shard-{user_id % self._shard_count:03d}.json'
+
+    def _shard(self, user_id, create=False) -> JSONDataManager:
+        """
+        Return the data manager of the shard storing a user,
+        evicting the least recently used shard managers
+        :param user_id: int
+        :param create: create the shard file if it does not exist
+        :return:
+            JSONDataManager
+        """
+        shard_name = self._shard_name(user_id)
+        with self._shards_lock:
+            shard = self._shards.get(shard_name)
+            if shard is None:
+                shard = JSONDataManager(os.path.join(self._directory, shard_name),
+                                        'user_id', **self._options)
+                self._shards[shard_name] = shard
+            self._shards.move_to_end(shard_name)
+            while len(self._shards) > self._max_open_shards:
+                # an evicted shard still in use keeps working, its file lock
+                # and write counter are shared with a new manager of the shard
+                self._shards.popitem(last=False)
+        if create:
+            atomic_create(os.path.join(self._directory, shard_name), b'[]')
+        return shard
+
+    @staticmethod
+    def _summary(user: dict) -> dict:
+        """
+        Return the manifest entry of a user
+        :param user: dict
+        :return:
+            {'user_id', 'name'} (dict)
+        """
+        return {key: user[key] for key in MANIFEST_FIELDS if key in user}
+
+    def get_generation(self, item_id=None) -> tuple | None:
+        """
+        Return the generation of a user's shard,
+        or of the manifest, which changes with every
+        added, renamed or deleted user
+        :param item_id: user_id | None for the users listing
+        :return:
+            generation (tuple) |
+            None if the shard or the manifest does not exist
+        """
+        if item_id is not None:
+            return self._shard(item_id).get_generation()
+        return self._manifest.get_generation()
+
+    def get_all_data(self) -> List[dict] | None:
+        """
+        Return a list of all users with their movies,
+        read from every shard
+        :return:
+            A list of dictionaries representing all the users
+        """
+        summaries = self._manifest.get_all_data()
+        if summaries is None:
+            return None
+        users = []
+        for summary in summaries:
+            user = self._shard(summary['user_id']).get_item_by_id(summary['user_id'])
+            if user is not None:
+                users.append(user)
+        return users
+
+    def get_page(self, limit: int, offset: int = 0, after=None) -> dict | None:
+        """
+        Return a page of the users' manifest entries,
+        {'user_id', 'name'} without movies, no shard is read
+        :param limit: page size
+        :param offset: position of the first user
+        :param after: user_id of the last user of the previous page
+        :return:
+            page (dict), see pagination.make_page |
+            None
+        """
+        summaries = self._manifest.get_all_data()
+        if summaries is None:
+            return None
+        index = self._manifest_index
+        if index is None or not index.is_valid_for(summaries):
+            index = ItemIndex(summaries, 'user_id')
+            self._manifest_index = index
+        return paginate(summaries, 'user_id', limit, offset, after, index.find_position)
+
+    def get_item_by_id(self, item_id) -> dict | None:
+        """
+        Return the specific user
+        given user_id, read from its shard
+        :return:
+            user (dict) |
+            None
+        """
+        return self._shard(item_id).get_item_by_id(item_id)
+
+    def generate_new_id(self, items: list, key=None) -> int:
+        """
+        Return 1 if items is empty
+        otherwise, return the highest id_key plus 1
+        :param items: list
+        :param key: str
+        :return:
+            new item id (int) |
+            1 if items is empty (int)
+        """
+        return self._manifest.generate_new_id(items, key)
+
+    def add_item(self, new_item: dict) -> bool:
+        """
+        Add a new user to the manifest, which allocates its id,
+        and to its shard
+        :param new_item: (dict)
+        :return:
+            Successfully add user, True (bool)
+        """
+        summary = self._summary(new_item)
+        self._manifest.add_item(summary)
+        new_item['user_id'] = summary['user_id']
+        self._shard(new_item['user_id'], create=True).put_item(new_item)
+        return True
+
+    def update_item(self, updated_item: dict, expected_generation=None) -> bool | None:
+        """
+        Update a user in its shard,
+        and in the manifest if its name changed
+        :param updated_item: dict
+        :param expected_generation: generation of the user's shard
+            the update was based on, StaleDataError is raised
+            if the shard changed since
+        :return:
+            True for success update user (bool) |
+            None
+        """
+        user_id = updated_item['user_id']
+        if not self._shard(user_id).update_item(updated_item, expected_generation):
+            return None
+        summary = self._manifest.get_item_by_id(user_id)
+        if 'name' in updated_item and (summary is None or summary['name'] != updated_item['name']):
+            self._manifest.update_item(self._summary(updated_item))
+        return True
+
+    def delete_item(self, item_id: int) -> bool | None:
+        """
+        Delete a user from the manifest and its shard,
+        an emptied shard file is kept
+        :param item_id: int
+        :return:
+            True for success delete user (bool) |
+            None
+        """
+        if not self._manifest.delete_item(item_id):
+            return None
+        self._shard(item_id).delete_item(item_id)
+        return True
+
+    def import_items(self, items: List[dict]) -> int:
+        """
+        Add or replace users with their user_id and movies,
+        writing each shard and the manifest once
+        :param items: List[dict]
+        :return:
+            number of imported users (int)
+        """
+        shards = {}
+        for item in items:
+            shards.setdefault(self._shard_name(item['user_id']), []).append(item)
+        for shard_items in shards.values():
+            self._shard(shard_items[0]['user_id'], create=True).put_items(shard_items)
+        self._manifest.put_items([self._summary(item) for item in items])
+        return len(items)
@@ -0,0 +1,366 @@
+"""
+SQLiteDataManager class implemented DataManagerInterface
+for managing users and their movies in a SQLite database
+"""
+import json
+import sqlite3
+import threading
+from typing import List
+
+from .data_manager_interface import DataManagerInterface, StaleDataError
+from .pagination import make_page
+
+USER_FIELDS = ('user_id', 'name')
+MOVIE_FIELDS = ('movie_id', 'name', 'director', 'year', 'rating', 'poster', 'website')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS movies (
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    movie_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    director TEXT NOT NULL DEFAULT '',
+    year INTEGER NOT NULL DEFAULT 0,
+    rating REAL NOT NULL DEFAULT 0.0,
+    poster TEXT NOT NULL DEFAULT '',
+    website TEXT NOT NULL DEFAULT '',
+    extra TEXT,
+    PRIMARY KEY (user_id, movie_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+SELECT_USERS = 'SELECT user_id, name, extra FROM users ORDER BY user_id'
+SELECT_USER = 'SELECT user_id, name, extra FROM users WHERE user_id = ?'
+SELECT_USERS_PAGE = ('SELECT user_id, name, extra FROM users '
+                     'ORDER BY user_id LIMIT ? OFFSET ?')
+SELECT_USERS_AFTER = ('SELECT user_id, name, extra FROM users WHERE user_id > ? '
+                      'ORDER BY user_id LIMIT ?')
+COUNT_USERS = 'SELECT COUNT(*) FROM users'
+COUNT_USERS_UP_TO = 'SELECT COUNT(*) FROM users WHERE user_id <= ?'
+SELECT_MOVIES_BETWEEN = ('SELECT user_id, movie_id, name, director, year, rating, poster, '
+                         'website, extra FROM movies WHERE user_id BETWEEN ? AND ? '
+                         'ORDER BY user_id, movie_id')
+SELECT_MOVIES = ('SELECT user_id, movie_id, name, director, year, rating, poster, website, extra '
+                 'FROM movies ORDER BY user_id, movie_id')
+SELECT_USER_MOVIES = ('SELECT user_id, movie_id, name, director, year, rating, poster, website, '
+                      'extra FROM movies WHERE user_id = ? ORDER BY movie_id')
+INSERT_USER = 'INSERT INTO users (user_id, name, extra) VALUES (?, ?, ?)'
+UPDATE_USER = 'UPDATE users SET name = ?, extra = ? WHERE user_id = ?'
+DELETE_USER = 'DELETE FROM users WHERE user_id = ?'
+INSERT_MOVIE = ('INSERT INTO movies (user_id, movie_id, name, director, year, rating, poster, '
+                'website, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+UPDATE_MOVIE = ('UPDATE movies SET name = ?, director = ?, year = ?, rating = ?, poster = ?, '
+                'website = ?, extra = ? WHERE user_id = ? AND movie_id = ?')
+DELETE_MOVIE = 'DELETE FROM movies WHERE user_id = ? AND movie_id = ?'
+SELECT_GENERATION = "SELECT value FROM meta WHERE key = 'generation'"
+BUMP_GENERATION = "UPDATE meta SET value = value + 1 WHERE key = 'generation'"
+
+
+def _extra(record: dict, fields: tuple) -> str | None:
+    """
+    Return the keys of record that have no column as json
+    :param record: dict
+    :param fields: column names
+    :return:
+        json object (str) |
+        None if every key has a column
+    """
+    extra = {key: value for key, value in record.items()
+             if key not in fields and key != 'movies'}
+    return json.dumps(extra) if extra else None
+
+
+def _movie_row(user_id: int, movie: dict) -> tuple:
+    """
+    Return the movies table row of a movie dict
+    :param user_id: int
+    :param movie: dict
+    :return:
+        row values in INSERT_MOVIE order (tuple)
+    """
+    return (user_id,
+            movie['movie_id'],
+            movie.get('name', ''),
+            movie.get('director', ''),
+            movie.get('year', 0),
+            movie.get('rating', 0.0),
+            movie.get('poster', ''),
+            movie.get('website', ''),
+            _extra(movie, MOVIE_FIELDS))
+
+
+def _movie_dict(row: tuple) -> dict:
+    """
+    Return the movie dict of a movies table row
+    :param row: row values in SELECT_MOVIES order
+    :return:
+        movie (dict)
+    """
+    movie = dict(zip(MOVIE_FIELDS, row[1:8]))
+    if row[8]:
+        movie.update(json.loads(row[8]))
+    return movie
+
+
+def _user_dict(row: tuple, movies: List[dict]) -> dict:
+    """
+    Return the user dict of a users table row
+    :param row: row values in SELECT_USERS order
+    :param movies: the user's movies
+    :return:
+        user (dict)
+    """
+    user = {'user_id': row[0], 'name': row[1]}
+    if row[2]:
+        user.update(json.loads(row[2]))
+    user['movies'] = movies
+    return user
+
+
+class SQLiteDataManager(DataManagerInterface):
+    """
+    A class for managing users and movies
+    in normalized users and movies tables
+
+    Items have the same shape as the JSON file:
+    a user dict with a nested list of movie dicts.
+    Keys without a column are kept as json in the extra columns.
+    Movies are keyed by (user_id, movie_id), the primary key
+    also serves lookups of all movies of a user_id.
+
+    Each thread has its own connection; the database is
+    in WAL mode so readers are not blocked by a writer.
+    Queries are constant SQL strings with parameters,
+    which sqlite3 prepares once and reuses per connection.
+    Every write transaction increments the generation
+    stored in the meta table.
+    """
+    def __init__(self, database, timeout=5.0):
+        self._database = database
+        self._timeout = timeout
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return the connection of the current thread
+        :return:
+            sqlite3.Connection
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._database,
+                                         timeout=self._timeout,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """
+        Close the connection of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def get_generation(self, item_id=None) -> int:
+        """
+        Return the number of committed write transactions
+        :param item_id: unused, the counter covers all users
+        :return:
+            generation (int)
+        """
+        return self._connection().execute(SELECT_GENERATION).fetchone()[0]
+
+    def get_all_data(self) -> List[dict] | None:
+        """
+        Return a list of all users with their movies
+        :return:
+            A list of dictionaries representing all the users
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            movies_by_user = {}
+            for row in connection.execute(SELECT_MOVIES):
+                movies_by_user.setdefault(row[0], []).append(_movie_dict(row))
+            return [_user_dict(row, movies_by_user.get(row[0], []))
+                    for row in connection.execute(SELECT_USERS)]
+
+    def get_item_by_id(self, item_id) -> dict | None:
+        """
+        Return the specific user
+        given user_id
+        :return:
+            user (dict) |
+            None
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            row = connection.execute(SELECT_USER, (item_id,)).fetchone()
+            if row is None:
+                return None
+            movies = [_movie_dict(movie_row)
+                      for movie_row in connection.execute(SELECT_USER_MOVIES, (item_id,))]
+            return _user_dict(row, movies)
+
+    def get_page(self, limit: int, offset: int = 0, after=None) -> dict:
+        """
+        Return a page of users with their movies,
+        reading only the users and movies of the page
+        :param limit: page size
+        :param offset: position of the first user
+        :param after: user_id of the last user of the previous page
+        :return:
+            page (dict), see pagination.make_page
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            total = connection.execute(COUNT_USERS).fetchone()[0]
+            if after is not None:
+                offset = connection.execute(COUNT_USERS_UP_TO, (after,)).fetchone()[0]
+                rows = connection.execute(SELECT_USERS_AFTER, (after, limit)).fetchall()
+            else:
+                offset = min(max(offset, 0), total)
+                rows = connection.execute(SELECT_USERS_PAGE, (limit, offset)).fetchall()
+            movies_by_user = {}
+            if rows:
+                for row in connection.execute(SELECT_MOVIES_BETWEEN, (rows[0][0], rows[-1][0])):
+                    movies_by_user.setdefault(row[0], []).append(_movie_dict(row))
+            users = [_user_dict(row, movies_by_user.get(row[0], [])) for row in rows]
+            return make_page(users, total, offset, limit, 'user_id')
+
+    def generate_new_id(self, items: list, key=None) -> int:
+        """
+        Return 1 if items is empty
+        otherwise, return the highest id_key plus 1
+        :param items: list
+        :param key: str
+        :return:
+            new item id (int) |
+            1 if items is empty (int)
+        """
+        if items:
+            return max(item[key or 'user_id'] for item in items) + 1
+        return 1
+
+    def add_item(self, new_item: dict) -> bool:
+        """
+        Add new user and its movies
+        :param new_item: (dict)
+        :return:
+            Successfully add user, True (bool)
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            new_id = connection.execute(
+                'SELECT COALESCE(MAX(user_id), 0) + 1 FROM users').fetchone()[0]
+            new_item.update({'user_id': new_id})
+            connection.execute(INSERT_USER, (new_id, new_item['name'],
+                                             _extra(new_item, USER_FIELDS)))
+            connection.executemany(INSERT_MOVIE, [_movie_row(new_id, movie)
+                                                  for movie in new_item.get('movies', [])])
+            connection.execute(BUMP_GENERATION)
+        return True
+
+    def update_item(self, updated_item: dict, expected_generation=None) -> bool | None:
+        """
+        Update user with updated_item,
+        only the movie rows that changed are written
+        :param updated_item: dict
+        :param expected_generation: generation the update was based on,
+            StaleDataError is raised if the database changed since
+        :return:
+            True for success update user (bool) |
+            None
+        """
+        user_id = updated_item['user_id']
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if expected_generation is not None and \
+                    expected_generation != connection.execute(SELECT_GENERATION).fetchone()[0]:
+                raise StaleDataError(f'{self._database} changed since it was read')
+            row = connection.execute(SELECT_USER, (user_id,)).fetchone()
+            if row is None:
+                return None
+            user = _user_dict(row, [])
+            user.update(updated_item)
+            if (user['name'], _extra(user, USER_FIELDS)) != row[1:]:
+                connection.execute(UPDATE_USER, (user['name'],
+                                                 _extra(user, USER_FIELDS), user_id))
+            if 'movies' in updated_item:
+                self._update_movies(connection, user_id, updated_item['movies'])
+            connection.execute(BUMP_GENERATION)
+        return True
+
+    @staticmethod
+    def _update_movies(connection: sqlite3.Connection, user_id: int, movies: List[dict]):
+        """
+        Insert, update and delete the movie rows of a user
+        so they match movies
+        :param connection: sqlite3.Connection
+        :param user_id: int
+        :param movies: List[dict]
+        """
+        existing = {row[1]: row for row in connection.execute(SELECT_USER_MOVIES, (user_id,))}
+        for movie in movies:
+            row = _movie_row(user_id, movie)
+            existing_row = existing.pop(movie['movie_id'], None)
+            if existing_row is None:
+                connection.execute(INSERT_MOVIE, row)
+            elif existing_row != row:
+                connection.execute(UPDATE_MOVIE, row[2:] + (user_id, movie['movie_id']))
+        connection.executemany(DELETE_MOVIE, [(user_id, movie_id) for movie_id in existing])
+
+    def delete_item(self, item_id: int) -> bool | None:
+        """
+        Delete a user and its movies based on user_id
+        :param item_id: int
+        :return:
+            True for success delete user (bool) |
+            None
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if connection.execute(DELETE_USER, (item_id,)).rowcount:
+                connection.execute(BUMP_GENERATION)
+                return True
+        return None
+
+    def import_items(self, items: List[dict]) -> int:
+        """
+        Insert or replace users with their user_id and movies
+        in one transaction
+        :param items: List[dict]
+        :return:
+            number of imported users (int)
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for item in items:
+                connection.execute(DELETE_USER, (item['user_id'],))
+                connection.execute(INSERT_USER, (item['user_id'], item['name'],
+                                                 _extra(item, USER_FIELDS)))
+                connection.executemany(INSERT_MOVIE, [_movie_row(item['user_id'], movie)
+                                                      for movie in item.get('movies', [])])
+            connection.execute(BUMP_GENERATION)
+        return len(items)
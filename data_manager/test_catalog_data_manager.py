@@ -0,0 +1,139 @@
+"""
+Test CatalogDataManager and MovieCatalog using pytest
+"""
+import json
+
+from movieflix.data_manager.catalog_data_manager import CatalogDataManager
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.json_users import read_json_users
+from movieflix.data_manager.migrate_json_to_catalog import migrate
+from movieflix.data_manager.movie_catalog import MovieCatalog, imdb_id_of
+from movieflix.data_manager.test_json_data_manager import create_test_file
+from movieflix.data_manager.users import Users
+
+TITANIC = {"name": "Titanic",
+           "director": "James Cameron",
+           "year": 1997,
+           "rating": 7.9,
+           "poster": "https://m.media-amazon.com/images/M/titanic.jpg",
+           "website": "https://www.imdb.com/title/tt0120338"}
+
+
+def create_test_users(tmp_path) -> Users:
+    """
+    Two test users stored with a movie catalog are created
+    """
+    create_test_file(tmp_path / 'movies.json')
+    (tmp_path / 'catalog.json').write_text('[]', encoding='utf-8')
+    catalog = MovieCatalog(JSONDataManager(tmp_path / 'catalog.json', 'imdb_id', cache=True))
+    return Users(CatalogDataManager(JSONDataManager(tmp_path / 'movies.json', 'user_id',
+                                                    cache=True), catalog))
+
+
+def test_imdb_id_of():
+    """
+    Test the imdbID is taken from the IMDb website url
+    """
+    assert imdb_id_of(TITANIC) == 'tt0120338'
+    assert imdb_id_of({"website": "https://www.imdb.com/title/"}) is None
+    assert imdb_id_of({"name": "Titanic"}) is None
+
+
+def test_movies_are_stored_once(tmp_path):
+    """
+    Test users hold references to one catalog record
+    and read their movies in the usual shape
+    """
+    users = create_test_users(tmp_path)
+    users.data_manager.catalog.put(dict(TITANIC))
+    users.add_user_movie(2, dict(TITANIC, rating=10.0))
+    users.add_user_movie(1, dict(TITANIC))
+    users.add_user_movie(2, {"name": "Unknown", "website": ""})
+
+    stored = json.loads((tmp_path / 'movies.json').read_text(encoding='utf-8'))
+    assert stored[0]['movies'] == [{"movie_id": 1, "imdb_id": "tt0120338"}]
+    assert stored[1]['movies'] == [{"movie_id": 1, "imdb_id": "tt0120338", "rating": 10.0},
+                                   {"movie_id": 2, "name": "Unknown", "website": ""}]
+    assert len(json.loads((tmp_path / 'catalog.json').read_text(encoding='utf-8'))) == 1
+
+    assert users.get_user_movie(1, 1) == dict(TITANIC, movie_id=1)
+    assert users.get_user_movie(2, 1) == dict(TITANIC, movie_id=1, rating=10.0)
+    assert users.get_user_movie(2, 2) == {"movie_id": 2, "name": "Unknown", "website": ""}
+
+
+def test_catalog_update_reaches_all_users(tmp_path):
+    """
+    Test one catalog update changes the film for every user,
+    keeping the users' own overrides
+    """
+    users = create_test_users(tmp_path)
+    users.data_manager.catalog.put(dict(TITANIC))
+    users.add_user_movie(1, dict(TITANIC))
+    users.add_user_movie(2, dict(TITANIC, rating=10.0))
+    movies = users.get_user_movies(1)
+
+    users.data_manager.catalog.put(dict(TITANIC, rating=8.0, year=1998))
+    assert users.get_user_movie(1, 1)['rating'] == 8.0
+    assert users.get_user_movie(2, 1)['rating'] == 10.0
+    assert users.get_user_movie(2, 1)['year'] == 1998
+    assert users.get_user_movies(1) is not movies
+    assert users.get_user_movies(1) is users.get_user_movies(1)
+
+
+def test_user_edits_do_not_seed_the_catalog(tmp_path):
+    """
+    Test a movie whose film is not in the catalog is stored whole,
+    so a user's edit never becomes the film's record
+    """
+    users = create_test_users(tmp_path)
+    users.add_user_movie(1, dict(TITANIC, rating=10.0))
+
+    stored = json.loads((tmp_path / 'movies.json').read_text(encoding='utf-8'))
+    assert stored[0]['movies'] == [dict(TITANIC, movie_id=1, rating=10.0)]
+    assert users.data_manager.catalog.get('tt0120338') is None
+
+    users.data_manager.catalog.put(dict(TITANIC))
+    users.add_user_movie(2, dict(TITANIC))
+    assert users.get_user_movie(1, 1)['rating'] == 10.0
+    assert users.get_user_movie(2, 1)['rating'] == 7.9
+
+
+def test_unchanged_record_is_not_written(tmp_path):
+    """
+    Test putting the same OMDb details again does not write the catalog
+    """
+    users = create_test_users(tmp_path)
+    catalog = users.data_manager.catalog
+    catalog.put(dict(TITANIC))
+    generation = catalog.get_generation()
+    assert catalog.put(dict(TITANIC)) == 'tt0120338'
+    assert catalog.get_generation() == generation
+
+
+def test_migrate_to_catalog(tmp_path):
+    """
+    Test migrating a json file stores one record per film,
+    users keep references with their own edits and read the same movies,
+    and a rerun changes nothing
+    """
+    json_file = tmp_path / 'movies.json'
+    users = [{"user_id": 1, "name": "Sharon", "movies": [dict(TITANIC, movie_id=1)]},
+             {"user_id": 2, "name": "Alice",
+              "movies": [dict(TITANIC, movie_id=1, rating=10.0),
+                         {"movie_id": 2, "name": "Unknown", "website": ""}]}]
+    json_file.write_text(json.dumps(users), encoding='utf-8')
+
+    assert migrate(json_file) == 2
+    stored = json.loads(json_file.read_text(encoding='utf-8'))
+    assert stored[0]['movies'] == [{"movie_id": 1, "imdb_id": "tt0120338"}]
+    assert stored[1]['movies'] == [{"movie_id": 1, "imdb_id": "tt0120338", "rating": 10.0},
+                                   {"movie_id": 2, "name": "Unknown", "website": ""}]
+    catalog_file = tmp_path / 'movies.catalog.json'
+    assert json.loads(catalog_file.read_text(encoding='utf-8')) == \
+           [dict(TITANIC, imdb_id="tt0120338")]
+    assert read_json_users(json_file) == users
+
+    content = (json_file.read_bytes(), catalog_file.read_bytes())
+    assert migrate(json_file) == 2
+    assert (json_file.read_bytes(), catalog_file.read_bytes()) == content
+    assert migrate(tmp_path / 'missing.json') is None
@@ -0,0 +1,121 @@
+"""
+Test JournaledJSONDataManager using pytest
+"""
+import json
+
+from movieflix.data_manager.journaled_data_manager import JournaledJSONDataManager
+from movieflix.data_manager.test_json_data_manager import create_test_file
+
+
+def read_json(file_path):
+    """
+    Return the content of a json file
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def test_changes_are_appended_to_journal(tmp_path):
+    """
+    Test add, update and delete append to the journal
+    and leave the snapshot untouched
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JournaledJSONDataManager(file_path, 'user_id')
+
+    assert data_manager.add_item({"name": "Alice", "movies": []})
+    assert data_manager.update_item({"user_id": 1, "name": "Bob"})
+    assert data_manager.delete_item(2)
+
+    assert len(read_json(file_path)) == 2
+    with open(f'{file_path}.journal', 'r', encoding='utf-8') as file:
+        assert [json.loads(line)['op'] for line in file] == ['add', 'update', 'delete']
+    assert [user['name'] for user in data_manager.get_all_data()] == ['Bob', 'Alice']
+
+
+def test_startup_replays_snapshot_and_journal(tmp_path):
+    """
+    Test a new manager sees the journaled changes
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    writer = JournaledJSONDataManager(file_path, 'user_id')
+    writer.add_item({"name": "Alice", "movies": []})
+    writer.delete_item(1)
+
+    reader = JournaledJSONDataManager(file_path, 'user_id')
+    assert [user['user_id'] for user in reader.get_all_data()] == [2, 3]
+    assert reader.generate_new_id(reader.get_all_data()) == 4
+
+
+def test_reader_replays_new_journal_records(tmp_path):
+    """
+    Test an already loaded manager picks up
+    records appended by another manager
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    writer = JournaledJSONDataManager(file_path, 'user_id')
+    reader = JournaledJSONDataManager(file_path, 'user_id')
+    assert len(reader.get_all_data()) == 2
+
+    writer.add_item({"name": "Alice", "movies": []})
+    assert reader.get_item_by_id(3)['name'] == 'Alice'
+    assert reader.journal_records == 1
+
+
+def test_compaction_at_threshold(tmp_path):
+    """
+    Test the journal is folded into the snapshot
+    once it reaches compact_threshold records
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JournaledJSONDataManager(file_path, 'user_id', compact_threshold=3)
+    reader = JournaledJSONDataManager(file_path, 'user_id')
+    reader.get_all_data()
+
+    for name in ('Alice', 'Bob', 'Carol'):
+        data_manager.add_item({"name": name, "movies": []})
+
+    assert len(read_json(file_path)) == 5
+    assert (tmp_path / 'movies.json.journal').read_bytes() == b''
+    assert data_manager.journal_records == 0
+    assert len(reader.get_all_data()) == 5
+
+
+def test_replay_is_idempotent_after_crash_during_compaction(tmp_path):
+    """
+    Test replaying a journal that was already
+    written into the snapshot gives the same data
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JournaledJSONDataManager(file_path, 'user_id')
+    data_manager.add_item({"name": "Alice", "movies": []})
+    data_manager.update_item({"user_id": 3, "name": "Bob"})
+    data_manager.delete_item(1)
+    data_manager._write_file(data_manager.get_all_data())  # pylint: disable=protected-access
+
+    reader = JournaledJSONDataManager(file_path, 'user_id')
+    assert reader.get_all_data() == [{"user_id": 2, "name": "Test_user_2", "movies": []},
+                                     {"user_id": 3, "name": "Bob", "movies": []}]
+
+
+def test_partial_record_is_ignored_and_overwritten(tmp_path):
+    """
+    Test a torn last record is skipped on replay
+    and replaced by the next append
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JournaledJSONDataManager(file_path, 'user_id')
+    data_manager.add_item({"name": "Alice", "movies": []})
+    with open(f'{file_path}.journal', 'ab') as file:
+        file.write(b'{"op": "delete", "it')
+
+    reader = JournaledJSONDataManager(file_path, 'user_id')
+    assert len(reader.get_all_data()) == 3
+    assert reader.add_item({"name": "Bob", "movies": []})
+    assert len(JournaledJSONDataManager(file_path, 'user_id').get_all_data()) == 4
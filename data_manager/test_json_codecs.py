@@ -0,0 +1,91 @@
+"""
+Test the JSON codecs using pytest
+"""
+import json
+
+import pytest
+
+from movieflix.data_manager.json_codecs import available_codecs, get_codec
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.records import User
+
+USERS = [{"user_id": 1,
+          "name": "Zoë",
+          "movies": [{"movie_id": 1,
+                      "name": "Amélie   😀 \"quoted\" \\ </script>",
+                      "director": "Jean-Pierre Jeunet",
+                      "year": 2001,
+                      "rating": 8.3,
+                      "poster": "",
+                      "website": "https://www.imdb.com/title/tt0211915"},
+                     {"movie_id": 2, "name": "Control\x1f", "rating": 0.30000000000000004,
+                      "tags": [], "seen": True, "note": None}]}]
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_codecs_write_the_same_bytes(name):
+    """
+    Test every installed codec writes the bytes of json.dumps,
+    or the canonical compact bytes, of dicts and records
+    and reads them back
+    """
+    for compact, expected in ((False, json.dumps(USERS)),
+                              (True, json.dumps(USERS, separators=(',', ':'),
+                                                ensure_ascii=False))):
+        codec = get_codec(name, compact=compact)
+        expected = expected.encode('utf-8')
+        assert codec.dumps(USERS) == expected
+        assert codec.dumps([User.from_dict(user) for user in USERS]) == expected
+        assert codec.loads(expected) == USERS
+
+
+def test_get_codec():
+    """
+    Test auto picks the fastest installed codec
+    and unknown codecs are rejected
+    """
+    assert get_codec().name == available_codecs()[0]
+    with pytest.raises(ValueError):
+        get_codec('pickle')
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_files_do_not_depend_on_codec(tmp_path, name):
+    """
+    Test a file written with one codec is read and
+    rewritten unchanged by the stdlib codec
+    """
+    file_path = tmp_path / 'movies.json'
+    file_path.write_text('[]', encoding='utf-8')
+    writer = JSONDataManager(file_path, 'user_id', record_type=User, codec=name)
+    for user in USERS:
+        writer.add_item(json.loads(json.dumps(user)))
+    content = file_path.read_bytes()
+
+    reader = JSONDataManager(file_path, 'user_id', codec='json')
+    assert reader.get_all_data() == USERS
+    reader.update_item({"user_id": 1, "name": "Zoë"})
+    assert file_path.read_bytes() == content
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_files_written_by_json_dump(tmp_path, name):
+    """
+    Test a file written by json.dump is read by every codec
+    and rewritten byte-for-byte the same, unless compact is asked for
+    """
+    file_path = tmp_path / 'movies.json'
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(USERS, file)
+    content = file_path.read_bytes()
+    data_manager = JSONDataManager(file_path, 'user_id', record_type=User, codec=name)
+    assert data_manager.get_all_data() == USERS
+
+    data_manager.update_item({"user_id": 1, "name": "Zoë"})
+    assert file_path.read_bytes() == content
+
+    data_manager = JSONDataManager(file_path, 'user_id', record_type=User,
+                                   codec=get_codec(name, compact=True))
+    data_manager.update_item({"user_id": 1, "name": "Zoë"})
+    assert file_path.read_bytes() == \
+           json.dumps(USERS, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
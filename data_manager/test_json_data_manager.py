@@ -0,0 +1,284 @@
+"""
+Test JSONDataManager using pytest
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from movieflix.data_manager.data_manager_interface import StaleDataError
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.users import Users
+
+
+def create_test_file(file_path, users_count=2):
+    """
+    A test data with users_count users is created in file_path
+    """
+    test_data = [{"user_id": user_id,
+                  "name": f"Test_user_{user_id}",
+                  "movies": []}
+                 for user_id in range(1, users_count + 1)]
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(test_data, file)
+
+
+def test_cache_hit_on_unchanged_file(tmp_path):
+    """
+    Test repeated reads of an unchanged file
+    are served from the cache
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+
+    assert data_manager.get_all_data()
+    assert data_manager.get_item_by_id(2)
+    assert data_manager.cache_stats == {'hits': 1, 'misses': 1}
+
+
+def test_cache_reloads_changed_file(tmp_path):
+    """
+    Test the cache is reloaded
+    after the file is changed by another writer
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+    assert len(data_manager.get_all_data()) == 2
+
+    create_test_file(file_path, users_count=3)
+    assert len(data_manager.get_all_data()) == 3
+    assert data_manager.cache_stats == {'hits': 0, 'misses': 2}
+
+
+def test_cache_updated_after_own_write(tmp_path):
+    """
+    Test writes update the cache in place
+    without reloading the file
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+
+    assert data_manager.add_item({"name": "Alice", "movies": []})
+    assert data_manager.get_item_by_id(3)['name'] == 'Alice'
+    assert data_manager.cache_stats == {'hits': 1, 'misses': 1}
+
+
+def test_cache_disabled_by_default(tmp_path):
+    """
+    Test every read goes to the file
+    when the cache is not enabled
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id')
+
+    assert data_manager.get_all_data() is not data_manager.get_all_data()
+    assert data_manager.cache_stats == {'hits': 0, 'misses': 0}
+
+
+def test_cache_missing_file(tmp_path):
+    """
+    Test reading a removed file returns None
+    even if it was cached
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+    assert data_manager.get_all_data()
+
+    file_path.unlink()
+    assert data_manager.get_all_data() is None
+
+
+def test_index_after_delete(tmp_path):
+    """
+    Test lookups by id still find the right items
+    after an item in the middle is deleted
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path, users_count=4)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+
+    assert data_manager.delete_item(2)
+    assert data_manager.get_item_by_id(2) is None
+    assert data_manager.get_item_by_id(3)['name'] == 'Test_user_3'
+    assert data_manager.get_item_by_id(4)['name'] == 'Test_user_4'
+
+
+def test_new_id_after_deleting_highest_id(tmp_path):
+    """
+    Test the next id is the highest remaining id plus 1
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path, users_count=3)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+
+    assert data_manager.delete_item(3)
+    assert data_manager.add_item({"name": "Alice", "movies": []})
+    assert data_manager.get_item_by_id(3)['name'] == 'Alice'
+    assert data_manager.add_item({"name": "Bob", "movies": []})
+    assert data_manager.get_item_by_id(4)['name'] == 'Bob'
+
+
+def test_write_replaces_file_atomically(tmp_path):
+    """
+    Test a write leaves only the new file behind
+    and keeps the file readable
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id')
+
+    assert data_manager.add_item({"name": "Alice", "movies": []})
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['movies.json',
+                                                                'movies.json.lock']
+    with open(file_path, 'r', encoding='utf-8') as file:
+        assert len(json.load(file)) == 3
+
+
+def test_write_to_missing_directory(tmp_path):
+    """
+    Test writing into a directory that does not exist fails
+    """
+    data_manager = JSONDataManager(tmp_path / 'missing' / 'movies.json', 'user_id')
+    assert data_manager._write_file([]) is None  # pylint: disable=protected-access
+
+
+def test_failed_write_drops_cache(tmp_path, monkeypatch):
+    """
+    Test a write failing with any OSError
+    does not leave the unwritten change in the cache
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+    assert len(data_manager.get_all_data()) == 2
+
+    def disk_full(*_args, **_kwargs):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr('movieflix.data_manager.json_data_manager.atomic_write', disk_full)
+    with pytest.raises(OSError):
+        data_manager.add_item({"name": "Alice", "movies": []})
+    monkeypatch.undo()
+
+    assert len(data_manager.get_all_data()) == 2
+    assert data_manager.get_item_by_id(3) is None
+
+
+def test_unwritten_add_is_not_indexed(tmp_path, monkeypatch):
+    """
+    Test an add that could not be written
+    returns None and leaves no trace in the cache or index
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+    assert data_manager.get_item_by_id(2)
+
+    def directory_gone(*_args, **_kwargs):
+        raise FileNotFoundError(file_path)
+
+    monkeypatch.setattr('movieflix.data_manager.json_data_manager.atomic_write', directory_gone)
+    assert data_manager.add_item({"name": "Alice", "movies": []}) is None
+    monkeypatch.undo()
+
+    assert data_manager.get_item_by_id(3) is None
+    assert data_manager.add_item({"name": "Bob", "movies": []})
+    assert data_manager.get_item_by_id(3)['name'] == 'Bob'
+
+
+def test_batch_durability_fsyncs_every_batch(tmp_path):
+    """
+    Test batch durability only fsyncs
+    every fsync_batch_size-th write
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id',
+                                   durability='batch', fsync_batch_size=3)
+
+    for _ in range(6):
+        data_manager.add_item({"name": "Alice", "movies": []})
+    assert data_manager.write_stats['writes'] == 6
+    assert data_manager.write_stats['fsyncs'] == 2
+
+
+def test_update_with_stale_generation(tmp_path):
+    """
+    Test an update based on an old generation is rejected
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+    generation = data_manager.get_generation()
+    JSONDataManager(file_path, 'user_id').update_item({"user_id": 1, "name": "Bob"})
+
+    with pytest.raises(StaleDataError):
+        data_manager.update_item({"user_id": 1, "name": "Alice"},
+                                 expected_generation=generation)
+    assert data_manager.get_item_by_id(1)['name'] == 'Bob'
+
+
+def test_generation_changes_when_stat_repeats(tmp_path, monkeypatch):
+    """
+    Test a write changes the generation and reloads other caches
+    even if the rewritten file has the stat of the old one,
+    e.g. same size and mtime on a coarse timestamp file system
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    frozen_stat = os.stat(file_path)
+
+    class FrozenStatOs:
+        """
+        The os module, with every stat of the data file repeating
+        """
+        def __getattr__(self, name):
+            return getattr(os, name)
+
+        @staticmethod
+        def stat(*_args, **_kwargs):
+            return frozen_stat
+
+        @staticmethod
+        def fstat(*_args, **_kwargs):
+            return frozen_stat
+
+    monkeypatch.setattr('movieflix.data_manager.json_data_manager.os', FrozenStatOs())
+    reader = JSONDataManager(file_path, 'user_id', cache=True)
+    writer = JSONDataManager(file_path, 'user_id', cache=True)
+    assert reader.get_item_by_id(1)['name'] == 'Test_user_1'
+    generation = writer.get_generation()
+
+    assert writer.update_item({"user_id": 1, "name": "Bob"},
+                              expected_generation=generation)
+    with pytest.raises(StaleDataError):
+        writer.update_item({"user_id": 1, "name": "Alice"}, expected_generation=generation)
+    assert reader.get_item_by_id(1)['name'] == 'Bob'
+
+
+def test_concurrent_movie_adds_are_not_lost(tmp_path):
+    """
+    Test movies added at the same time through separate
+    data managers all end up in the file with unique ids
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    managers = [Users(JSONDataManager(file_path, 'user_id', cache=True, durability='none'))
+                for _ in range(4)]
+
+    def add_movies(users):
+        for number in range(10):
+            users.add_user_movie(1, {"name": f"Movie {number}"})
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(add_movies, managers))
+
+    movies = JSONDataManager(file_path, 'user_id').get_item_by_id(1)['movies']
+    assert len(movies) == 40
+    assert sorted(movie['movie_id'] for movie in movies) == list(range(1, 41))
@@ -0,0 +1,64 @@
+"""
+Test UserMovieIndex queries using pytest
+"""
+from movieflix.data_manager.movie_index import UserMovieIndex
+
+MOVIES = [{"movie_id": 1, "name": "The Dark Knight", "director": "Christopher Nolan",
+           "year": 2008, "rating": 9.0},
+          {"movie_id": 2, "name": "Titanic", "director": "James Cameron",
+           "year": 1997, "rating": 7.9},
+          {"movie_id": 3, "name": "Dark City", "director": "Alex Proyas",
+           "year": 1998, "rating": 7.6},
+          {"movie_id": 4, "name": "Inception", "director": "Christopher Nolan",
+           "year": 2010, "rating": "N/A"}]
+
+
+def movie_ids(index: UserMovieIndex, **query) -> list:
+    """
+    Return the movie ids of a query
+    """
+    return [index.movies[position]['movie_id'] for position in index.query(**query)]
+
+
+def test_sort():
+    """
+    Test sorting, movies without a value stay last
+    """
+    index = UserMovieIndex([dict(movie) for movie in MOVIES])
+    assert movie_ids(index) == [1, 2, 3, 4]
+    assert movie_ids(index, sort='name') == [3, 4, 1, 2]
+    assert movie_ids(index, sort='year', descending=True) == [4, 1, 3, 2]
+    assert movie_ids(index, sort='rating', descending=True) == [1, 2, 3, 4]
+
+
+def test_filters():
+    """
+    Test year range, rating, director, word search and prefix filters
+    """
+    index = UserMovieIndex([dict(movie) for movie in MOVIES])
+    assert movie_ids(index, year_from=1998, year_to=2008) == [1, 3]
+    assert movie_ids(index, min_rating=7.8) == [1, 2]
+    assert movie_ids(index, director='christopher NOLAN', sort='year') == [1, 4]
+    assert movie_ids(index, search='dar') == [1, 3]
+    assert movie_ids(index, search='dark kni') == [1]
+    assert movie_ids(index, prefix='ti') == [2]
+    assert movie_ids(index, search='nothing') == []
+
+
+def test_indexes_follow_changes():
+    """
+    Test the query indexes are kept between queries
+    and rebuilt after the movies change
+    """
+    index = UserMovieIndex([dict(movie) for movie in MOVIES])
+    assert movie_ids(index, sort='year') == [2, 3, 1, 4]
+    sort_index = index._sort_index('year')  # pylint: disable=protected-access
+    movie_ids(index, sort='year', year_from=2000)
+    assert index._sort_index('year') is sort_index  # pylint: disable=protected-access
+
+    changed = index.copy(list(index.movies))
+    changed.add({"movie_id": 5, "name": "Dark Waters", "year": 1990, "rating": 7.5})
+    changed.remove(2)
+    assert movie_ids(changed, sort='year') == [5, 3, 1, 4]
+    assert movie_ids(changed, search='dark') == [1, 3, 5]
+    assert movie_ids(index, sort='year') == [2, 3, 1, 4]
@@ -0,0 +1,72 @@
+"""
+Test User and Movie records using pytest
+"""
+import json
+
+import pytest
+from jinja2 import Template
+
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.records import Movie, User, record_to_json
+from movieflix.data_manager.users import Users
+
+TITANIC = {"movie_id": 1,
+           "name": "Titanic",
+           "director": "James Cameron",
+           "year": 1997,
+           "rating": 7.9,
+           "poster": "https://m.media-amazon.com/images/M/titanic.jpg",
+           "website": "https://www.imdb.com/title/tt0120338"}
+
+
+def test_movie_reads_like_a_dict():
+    """
+    Test a movie record has the keys, values and equality of its dict,
+    keys without a field are kept as extra keys
+    """
+    movie = Movie(TITANIC, note="seen twice")
+    assert movie == dict(TITANIC, note="seen twice")
+    assert list(movie) == list(TITANIC) + ['note']
+    assert movie['name'] == movie.name == 'Titanic'
+    assert movie.note == 'seen twice'
+    assert 'imdb_id' not in movie and movie.get('imdb_id') is None
+    with pytest.raises(KeyError):
+        movie['imdb_id']  # pylint: disable=pointless-statement
+
+    movie.update({"rating": 8.5})
+    del movie['note']
+    assert {**movie} == dict(TITANIC, rating=8.5)
+
+
+def test_user_converts_movies():
+    """
+    Test a user's movies become Movie records,
+    a list of records is kept as is
+    """
+    user = User({"user_id": 1, "name": "Test_user", "movies": [dict(TITANIC)]})
+    assert type(user['movies'][0]) is Movie  # pylint: disable=unidiomatic-typecheck
+    movies = user['movies']
+    user.update({"movies": movies})
+    assert user.movies is movies
+    assert json.loads(json.dumps(user, default=record_to_json)) == user.to_dict()
+    assert Template('{{ user.name }}: {{ user.movies[0].name }}').render(user=user) == \
+           'Test_user: Titanic'
+
+
+def test_json_data_manager_keeps_records(tmp_path):
+    """
+    Test a JSONDataManager with a record_type loads,
+    adds and writes records
+    """
+    file_path = tmp_path / 'movies.json'
+    file_path.write_text(json.dumps([{"user_id": 1, "name": "Test_user",
+                                      "movies": [TITANIC]}]), encoding='utf-8')
+    users = Users(JSONDataManager(file_path, 'user_id', cache=True, record_type=User))
+    users.add_user({"name": "Second", "movies": []})
+    users.add_user_movie(2, {"name": "Jaws"})
+    users.update_user_movie(1, 1, {"rating": 8.5})
+
+    assert type(users.get_user(2)) is User  # pylint: disable=unidiomatic-typecheck
+    assert users.get_user_movie(1, 1) == dict(TITANIC, rating=8.5)
+    assert json.loads(file_path.read_text(encoding='utf-8'))[1] == \
+           {"user_id": 2, "name": "Second", "movies": [{"movie_id": 1, "name": "Jaws"}]}
@@ -0,0 +1,153 @@
+"""
+Test ShardedDataManager using pytest
+"""
+import json
+
+import pytest
+
+from movieflix.data_backend import DEFAULT_CONFIG, create_users_data_manager
+from movieflix.data_manager.data_manager_interface import StaleDataError
+from movieflix.data_manager.migrate_json_to_shards import migrate
+from movieflix.data_manager.records import User
+from movieflix.data_manager.sharded_data_manager import ShardedDataManager
+from movieflix.data_manager.test_catalog_data_manager import TITANIC
+from movieflix.data_manager.test_json_data_manager import create_test_file
+from movieflix.data_manager.users import Users
+
+
+def read_json(path):
+    """
+    Return the parsed content of a json file
+    """
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def create_test_users(directory, shard_count=2) -> Users:
+    """
+    Three test users in shard_count shards are created
+    """
+    users = Users(ShardedDataManager(directory, shard_count, cache=True, record_type=User))
+    for name in ('Alice', 'Bob', 'Carol'):
+        users.add_user({"name": name, "movies": []})
+    return users
+
+
+def test_users_are_stored_in_their_shards(tmp_path):
+    """
+    Test each user is written to its own shard
+    and listed in the manifest
+    """
+    users = create_test_users(tmp_path)
+    assert read_json(tmp_path / 'manifest.json') == [{"user_id": 1, "name": "Alice"},
+                                                     {"user_id": 2, "name": "Bob"},
+                                                     {"user_id": 3, "name": "Carol"}]
+    assert [user['user_id'] for user in read_json(tmp_path / 'shard-000.json')] == [2]
+    assert [user['user_id'] for user in read_json(tmp_path / 'shard-001.json')] == [1, 3]
+
+    assert users.add_user_movie(2, {"name": "Titanic"})
+    assert users.get_user_movies(2) == [{"movie_id": 1, "name": "Titanic"}]
+    assert read_json(tmp_path / 'shard-001.json')[0]['movies'] == []
+    assert [user['name'] for user in users.get_all_users()] == ['Alice', 'Bob', 'Carol']
+
+
+def test_file_per_user(tmp_path):
+    """
+    Test every user has a file of its own without a shard count
+    """
+    users = create_test_users(tmp_path, shard_count=None)
+    assert read_json(tmp_path / 'user-3.json') == [{"user_id": 3, "name": "Carol", "movies": []}]
+    assert users.delete_user(3)
+    assert users.get_user(3) is None
+    assert read_json(tmp_path / 'user-3.json') == []
+
+
+def test_users_page_reads_the_manifest(tmp_path):
+    """
+    Test the users listing is read from the manifest
+    and follows renames and deletes
+    """
+    users = create_test_users(tmp_path)
+    assert users.update_user({"user_id": 2, "name": "Bobby"})
+    assert users.delete_user(1)
+    assert users.delete_user(1) is None
+    page = users.get_users_page(1)
+    assert page['items'] == [{"user_id": 2, "name": "Bobby"}]
+    assert (page['total'], page['next_after']) == (2, 2)
+    assert users.get_users_page(5, after=2)['items'] == [{"user_id": 3, "name": "Carol"}]
+    assert users.get_user(2)['name'] == 'Bobby'
+
+
+def test_generation_of_a_shard(tmp_path):
+    """
+    Test a user's generation only changes with its shard
+    """
+    data_manager = create_test_users(tmp_path).data_manager
+    generation = data_manager.get_generation(1)
+    assert data_manager.update_item({"user_id": 2, "name": "Bobby"})
+    assert data_manager.get_generation(1) == generation
+    assert data_manager.update_item({"user_id": 3, "name": "Caz"},
+                                    expected_generation=generation)
+    with pytest.raises(StaleDataError):
+        data_manager.update_item({"user_id": 1, "name": "Al"}, expected_generation=generation)
+
+
+def test_generation_of_the_users_listing(tmp_path):
+    """
+    Test the generation of all users changes with the manifest only,
+    not with the movies of a user
+    """
+    users = create_test_users(tmp_path)
+    generation = users.data_manager.get_generation()
+    assert users.add_user_movie(1, {"name": "Titanic"})
+    assert users.update_user({"user_id": 1, "name": "Alice"})
+    assert users.data_manager.get_generation() == generation
+    assert users.update_user({"user_id": 1, "name": "Al"})
+    assert users.data_manager.get_generation() != generation
+
+
+def test_shard_managers_are_bounded(tmp_path):
+    """
+    Test only the last max_open_shards shard managers are kept
+    and users of evicted shards are still read and written
+    """
+    data_manager = ShardedDataManager(tmp_path, None, cache=True, max_open_shards=2)
+    users = Users(data_manager)
+    for name in ('Alice', 'Bob', 'Carol'):
+        users.add_user({"name": name, "movies": []})
+    assert len(data_manager._shards) == 2  # pylint: disable=protected-access
+
+    assert users.add_user_movie(1, {"name": "Titanic"})
+    assert users.get_user_movie(1, 1)['name'] == 'Titanic'
+    assert [user['name'] for user in users.get_all_users()] == ['Alice', 'Bob', 'Carol']
+    assert len(data_manager._shards) == 2  # pylint: disable=protected-access
+
+
+def test_migrate(tmp_path):
+    """
+    Test the users of a json file are imported with their ids
+    """
+    create_test_file(tmp_path / 'movies.json')
+    assert migrate(tmp_path / 'movies.json', tmp_path / 'users', shard_count=4) == 2
+    assert migrate(tmp_path / 'missing.json', tmp_path / 'users') is None
+    imported = ShardedDataManager(tmp_path / 'users', 4).get_all_data()
+    assert imported == read_json(tmp_path / 'movies.json')
+
+
+def test_migrate_with_catalog(tmp_path):
+    """
+    Test the movies of a json file stored with a movie catalog
+    are imported with their catalog details
+    """
+    create_test_file(tmp_path / 'movies.json')
+    catalog_file = tmp_path / 'films.json'
+    users = create_users_data_manager({**DEFAULT_CONFIG, 'DATA_FILE': tmp_path / 'movies.json',
+                                       'DATA_CATALOG': True, 'DATA_CATALOG_FILE': catalog_file})
+    users.data_manager.catalog.put(TITANIC)
+    users.add_user_movie(2, dict(TITANIC, rating=10.0))
+    assert read_json(tmp_path / 'movies.json')[1]['movies'] == \
+           [{"movie_id": 1, "imdb_id": "tt0120338", "rating": 10.0}]
+
+    assert migrate(tmp_path / 'movies.json', tmp_path / 'users', shard_count=4,
+                   catalog_file=catalog_file) == 2
+    imported = ShardedDataManager(tmp_path / 'users', 4).get_item_by_id(2)
+    assert imported['movies'] == [dict(TITANIC, movie_id=1, rating=10.0)]
@@ -0,0 +1,130 @@
+"""
+Test SQLiteDataManager using pytest
+"""
+import json
+
+from movieflix.data_manager.migrate_json_to_sqlite import migrate
+from movieflix.data_manager.sqlite_data_manager import SQLiteDataManager
+from movieflix.data_manager.users import Users
+
+TEST_MOVIE = {"movie_id": 1,
+              "name": "Titanic",
+              "director": "James Cameron",
+              "year": 1997,
+              "rating": 7.9,
+              "poster": "https://m.media-amazon.com/images/M/titanic.jpg",
+              "website": "https://www.imdb.com/title/tt0120338"}
+
+
+def create_test_users(database) -> Users:
+    """
+    A test database with one user and one movie is created
+    """
+    data_manager = SQLiteDataManager(database)
+    data_manager.add_item({"name": "Test_user", "movies": [dict(TEST_MOVIE)]})
+    return Users(data_manager)
+
+
+def test_get_user_with_movies(tmp_path):
+    """
+    Test a user is returned with its nested movies
+    """
+    users = create_test_users(tmp_path / 'movies.db')
+    assert users.get_user(1) == {"user_id": 1, "name": "Test_user", "movies": [TEST_MOVIE]}
+    assert users.get_user(2) is None
+
+
+def test_get_users_page(tmp_path):
+    """
+    Test a page of users is read with their movies
+    """
+    users = create_test_users(tmp_path / 'movies.db')
+    for name in ('Second', 'Third'):
+        users.add_user({"name": name, "movies": [{"movie_id": 1, "name": name}]})
+    page = users.get_users_page(2, offset=1)
+    assert [(user['user_id'], len(user['movies'])) for user in page['items']] == [(2, 1), (3, 1)]
+    assert (page['total'], page['prev_offset'], page['next_offset']) == (3, 0, None)
+    page = users.get_users_page(1, after=1)
+    assert (page['offset'], page['items'][0]['name'], page['next_after']) == (1, 'Second', 2)
+
+
+def test_user_movie_crud(tmp_path):
+    """
+    Test add, update and delete of a user's movies
+    """
+    users = create_test_users(tmp_path / 'movies.db')
+    assert users.add_user_movie(1, {"name": "Superman", "director": "",
+                                    "year": 1978, "rating": 7.4,
+                                    "poster": "", "website": ""})
+    assert users.update_user_movie(1, 1, {"rating": 8.0})
+    assert users.delete_user_movie(1, 2)
+    assert users.delete_user_movie(1, 2) is None
+
+    assert users.get_user_movies(1) == [dict(TEST_MOVIE, rating=8.0)]
+
+
+def test_update_and_delete_user(tmp_path):
+    """
+    Test updating a user's name keeps its movies
+    and deleting a user deletes its movies
+    """
+    database = tmp_path / 'movies.db'
+    users = create_test_users(database)
+    assert users.update_user({"user_id": 1, "name": "Alice"})
+    assert users.get_user(1)['movies'] == [TEST_MOVIE]
+    assert users.update_user({"user_id": 5, "name": "Alice"}) is None
+
+    assert users.delete_user(1)
+    assert users.delete_user(1) is None
+    assert users.get_all_users() == []
+    assert SQLiteDataManager(database).get_all_data() == []
+
+
+def test_keys_without_column_are_kept(tmp_path):
+    """
+    Test unknown user and movie keys round trip
+    """
+    users = create_test_users(tmp_path / 'movies.db')
+    users.update_user({"user_id": 1, "email": "test@example.com"})
+    users.update_user_movie(1, 1, {"imdb_id": "tt0120338"})
+
+    user = users.get_user(1)
+    assert user['email'] == 'test@example.com'
+    assert user['movies'][0]['imdb_id'] == 'tt0120338'
+
+
+def test_migrate_json_file(tmp_path):
+    """
+    Test migrating a json file keeps user and movie ids
+    """
+    json_file = tmp_path / 'movies.json'
+    test_data = [{"name": "Sharon", "movies": [dict(TEST_MOVIE, movie_id=2)], "user_id": 3},
+                 {"name": "Alice", "movies": [], "user_id": 7}]
+    with open(json_file, 'w', encoding='utf-8') as file:
+        json.dump(test_data, file)
+
+    database = tmp_path / 'movies.db'
+    assert migrate(json_file, database) == 2
+    data_manager = SQLiteDataManager(database)
+    assert data_manager.get_item_by_id(3)['movies'][0]['movie_id'] == 2
+    assert data_manager.get_item_by_id(7)['name'] == 'Alice'
+    assert migrate(tmp_path / 'missing.json', database) is None
+
+
+def test_migrate_catalog_json_file(tmp_path):
+    """
+    Test migrating a json file stored with a movie catalog
+    imports the movies with their catalog details and user overrides
+    """
+    json_file = tmp_path / 'movies.json'
+    with open(json_file, 'w', encoding='utf-8') as file:
+        json.dump([{"user_id": 1, "name": "Sharon",
+                    "movies": [{"movie_id": 1, "imdb_id": "tt0120338", "rating": 10.0}]}], file)
+    with open(tmp_path / 'movies.catalog.json', 'w', encoding='utf-8') as file:
+        json.dump([dict({key: value for key, value in TEST_MOVIE.items() if key != 'movie_id'},
+                        imdb_id="tt0120338")], file)
+
+    database = tmp_path / 'movies.db'
+    assert migrate(json_file, database) == 1
+    assert SQLiteDataManager(database).get_item_by_id(1)['movies'] == \
+           [dict(TEST_MOVIE, rating=10.0)]
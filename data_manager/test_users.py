@@ -3,15 +3,33 @@ Test users routes using pytest
 """
 import json
 import os
+import shutil
 
+import pytest
+
+from movieflix.data_manager.data_manager_interface import StaleDataError
 from movieflix.data_manager.json_data_manager import JSONDataManager
-from movieflix.data_manager.users import Users
+from movieflix.data_manager.test_json_data_manager import create_test_file as create_users_file
+from movieflix.data_manager.users import MAX_WRITE_ATTEMPTS, RETRY_BACKOFF, Users
 
 TEST_FILE_PATH = 'data/test_movies.json'
 
 users_data_manager = Users(JSONDataManager(TEST_FILE_PATH, 'user_id'))
 
 
+@pytest.fixture(autouse=True)
+def test_file_copy(tmp_path, monkeypatch):
+    """
+    Every test works on a copy of TEST_FILE_PATH in tmp_path,
+    the tracked test data is never changed
+    """
+    file_path = str(tmp_path / os.path.basename(TEST_FILE_PATH))
+    shutil.copyfile(TEST_FILE_PATH, file_path)
+    monkeypatch.setitem(globals(), 'TEST_FILE_PATH', file_path)
+    monkeypatch.setitem(globals(), 'users_data_manager',
+                        Users(JSONDataManager(file_path, 'user_id')))
+
+
 def create_test_file():
     """
     A test data is created in TEST_FILE_PATH
@@ -51,6 +69,55 @@ def test_fail_to_get_all_users_when_file_not_exist():
     assert users_data_manager.get_all_users() is None
 
 
+def test_get_users_page():
+    """
+    Test users are paged by offset and by cursor
+    """
+    create_test_file()
+    for name in ('Second', 'Third'):
+        users_data_manager.add_user({"name": name, "movies": []})
+    page = users_data_manager.get_users_page(2)
+    assert [user['user_id'] for user in page['items']] == [1, 2]
+    assert (page['total'], page['next_offset'], page['next_after']) == (3, 2, 2)
+    page = users_data_manager.get_users_page(2, after=page['next_after'])
+    assert [user['user_id'] for user in page['items']] == [3]
+    assert (page['offset'], page['prev_offset'], page['next_after']) == (2, 0, None)
+    users_data_manager.delete_user(2)
+    assert users_data_manager.get_users_page(2, after=2)['items'][0]['user_id'] == 3
+
+
+def test_get_user_movies_page():
+    """
+    Test a user's movies are paged
+    and a user that does not exist has no page
+    """
+    create_test_file()
+    users_data_manager.add_user_movies(1, [{"name": "Spiderman I"}, {"name": "Spiderman II"}])
+    page = users_data_manager.get_user_movies_page(1, 2, offset=1)
+    assert [movie['movie_id'] for movie in page['items']] == [2, 3]
+    assert (page['total'], page['prev_offset'], page['next_offset']) == (3, 0, None)
+    assert users_data_manager.get_user_movies_page(6, 2) is None
+
+
+def test_get_user_movies_page_with_query():
+    """
+    Test a user's movies are sorted, filtered and paged,
+    and the query indexes follow movie changes
+    """
+    create_test_file()
+    users_data_manager.add_user_movies(1, [{"name": "Avatar", "year": 2009, "rating": 7.9},
+                                           {"name": "Aliens", "year": 1986, "rating": 8.4}])
+    page = users_data_manager.get_user_movies_page(1, 2, query={'sort': 'name'})
+    assert [movie['name'] for movie in page['items']] == ['Aliens', 'Avatar']
+    page = users_data_manager.get_user_movies_page(1, 2, after=page['next_after'],
+                                                   query={'sort': 'name'})
+    assert [movie['name'] for movie in page['items']] == ['Titanic']
+    users_data_manager.update_user_movie(1, 3, {"year": 2100})
+    page = users_data_manager.get_user_movies_page(1, 5, query={'year_from': 1990,
+                                                                'sort': 'year'})
+    assert [movie['movie_id'] for movie in page['items']] == [1, 2, 3]
+
+
 def test_get_a_user():
     """
     Test successful get a user
@@ -191,6 +258,74 @@ def test_add_user_movie_with_invalid_user_id():
     assert users_data_manager.add_user_movie(6, new_movie) is None
 
 
+def test_add_user_movies():
+    """
+    Test successful
+    add many movies to
+    a specific user
+    """
+    create_test_file()
+    new_movies = [{"name": "Spiderman I"}, {"name": "Spiderman II"}]
+    assert users_data_manager.add_user_movies(1, new_movies)
+    assert [movie['movie_id'] for movie in new_movies] == [2, 3]
+    assert users_data_manager.get_user_movie(1, 3)['name'] == 'Spiderman II'
+
+
+def test_add_user_movies_with_invalid_user_id():
+    """
+    Test fail to
+    add many movies to
+    a user that does not exist
+    """
+    create_test_file()
+    assert users_data_manager.add_user_movies(6, [{"name": "Spiderman I"}]) is None
+
+
+def test_change_user_movies():
+    """
+    Test successful
+    add, update and delete of many movies
+    of a specific user in one write
+    """
+    create_test_file()
+    users_data_manager.add_user_movie(1, {"name": "Superman"})
+    new_movies = [{"name": "Spiderman I"}, {"name": "Spiderman II"}]
+    results = users_data_manager.change_user_movies(1, new_movies, [{"movie_id": 1, "rating": 8.0}],
+                                                    [2])
+    assert results == {'created': [3, 4], 'updated': [1], 'deleted': [2], 'missing': []}
+    assert [(movie['movie_id'], movie['rating'] if movie['movie_id'] == 1 else movie['name'])
+            for movie in users_data_manager.get_user_movies(1)] == \
+        [(1, 8.0), (3, 'Spiderman I'), (4, 'Spiderman II')]
+
+
+def test_change_user_movies_with_missing_movies():
+    """
+    Test nothing is changed
+    if a movie to update or delete does not exist
+    """
+    create_test_file()
+    results = users_data_manager.change_user_movies(1, [{"name": "Spiderman I"}],
+                                                    [{"movie_id": 5, "rating": 8.0}], [1, 6])
+    assert results['missing'] == [5, 6]
+    assert [movie['movie_id'] for movie in users_data_manager.get_user_movies(1)] == [1]
+    assert users_data_manager.change_user_movies(6, [{"name": "Spiderman I"}]) is None
+
+
+def test_change_user_movies_when_write_fails(tmp_path, monkeypatch):
+    """
+    Test no results are returned
+    if the data manager fails to write the changes
+    """
+    file_path = tmp_path / 'movies.json'
+    create_users_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id')
+    users = Users(data_manager)
+    monkeypatch.setattr(data_manager, 'update_item', lambda *_args, **_kwargs: None)
+    assert users.change_user_movies(1, [{"name": "Spiderman I"}]) is None
+    assert users.change_user_movies(1, [], [], [6])['missing'] == [6]
+    assert users.get_user_movies(1) == []
+
+
 def test_update_user_movie():
     """
     Test successful
@@ -201,6 +336,23 @@ def test_update_user_movie():
     assert users_data_manager.update_user_movie(1, 1, updated_movie)
 
 
+def test_update_user_movie_expected():
+    """
+    Test a movie is updated only while
+    it still equals the expected movie
+    """
+    create_test_file()
+    users_data_manager.add_user_movie(1, {"name": "Superman"})
+    expected = {"movie_id": 2, "name": "Superman"}
+    assert users_data_manager.update_user_movie(1, 2, {"rating": 8.0},
+                                                expected_movie=expected) is True
+    assert users_data_manager.update_user_movie(1, 2, {"rating": 9.0},
+                                                expected_movie=expected) is False
+    assert users_data_manager.update_user_movie(1, 3, {"rating": 9.0},
+                                                expected_movie=dict(expected, movie_id=3)) is False
+    assert users_data_manager.get_user_movie(1, 2)['rating'] == 8.0
+
+
 def test_update_user_movie_with_invalid_user_id():
     """
     Test fail to
@@ -238,3 +390,68 @@ def test_delete_user_movie_with_invalid_user_id():
     """
     create_test_file()
     assert users_data_manager.delete_user_movie(10, 1) is None
+
+
+def test_update_user_movie_with_invalid_movie_id():
+    """
+    Test fail to
+    update a non-existent movie
+    for a specific user
+    """
+    create_test_file()
+    updated_movie = {"name": "Spiderman 5"}
+    assert users_data_manager.update_user_movie(1, 19, updated_movie) is None
+
+
+def test_add_user_movie_after_delete():
+    """
+    Test the new movie_id is the
+    highest remaining movie_id plus 1
+    and the movies can be found by id
+    """
+    create_test_file()
+    users_data_manager.add_user_movie(1, {"name": "Spiderman I"})
+    users_data_manager.add_user_movie(1, {"name": "Spiderman II"})
+    assert users_data_manager.delete_user_movie(1, 2)
+    users_data_manager.add_user_movie(1, {"name": "Spiderman III"})
+    assert users_data_manager.get_user_movie(1, 2) is None
+    assert users_data_manager.get_user_movie(1, 3)['name'] == 'Spiderman II'
+    assert users_data_manager.get_user_movie(1, 4)['name'] == 'Spiderman III'
+
+
+def test_movie_indexes_are_bounded(tmp_path):
+    """
+    Test only the movie indexes of the
+    most recently used users are kept
+    """
+    file_path = tmp_path / 'movies.json'
+    create_users_file(file_path, users_count=3)
+    users = Users(JSONDataManager(file_path, 'user_id'), max_indexed_users=2)
+    for user_id in (1, 2, 1, 3):
+        users.get_user_movies_page(user_id, 10)
+    assert list(users._movie_indexes) == [1, 3]  # pylint: disable=protected-access
+    users.delete_user(3)
+    assert list(users._movie_indexes) == [1]  # pylint: disable=protected-access
+
+
+def test_conflicting_changes_back_off(tmp_path, monkeypatch):
+    """
+    Test a movie change colliding with other changes
+    is retried after growing random delays, then given up
+    """
+    file_path = tmp_path / 'movies.json'
+    create_users_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id')
+    users = Users(data_manager)
+    delays = []
+
+    def always_stale(*_args, **_kwargs):
+        raise StaleDataError('changed')
+
+    monkeypatch.setattr(data_manager, 'update_item', always_stale)
+    monkeypatch.setattr('movieflix.data_manager.users.time.sleep', delays.append)
+    with pytest.raises(StaleDataError):
+        users.add_user_movie(1, {"name": "Spiderman I"})
+    assert len(delays) == MAX_WRITE_ATTEMPTS - 1
+    assert all(0 <= delay <= RETRY_BACKOFF * 2 ** attempt
+               for attempt, delay in enumerate(delays, start=1))
@@ -2,18 +2,166 @@
 Users class
 Managing Users' CRUD operations
 """
+import random
+import threading
+import time
+from collections import OrderedDict
 from typing import List
 
-from movieflix.data_manager.data_manager_interface import DataManagerInterface
+from movieflix.data_manager.data_manager_interface import DataManagerInterface, StaleDataError
+from movieflix.data_manager.item_index import ItemIndex
+from movieflix.data_manager.movie_index import UserMovieIndex
+from movieflix.data_manager.pagination import make_page, paginate
+from movieflix.data_manager.records import Movie
+
+MAX_WRITE_ATTEMPTS = 5
+RETRY_BACKOFF = 0.005
 
 
 class Users:
     """
     Users class
     Implementing Users' CRUD operations
+
+    Each user's movies are indexed by movie_id,
+    the index is rebuilt whenever the data manager
+    returns a different movies list for the user.
+    Sorted and filtered listings reuse the index,
+    with its sort and word indexes, while the data
+    manager's generation of the user is unchanged.
+    The indexes of the last max_indexed_users users are kept.
+
+    Movies are kept as compact Movie records.
+    Movie changes are made on a copy of the user's movies list
+    and written back only if the data did not change since it
+    was read, otherwise they are retried on a fresh read
+    after a random backoff that doubles with every attempt.
     """
-    def __init__(self, data_manager: DataManagerInterface):
+    def __init__(self, data_manager: DataManagerInterface, max_indexed_users=256):
         self._data_manager = data_manager
+        self._max_indexed_users = max_indexed_users
+        self._movie_indexes = OrderedDict()
+        self._indexes_lock = threading.Lock()
+        self._users_index = None
+
+    @property
+    def data_manager(self) -> DataManagerInterface:
+        """
+        Return the data manager the users are stored by
+        :return:
+            DataManagerInterface
+        """
+        return self._data_manager
+
+    def get_generation(self, user_id: int | None = None):
+        """
+        Return a value that changes whenever the users' data,
+        or the data of one user, changes
+        :param user_id: int | None for all users
+        :return:
+            generation |
+            None if the data manager does not track generations
+        """
+        return self._data_manager.get_generation(user_id)
+
+    def _cached_movie_index(self, user_id: int) -> tuple | None:
+        """
+        Return the cached movie index of a user
+        :param user_id: int
+        :return:
+            (UserMovieIndex, generation) (tuple) |
+            None
+        """
+        with self._indexes_lock:
+            cached = self._movie_indexes.get(user_id)
+            if cached is not None:
+                self._movie_indexes.move_to_end(user_id)
+            return cached
+
+    def _cache_movie_index(self, user_id: int, index: UserMovieIndex, generation):
+        """
+        Keep the movie index of a user,
+        dropping the least recently used ones
+        :param user_id: int
+        :param index: UserMovieIndex
+        :param generation: data generation the index was built at | None
+        """
+        with self._indexes_lock:
+            self._movie_indexes[user_id] = (index, generation)
+            self._movie_indexes.move_to_end(user_id)
+            while len(self._movie_indexes) > self._max_indexed_users:
+                self._movie_indexes.popitem(last=False)
+
+    def _get_movie_index(self, user: dict, generation=None) -> UserMovieIndex:
+        """
+        Return the movie index of a user
+        :param user: dict
+        :param generation: data generation read before the user,
+            the index is reused while the generation is unchanged
+        :return:
+            movie index (UserMovieIndex)
+        """
+        cached = self._cached_movie_index(user['user_id'])
+        if cached is not None and cached[0].is_valid_for(user['movies']):
+            index = cached[0]
+            if generation is None:
+                return index
+        else:
+            index = UserMovieIndex(user['movies'])
+        self._cache_movie_index(user['user_id'], index, generation)
+        return index
+
+    def _get_current_movie_index(self, user_id: int) -> UserMovieIndex | None:
+        """
+        Return the movie index of a user's current movies,
+        without reading the user if the data did not change
+        since the index was built
+        :param user_id: int
+        :return:
+            movie index (UserMovieIndex) |
+            None if the user does not exist
+        """
+        generation = self._data_manager.get_generation(user_id)
+        cached = self._cached_movie_index(user_id)
+        if generation is not None and cached is not None and cached[1] == generation:
+            return cached[0]
+        user = self.get_user(user_id)
+        if not user:
+            return None
+        return self._get_movie_index(user, generation)
+
+    def _change_user_movies(self, user_id: int, change) -> bool | None:
+        """
+        Apply change to a copy of a user's movies and write it back,
+        retrying with a fresh read if the data changed in between
+        :param user_id: int
+        :param change: function(UserMovieIndex) -> True to write | None
+        :return:
+            True for success change (bool) |
+            None if the user does not exist or change returned None
+        """
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                # jittered, so the writers that collided do not collide again
+                time.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** attempt))
+            generation = self._data_manager.get_generation(user_id)
+            user = self.get_user(user_id)
+            if not user:
+                return None
+            index = self._get_movie_index(user).copy(list(user['movies']))
+            if change(index) is None:
+                return None
+            try:
+                result = self._data_manager.update_item({'user_id': user_id,
+                                                         'movies': index.movies},
+                                                        expected_generation=generation)
+            except StaleDataError:
+                continue
+            if result:
+                self._cache_movie_index(user_id, index, None)
+            return result
+        raise StaleDataError(f'User {user_id} kept changing, '
+                             f'gave up after {MAX_WRITE_ATTEMPTS} attempts')
 
     def get_all_users(self) -> List[dict] | None:
         """
@@ -23,6 +171,30 @@ class Users:
         """
         return self._data_manager.get_all_data()
 
+    def get_users_page(self, limit: int, offset: int = 0, after=None) -> dict | None:
+        """
+        Return a page of users,
+        starting at offset or right after user_id after
+        :param limit: page size
+        :param offset: position of the first user
+        :param after: user_id of the last user of the previous page
+        :return:
+            {'items', 'total', 'offset', 'limit',
+             'prev_offset', 'next_offset', 'next_after'} (dict) |
+            None
+        """
+        page = self._data_manager.get_page(limit, offset, after)
+        if page is not None:
+            return page
+
+        users = self.get_all_users()
+        if users is None:
+            return None
+        if self._users_index is None or not self._users_index.is_valid_for(users):
+            self._users_index = ItemIndex(users, 'user_id')
+        return paginate(users, 'user_id', limit, offset, after,
+                        self._users_index.find_position)
+
     def get_user(self, user_id: int) -> dict | None:
         """
         Return a specific user given user_id
@@ -76,6 +248,8 @@ class Users:
             True for success delete user (bool) |
             None
         """
+        with self._indexes_lock:
+            self._movie_indexes.pop(user_id, None)
         return self._data_manager.delete_item(user_id)
 
     def get_user_movies(self, user_id: int) -> list | None:
@@ -90,6 +264,39 @@ class Users:
             return user['movies']
         return None
 
+    def get_user_movies_page(self, user_id: int, limit: int, offset: int = 0,
+                             after=None, query: dict | None = None) -> dict | None:
+        """
+        Return a page of a user's movies,
+        starting at offset or right after movie_id after,
+        sorted and filtered by the user's movie indexes
+        :param user_id: int
+        :param limit: page size
+        :param offset: position of the first movie
+        :param after: movie_id of the last movie of the previous page
+        :param query: sort and filter arguments of UserMovieIndex.query, e.g.
+            {'sort': 'rating', 'descending': True, 'year_from': 1990, 'search': 'star'}
+        :return:
+            page (dict), see get_users_page |
+            None if the user does not exist
+        """
+        index = self._get_current_movie_index(user_id)
+        if index is None:
+            return None
+        if not query:
+            return paginate(index.movies, 'movie_id', limit, offset, after,
+                            index.find_position)
+
+        positions = index.query(**query)
+        if after is not None:
+            try:
+                offset = positions.index(index.find_position(after)) + 1
+            except ValueError:
+                pass
+        offset = min(max(offset, 0), len(positions))
+        movies = [index.movies[position] for position in positions[offset:offset + limit]]
+        return make_page(movies, len(positions), offset, limit, 'movie_id')
+
     def get_user_movie(self, user_id: int, movie_id: int) -> dict | None:
         """
         Return a user's specific movie given movie_id
@@ -99,11 +306,9 @@ class Users:
             a movie (dict) |
             None
         """
-        movies = self.get_user_movies(user_id)
-        if movies:
-            for movie in movies:
-                if movie['movie_id'] == movie_id:
-                    return movie
+        user = self.get_user(user_id)
+        if user:
+            return self._get_movie_index(user).find(movie_id)
         return None
 
     def add_user_movie(self, user_id: int, new_movie_info: dict) -> bool | None:
@@ -115,33 +320,110 @@ class Users:
             True for success add (bool) |
             None
         """
-        user = self.get_user(user_id)
-        if user:
-            new_movie_info.update({"movie_id":
-                                       self._data_manager.generate_new_id(user['movies'],
-                                                                          'movie_id')})
-            user['movies'].append(new_movie_info)
-            return self._data_manager.update_item(user)
-        return None
+        def add_movie(index: UserMovieIndex) -> bool:
+            new_movie_info.update({"movie_id": index.generate_new_id()})
+            index.add(Movie.from_dict(new_movie_info))
+            return True
 
-    def update_user_movie(self, user_id: int, movie_id: int, updated_movie: dict):
+        return self._change_user_movies(user_id, add_movie)
+
+    def add_user_movies(self, user_id: int, new_movies: List[dict]) -> bool | None:
         """
-        Update a user movie info
+        Add many movies to a user in one write,
+        movie ids are assigned in list order
+        :param user_id: int
+        :param new_movies: List[dict]
+        :return:
+            True for success add (bool) |
+            None
+        """
+        def add_movies(index: UserMovieIndex) -> bool:
+            for new_movie_info in new_movies:
+                new_movie_info.update({"movie_id": index.generate_new_id()})
+                index.add(Movie.from_dict(new_movie_info))
+            return True
+
+        return self._change_user_movies(user_id, add_movies)
+
+    def change_user_movies(self, user_id: int, new_movies: List[dict] = (),
+                           updated_movies: List[dict] = (),
+                           deleted_movie_ids: list = ()) -> dict | None:
+        """
+        Update, add and delete many movies of a user in one write,
+        in this order, so new movies never reuse a deleted movie_id.
+        Nothing is written if an updated or deleted movie does not exist
+        :param user_id: int
+        :param new_movies: List[dict], movie ids are assigned in list order
+        :param updated_movies: List[dict], each with its movie_id
+        :param deleted_movie_ids: list of movie ids
+        :return:
+            {'created': [movie ids], 'updated': [movie ids],
+             'deleted': [movie ids], 'missing': [movie ids]} (dict),
+                only 'missing' is filled in if movies were missing |
+            None if the user does not exist or the write failed
+        """
+        results = {}
+
+        def change_movies(index: UserMovieIndex) -> bool | None:
+            results.update(created=[], updated=[], deleted=[],
+                           missing=[movie_id for movie_id in
+                                    [movie['movie_id'] for movie in updated_movies]
+                                    + list(deleted_movie_ids)
+                                    if index.find_position(movie_id) is None])
+            if results['missing']:
+                return None
+            for updated_movie in updated_movies:
+                position = index.find_position(updated_movie['movie_id'])
+                movie = Movie(index.movies[position])
+                movie.update(updated_movie)
+                index.replace(position, movie)
+                results['updated'].append(updated_movie['movie_id'])
+            for new_movie_info in new_movies:
+                new_movie_info.update({"movie_id": index.generate_new_id()})
+                index.add(Movie.from_dict(new_movie_info))
+                results['created'].append(new_movie_info['movie_id'])
+            for movie_id in deleted_movie_ids:
+                if index.remove(movie_id) is not None:
+                    results['deleted'].append(movie_id)
+            return True
+
+        if self._change_user_movies(user_id, change_movies) is None \
+                and not results.get('missing'):
+            return None
+        return results
+
+    def update_user_movie(self, user_id: int, movie_id: int, updated_movie: dict,
+                          expected_movie: dict | None = None):
+        """
+        Update a user movie info,
+        with expected_movie only if the stored movie still equals it
+        when the update is written
         :param user_id: int
         :param movie_id: int
         :param updated_movie: dict
+        :param expected_movie: dict | None
         :return:
             True for success update movie (bool) |
+            False if the movie was changed or deleted since expected_movie |
             None
         """
-        user = self.get_user(user_id)
+        stale = []
 
-        if user:
-            for movie in user['movies']:
-                if movie['movie_id'] == movie_id:
-                    movie.update(updated_movie)
-            return self._data_manager.update_item(user)
-        return None
+        def update_movie(index: UserMovieIndex) -> bool | None:
+            position = index.find_position(movie_id)
+            if expected_movie is not None and \
+                    (position is None or index.movies[position] != expected_movie):
+                stale.append(movie_id)
+                return None
+            if position is None:
+                return None
+            movie = Movie(index.movies[position])
+            movie.update(updated_movie)
+            index.replace(position, movie)
+            return True
+
+        result = self._change_user_movies(user_id, update_movie)
+        return False if stale else result
 
     def delete_user_movie(self, user_id: int, movie_id: int) -> bool | None:
         """
@@ -152,10 +434,7 @@ class Users:
             True for success delete movie (bool) |
             None
         """
-        user = self.get_user(user_id)
-        movie = self.get_user_movie(user_id, movie_id)
+        def delete_movie(index: UserMovieIndex) -> bool | None:
+            return True if index.remove(movie_id) else None
 
-        if user and movie:
-            user['movies'].remove(movie)
-            return self._data_manager.update_item(user)
-        return None
+        return self._change_user_movies(user_id, delete_movie)
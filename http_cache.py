@@ -0,0 +1,106 @@
+"""
+HTTP caching of the rendered pages:
+ETags derived from the data generation
+and conditional GETs answered with 304 Not Modified
+"""
+import hashlib
+import os
+from functools import wraps
+
+from flask import Flask, current_app, make_response, request
+
+EXTENSION_NAME = 'http_cache'
+
+DEFAULT_CONFIG = {'HTTP_CACHE_CONTROL': 'private, no-cache'}
+
+
+def templates_signature(app: Flask) -> str:
+    """
+    Return a signature of the app's templates and static files,
+    so pages rendered by changed templates, or linking
+    changed fingerprinted static files, get new ETags
+    :param app: Flask
+    :return:
+        signature (str)
+    """
+    signature = hashlib.sha1()
+    folders = [os.path.join(app.root_path, app.template_folder or '')]
+    if app.has_static_folder:
+        folders.append(app.static_folder)
+    for folder in folders:
+        for directory, _, file_names in sorted(os.walk(folder)):
+            for file_name in sorted(file_names):
+                path = os.path.join(directory, file_name)
+                stat_result = os.stat(path)
+                signature.update(f'{os.path.relpath(path, folder)}:'
+                                 f'{stat_result.st_mtime_ns}:{stat_result.st_size}\n'.encode())
+    return signature.hexdigest()
+
+
+def init_app(app: Flask):
+    """
+    Set the default HTTP caching config
+    and the templates signature of the app
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.extensions[EXTENSION_NAME] = templates_signature(app)
+
+
+def make_etag(version) -> str:
+    """
+    Return the ETag of the current request's page
+    rendered from data of the given version
+    :param version: data generation
+    :return:
+        ETag (str)
+    """
+    key = repr((current_app.extensions[EXTENSION_NAME], version, request.full_path))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(get_version):
+    """
+    Decorator of views rendering pages from the data:
+    GET requests get an ETag made of the data version
+    and the request url, and a 304 Not Modified answer
+    without reading or rendering anything when the
+    If-None-Match header holds the current ETag.
+
+    The version is read before the view reads the data,
+    so a page never gets the ETag of newer data.
+    Views whose data has no version (get_version returns None),
+    non-GET requests and error pages are not cached.
+
+    A page is only as fine grained as its version: the json and
+    journal backends version all users by their one file, so any
+    write changes the ETags of every user's pages; per user
+    versions come with the sharded backend (per shard).
+    No Last-Modified is sent, generations are not timestamps,
+    and clients revalidating no-cache pages send If-None-Match.
+    :param get_version: function(**view_args) -> version | None
+    :return:
+        decorator
+    """
+    def decorator(view):
+        @wraps(view)
+        def conditional_view(**view_args):
+            if request.method not in ('GET', 'HEAD'):
+                return view(**view_args)
+            version = get_version(**view_args)
+            if version is None:
+                return view(**view_args)
+
+            etag = make_etag(version)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**view_args))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = current_app.config['HTTP_CACHE_CONTROL']
+            return response
+        return conditional_view
+    return decorator
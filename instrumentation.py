@@ -0,0 +1,210 @@
+"""
+Instrumentation of the app:
+per route latency histograms and per stage timings,
+exposed on /metrics and in Server-Timing headers,
+and an opt-in sampling profiler of slow requests
+"""
+import os
+import time
+from functools import partial
+
+from flask import Flask, before_render_template, current_app, g, request, template_rendered
+
+from movieflix.profiling import stages
+from movieflix.profiling.metrics import CONTENT_TYPE, Registry
+from movieflix.profiling.sampler import SamplingProfiler, write_folded
+
+EXTENSION_NAME = 'instrumentation'
+
+DEFAULT_CONFIG = {'METRICS_PATH': '/metrics',
+                  'SERVER_TIMING': True,
+                  'PROFILE_SLOW_REQUESTS': None,
+                  'PROFILE_INTERVAL': 0.005,
+                  'PROFILE_DIR': 'data/profiles'}
+
+
+class Instrumentation:
+    """
+    The metrics of an app and its profiler of slow requests
+    """
+    def __init__(self, profile_interval: float | None = None):
+        self.registry = Registry()
+        self.request_duration = self.registry.histogram(
+            'movieflix_request_duration_seconds',
+            'Duration of requests, streamed bodies included',
+            ('method', 'route', 'status'))
+        self.stage_duration = self.registry.histogram(
+            'movieflix_stage_duration_seconds',
+            'Time spent in a stage by one request',
+            ('stage',))
+        self.stage_calls = self.registry.counter(
+            'movieflix_stage_calls', 'Calls of a stage', ('stage',))
+        self.stage_bytes = self.registry.counter(
+            'movieflix_stage_bytes', 'Bytes read or written by a stage', ('stage',))
+        self.profiler = SamplingProfiler(profile_interval) if profile_interval else None
+
+    def observe(self, method: str, route: str, status: int, seconds: float,
+                timings: stages.StageTimings):
+        """
+        Count a finished request
+        :param method: request method
+        :param route: url rule of the request
+        :param status: response status code
+        :param seconds: duration of the request
+        :param timings: the request's stage timings
+        """
+        self.request_duration.observe(seconds, method=method, route=route, status=status)
+        for stage, calls, stage_seconds, size in timings.items():
+            self.stage_duration.observe(stage_seconds, stage=stage)
+            self.stage_calls.inc(calls, stage=stage)
+            if size:
+                self.stage_bytes.inc(size, stage=stage)
+
+
+def server_timing(timings: stages.StageTimings, seconds: float) -> str:
+    """
+    Return the Server-Timing header of a request
+    :param timings: the request's stage timings
+    :param seconds: duration of the request so far
+    :return:
+        e.g. storage_read;dur=3.2;desc="1 call, 52310 bytes", app;dur=8.1 (str)
+    """
+    metrics = []
+    for stage, calls, stage_seconds, size in timings.items():
+        description = f'{calls} call' + ('s' if calls > 1 else '')
+        if size:
+            description += f', {size} bytes'
+        metrics.append(f'{stage};dur={stage_seconds * 1000:.1f};desc="{description}"')
+    metrics.append(f'app;dur={seconds * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+def start_request():
+    """
+    Start timing the current request
+    and profiling it when slow requests are profiled
+    """
+    timings, token = stages.start()
+    g.instrumentation = {'start': time.perf_counter(), 'timings': timings, 'token': token}
+    profiler = current_app.extensions[EXTENSION_NAME].profiler
+    if profiler is not None:
+        profiler.start()
+
+
+def finish_response(response):
+    """
+    Add the Server-Timing header to a response and count
+    the request once it is done: at teardown, or once
+    the body of a streamed response is sent
+    :param response: Response
+    :return:
+        Response
+    """
+    state = g.get('instrumentation')
+    if state is None:
+        return response
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = server_timing(
+            state['timings'], time.perf_counter() - state['start'])
+    state['status'] = response.status_code
+    if response.is_streamed:
+        # the request context is torn down before the body is streamed
+        del g.instrumentation
+        response.call_on_close(partial(finish_request_timing, current_app._get_current_object(),
+                                       state, request.method, request_route(),
+                                       request.endpoint))
+    return response
+
+
+def teardown_request_timing(_error=None):
+    """
+    Count a request whose response is not streamed
+    :param _error: unhandled exception | None
+    """
+    state = g.pop('instrumentation', None)
+    if state is not None:
+        finish_request_timing(current_app, state, request.method, request_route(),
+                              request.endpoint)
+
+
+def request_route() -> str:
+    """
+    Return the url rule of the current request,
+    so the metrics have one label per route and not per url
+    :return:
+        str
+    """
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def finish_request_timing(app: Flask, state: dict, method: str, route: str,
+                          endpoint: str | None):
+    """
+    Count a finished request and write the profile of a slow request
+    as <PROFILE_DIR>/<time>-<endpoint>-<milliseconds>ms.folded
+    :param app: Flask
+    :param state: the request's start time, stage timings and status
+    :param method: request method
+    :param route: url rule of the request
+    :param endpoint: endpoint of the request | None
+    """
+    stages.stop(state['token'])
+    seconds = time.perf_counter() - state['start']
+    instrumentation = app.extensions[EXTENSION_NAME]
+    instrumentation.observe(method, route, state.get('status', 500), seconds, state['timings'])
+
+    if instrumentation.profiler is not None:
+        samples = instrumentation.profiler.stop()
+        if samples and seconds >= app.config['PROFILE_SLOW_REQUESTS']:
+            file_name = (f'{time.strftime("%Y%m%dT%H%M%S")}-{endpoint or "unmatched"}'
+                         f'-{seconds * 1000:.0f}ms.folded')
+            write_folded(os.path.join(app.config['PROFILE_DIR'], file_name), samples)
+
+
+def start_render(_app, template, **_context):
+    """
+    Remember when a template started rendering
+    """
+    g.render_start = (template.name, time.perf_counter())
+
+
+def finish_render(_app, template, **_context):
+    """
+    Record the rendering of a template as a render stage,
+    streamed templates are recorded once their body is sent,
+    in the metrics but not in the Server-Timing header
+    """
+    started = g.pop('render_start', None)
+    if started is not None and started[0] == template.name:
+        stages.record('render', time.perf_counter() - started[1])
+
+
+def metrics():
+    """
+    The app's metrics in the Prometheus text format
+    :return:
+        Response
+    """
+    registry = current_app.extensions[EXTENSION_NAME].registry
+    return current_app.response_class(registry.render(), content_type=CONTENT_TYPE)
+
+
+def init_app(app: Flask):
+    """
+    Set the default instrumentation config,
+    time every request and serve the metrics
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    profile = app.config['PROFILE_SLOW_REQUESTS'] is not None
+    app.extensions[EXTENSION_NAME] = Instrumentation(
+        app.config['PROFILE_INTERVAL'] if profile else None)
+
+    app.before_request(start_request)
+    app.after_request(finish_response)
+    app.teardown_request(teardown_request_timing)
+    before_render_template.connect(start_render, app)
+    template_rendered.connect(finish_render, app)
+    if app.config['METRICS_PATH']:
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', metrics)
@@ -0,0 +1,54 @@
+"""
+JSON responses of the app:
+a Flask JSON provider writing User and Movie records
+with the data backend's JSON codec
+"""
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from movieflix.data_manager.json_codecs import get_codec
+from movieflix.data_manager.records import Record
+
+COMPACT_SEPARATORS = (',', ':')
+
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """
+    Flask's JSON provider, writing records as JSON objects
+
+    Compact responses, the default outside debug mode,
+    are written by the DATA_CODEC codec (orjson or msgspec when
+    installed), anything the codec cannot write falls back
+    to Flask's json module based provider.
+    """
+    def __init__(self, app: Flask):
+        super().__init__(app)
+        self._codec = get_codec(app.config.get('DATA_CODEC', 'auto'), compact=True)
+
+    @staticmethod
+    def default(o):
+        """
+        Return a JSON value for objects json cannot write itself
+        :param o: object
+        :return:
+            JSON value
+        """
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs) -> str:
+        """
+        Serialize data as JSON to a string
+        :param obj: the data to serialize
+        :param kwargs: passed to json.dumps
+        :return:
+            JSON (str)
+        """
+        if kwargs.keys() <= {'separators'} \
+                and kwargs.get('separators', COMPACT_SEPARATORS) == COMPACT_SEPARATORS:
+            try:
+                return self._codec.dumps(obj).decode('utf-8')
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
@@ -7,57 +7,108 @@ update movie
 delete movie
 routes
 """
+import click
 import requests
-from flask import Blueprint, render_template, request, redirect, url_for, abort
-
-from movieflix.data_manager.json_data_manager import JSONDataManager
-from movieflix.data_manager.users import Users
+from flask import Blueprint, render_template, request, redirect, url_for, abort, \
+    current_app, jsonify
+
+from movieflix.bulk_import import import_movies, parse_titles
+from movieflix.data_backend import get_movie_catalog, user_generation, users_data_manager
+from movieflix.data_manager.movie_index import SORT_KEYS
+from movieflix.http_cache import conditional
+from movieflix.omdb.cache import is_error_response
+from movieflix.omdb.enrichment import MovieEnricher
+from movieflix.omdb_backend import movie_lookup_cache, omdb_client
+from movieflix.paging import get_page_args, render_page
+from movieflix.poster_backend import poster_cache
 
 movies_bp = Blueprint('movies', __name__)
 
-FILEPATH = 'data/movies.json'
-users_data_manager = Users(JSONDataManager(FILEPATH, 'user_id'))
+ENRICHER_NAME = 'movie_enricher'
 
-API_KEY = 'Your_API_KEY'
-BASE_URL_KEY = f'http://www.omdbapi.com/?apikey={API_KEY}'
 IMDB_BASE_URL = 'https://www.imdb.com/title/'
 
 
+def get_movie_query_args() -> dict:
+    """
+    Get the sort and filter arguments of a movies listing:
+    sort=name|year|rating, order=asc|desc,
+    year_from, year_to, min_rating, director,
+    q (words the title words start with), prefix (start of the title)
+    :return:
+        query arguments of Users.get_user_movies_page (dict) |
+        bad request error message
+    """
+    args = request.args
+    query = {}
+    if args.get('sort'):
+        if args['sort'] not in SORT_KEYS:
+            abort(400, [f"Movies can be sorted by {', '.join(SORT_KEYS)}"])
+        query['sort'] = args['sort']
+        query['descending'] = args.get('order') == 'desc'
+    try:
+        for name, convert in (('year_from', int), ('year_to', int), ('min_rating', float)):
+            if args.get(name):
+                query[name] = convert(args[name])
+    except ValueError:
+        abort(400, ['Years must be whole numbers and rating must be a number'])
+    for name, query_name in (('director', 'director'), ('q', 'search'), ('prefix', 'prefix')):
+        if args.get(name, '').strip():
+            query[query_name] = args[name].strip()
+    return query
+
+
 @movies_bp.route('/users/<int:user_id>', methods=['GET'])
+@conditional(user_generation)
 def get_user_movies(user_id: int):
     """
-    Get user's movies list given user id
+    Get a page of user's movies list given user id,
+    ?limit=&offset= or ?limit=&after=<movie_id>,
+    sorted and filtered by the arguments of get_movie_query_args
     :param
         user_id: int
     :return:
         Render to user_movies.html
             with user_id and
-            list of users movies dictionaries
+            a page of users movies dictionaries
             arguments
-        User not found error message
+        User not found error message |
+        Bad request error message
     """
     user = users_data_manager.get_user(user_id)
-    user_movies = users_data_manager.get_user_movies(user_id)
+    page = users_data_manager.get_user_movies_page(user_id, **get_page_args(),
+                                                   query=get_movie_query_args())
 
-    if user_movies is None or user is None:
+    if page is None or user is None:
         abort(404)
 
-    return render_template('user_movies.html',
-                           user=user,
-                           user_movies=user_movies)
+    return render_page('user_movies.html', page,
+                       user=user,
+                       user_movies=page['items'])
 
 
 def fetch_movie_api_response(title: str) -> dict:
     """
     Fetch api response movie info
-    given movie title
+    given movie title,
+    from the lookup cache if it was fetched before
     :param title: str
     :return: movie info (dict)
     """
-    response = requests.get(f'{BASE_URL_KEY}&t={title}', timeout=5)
-    response.raise_for_status()  # check if there was an error with the request
+    cached_response = movie_lookup_cache.get(title)
+    if cached_response is not None:
+        if is_error_response(cached_response):
+            raise requests.exceptions.RequestException(cached_response['Error'])
+        return cached_response
+
+    try:
+        movie_info = omdb_client.fetch_movie(title)
+    except requests.exceptions.RequestException:
+        movie_lookup_cache.set_error(title)
+        raise
 
-    return response.json()
+    movie_lookup_cache.set(title, movie_info)
+    return movie_info
 
 
 def get_error_messages(movie_info: dict) -> list:
@@ -100,9 +151,26 @@ def get_error_messages(movie_info: dict) -> list:
     return error_messages
 
 
+def parse_number(value, convert, default):
+    """
+    Parse a number of an OMDb response,
+    which is 'N/A' when OMDb does not know it
+    :param value: str
+    :param convert: int | float
+    :param default: number returned for unknown or invalid values
+    :return:
+        number (int | float)
+    """
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return default
+
+
 def format_movie_info(response: dict, movie_name: str) -> dict:
     """
-    Format movie info
+    Format movie info,
+    unknown years and ratings are 0
     :param response: dict
     :param movie_name: str
     :return:
@@ -110,8 +178,8 @@ def format_movie_info(response: dict, movie_name: str) -> dict:
     """
     return {'name': response.get('Title', movie_name),
             'director': response.get('Director', ''),
-            'year': int(response.get('Year', '0000')[:4]),
-            'rating': float(response.get('imdbRating', 0.0)),
+            'year': parse_number(str(response.get('Year', ''))[:4], int, 0),
+            'rating': parse_number(response.get('imdbRating'), float, 0.0),
             'poster': response.get('Poster', ''),
             'website': IMDB_BASE_URL + response.get('imdbID', '')
             }
@@ -133,6 +201,49 @@ def get_empty_info(movie_name: str) -> dict:
             }
 
 
+def lookup_movie_info(movie_name: str) -> dict | None:
+    """
+    Look up movie details from OMDb API
+    :param movie_name: str
+    :return:
+        Movie info from OMDb API (dict) |
+        empty dict if OMDb does not know the movie |
+        None if the request failed
+    """
+    try:
+        response = fetch_movie_api_response(movie_name)
+    except (requests.exceptions.Timeout,
+            requests.exceptions.HTTPError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.RequestException) as error:
+        current_app.logger.warning('OMDb lookup of %r failed: %s', movie_name, error)
+        return None
+
+    if response.get('Response') == 'False':
+        return {}
+    movie_info = format_movie_info(response, movie_name)
+    movie_catalog = get_movie_catalog()
+    if movie_catalog is not None:
+        # catalog records hold OMDb details only, users' edits are stored as overrides
+        movie_catalog.put(movie_info)
+    return movie_info
+
+
+def get_new_movie_name() -> str:
+    """
+    Get new movie name from add movie form
+    :return:
+        New movie name (str) |
+        bad request error message
+    """
+    movie_name = request.form.get('name', '')
+
+    error_messages = get_error_messages({'name': movie_name})
+    if error_messages:
+        abort(400, error_messages)
+    return movie_name
+
+
 def get_new_movie_info() -> dict:
     """
     Get new movie info:
@@ -142,24 +253,71 @@ def get_new_movie_info() -> dict:
         New movie info from OMDb API (dict) |
         New movie name from add movie form (dict)
     """
-    movie_name = request.form.get('name', '')
+    movie_name = get_new_movie_name()
+    return lookup_movie_info(movie_name) or get_empty_info(movie_name)
 
-    error_messages = get_error_messages({'name': movie_name})
-    if error_messages:
-        abort(400, error_messages)
 
-    try:
-        response = fetch_movie_api_response(movie_name)
-        return format_movie_info(response, movie_name)
+@movies_bp.record_once
+def init_movie_enricher(state):
+    """
+    Build the app's background movie enricher
+    when the blueprint is registered
+    :param state: BlueprintSetupState
+    """
+    app = state.app
+    app.config.setdefault('OMDB_ASYNC_ENRICHMENT', True)
+    app.config.setdefault('OMDB_ENRICHMENT_WORKERS', 4)
+    app.config.setdefault('IMPORT_WORKERS', 8)
+    app.config.setdefault('IMPORT_MAX_TITLES', 1000)
+
+    def lookup(title: str) -> dict | None:
+        with app.app_context():
+            return lookup_movie_info(title)
+
+    def apply(user_id: int, movie_id: int, title: str, movie_info: dict) -> bool | None:
+        with app.app_context():
+            # an edit made during the lookup, or a movie_id reused after a delete, is kept
+            queued_movie = dict(get_empty_info(title), movie_id=movie_id)
+            result = users_data_manager.update_user_movie(user_id, movie_id, movie_info,
+                                                          expected_movie=queued_movie)
+            if result and app.config['POSTER_PREFETCH']:
+                # the poster is fetched and resized before the movies page asks for it
+                poster_cache.prefetch(movie_info.get('poster'))
+            return result
+
+    app.extensions[ENRICHER_NAME] = MovieEnricher(
+        lookup, apply, max_workers=app.config['OMDB_ENRICHMENT_WORKERS'])
+
+
+def get_movie_enricher() -> MovieEnricher:
+    """
+    Return the background movie enricher of the current app
+    :return:
+        MovieEnricher
+    """
+    return current_app.extensions[ENRICHER_NAME]
 
-    except (requests.exceptions.Timeout,
-            requests.exceptions.HTTPError,
-            requests.exceptions.ConnectionError,
-            requests.exceptions.RequestException):
-        print("Request error. "
-              "Check your internet connection "
-              "and make sure the website is accessible.")
-        return get_empty_info(movie_name)
+
+def add_new_movie(user_id: int) -> bool | None:
+    """
+    Add the movie from the add movie form to a user.
+    With OMDB_ASYNC_ENRICHMENT the movie is stored
+    with empty info and its details are filled in
+    in the background
+    :param user_id: int
+    :return:
+        True for success add (bool) |
+        None
+    """
+    if not current_app.config['OMDB_ASYNC_ENRICHMENT']:
+        return users_data_manager.add_user_movie(user_id, get_new_movie_info())
+
+    movie_name = get_new_movie_name()
+    new_movie = get_empty_info(movie_name)
+    if users_data_manager.add_user_movie(user_id, new_movie) is None:
+        return None
+    get_movie_enricher().submit(movie_name, user_id, new_movie['movie_id'])
+    return True
 
 
 @movies_bp.route('/users/<int:user_id>/add_movie', methods=['GET', 'POST'])
@@ -181,12 +339,130 @@ def add_movie(user_id: int):
         abort(404)
 
     if request.method == 'POST':
-        if users_data_manager.add_user_movie(user_id, get_new_movie_info()) is None:
+        if add_new_movie(user_id) is None:
             abort(404)
         return redirect(url_for('movies.get_user_movies', user_id=user_id))
     return render_template('add_movie.html', user=user)
 
 
+@movies_bp.route('/users/<int:user_id>/movies/<int:movie_id>/status', methods=['GET'])
+def get_movie_status(user_id: int, movie_id: int):
+    """
+    Get the OMDb enrichment status of a user's movie
+    :param user_id: int
+    :param movie_id: int
+    :return:
+        json {'user_id', 'movie_id', 'status'},
+            status 'pending' | 'enriched' | 'not_found' | 'failed' | 'stale' | 'unknown' |
+        movie not found error message
+    """
+    if users_data_manager.get_user_movie(user_id, movie_id) is None:
+        abort(404)
+    return jsonify(user_id=user_id,
+                   movie_id=movie_id,
+                   status=get_movie_enricher().status(user_id, movie_id))
+
+
+def import_titles(user_id: int, titles: list) -> list | None:
+    """
+    Import movie titles to a user:
+    invalid titles are skipped,
+    the others are looked up concurrently
+    and added in one write
+    :param user_id: int
+    :param titles: list of titles
+    :return:
+        per title results [{'title', 'movie_id', 'name', 'status'}],
+            status 'found', 'not_found', 'empty' or 'invalid' (list) |
+        None if the user does not exist
+    """
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+
+    def lookup(title: str) -> dict | None:
+        with app.app_context():
+            return lookup_movie_info(title)
+
+    valid_titles = [title for title in titles if not get_error_messages({'name': title})]
+    results = import_movies(users_data_manager, user_id, valid_titles,
+                            lookup, get_empty_info,
+                            max_workers=app.config['IMPORT_WORKERS'])
+    if results is None:
+        return None
+    results += [{'title': title, 'movie_id': None, 'name': title, 'status': 'invalid'}
+                for title in titles if get_error_messages({'name': title})]
+    return results
+
+
+def get_import_titles() -> list:
+    """
+    Get the titles to import from
+    a json body {"titles": [...]},
+    an uploaded file or
+    the titles text of the import form
+    :return:
+        titles (list) |
+        bad request error message
+    """
+    try:
+        if request.is_json:
+            titles = parse_titles(request.get_data(as_text=True))
+        elif request.files.get('file'):
+            upload = request.files['file']
+            titles = parse_titles(upload.read().decode('utf-8'), upload.filename or '')
+        else:
+            titles = parse_titles(request.form.get('titles', ''))
+    except (ValueError, UnicodeDecodeError):
+        abort(400, ['Import file must be a JSON, CSV or text file of movie titles'])
+
+    if not titles:
+        abort(400, ['No movie titles to import'])
+    if len(titles) > current_app.config['IMPORT_MAX_TITLES']:
+        abort(400, [f"At most {current_app.config['IMPORT_MAX_TITLES']} "
+                    f"movies can be imported at once"])
+    return titles
+
+
+@movies_bp.route('/users/<int:user_id>/import_movies', methods=['GET', 'POST'])
+def import_user_movies(user_id: int):
+    """
+    Render import_movies form to import
+    a list of movie titles for a given user id
+    :param user_id: int
+    :return:
+        GET: render import_movies page
+        POST:
+            render import_movies page with per title results |
+            json {'results': [...]} for json requests |
+            user not found error message
+    """
+    user = users_data_manager.get_user(user_id)
+    if user is None:
+        abort(404)
+
+    if request.method == 'POST':
+        results = import_titles(user_id, get_import_titles())
+        if results is None:
+            abort(404)
+        if request.is_json:
+            return jsonify(results=results)
+        return render_template('import_movies.html', user=user, results=results)
+    return render_template('import_movies.html', user=user, results=None)
+
+
+@movies_bp.cli.command('import')
+@click.argument('user_id', type=int)
+@click.argument('import_file', type=click.File('r', encoding='utf-8'))
+def import_movies_command(user_id: int, import_file):
+    """
+    Import a JSON, CSV or text file of movie titles to a user
+    """
+    results = import_titles(user_id, parse_titles(import_file.read(), import_file.name))
+    if results is None:
+        raise click.ClickException(f'User {user_id} not found')
+    for result in results:
+        click.echo(f"{result['status']:8} {result['movie_id'] or '-':>6} {result['title']}")
+
+
 def isfloat(number: str) -> bool:
     """
     Check if the given number is float type
@@ -244,6 +520,7 @@ def get_updated_movie_info() -> dict:
 
 
 @movies_bp.route('/users/<int:user_id>/update_movie/<int:movie_id>', methods=['GET', 'POST'])
+@conditional(user_generation)
 def update_movie(user_id: int, movie_id: int):
     """
     -Render update_movie form
@@ -0,0 +1,173 @@
+"""
+MovieLookupCache class
+Caching OMDb title lookups in memory and on disk
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookups (
+    title TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+SELECT_LOOKUP = 'SELECT response, expires_at FROM lookups WHERE title = ?'
+UPSERT_LOOKUP = 'INSERT OR REPLACE INTO lookups (title, response, expires_at) VALUES (?, ?, ?)'
+DELETE_EXPIRED = 'DELETE FROM lookups WHERE expires_at <= ?'
+
+ERROR_RESPONSE = {'Response': 'False', 'Error': 'Request error'}
+
+
+def normalize_title(title: str) -> str:
+    """
+    Return the cache key of a movie title:
+    case folded with single spaces
+    :param title: str
+    :return:
+        normalized title (str)
+    """
+    return ' '.join(title.split()).casefold()
+
+
+def is_error_response(response: dict) -> bool:
+    """
+    Check if a cached response stands for a failed request
+    :param response: dict
+    :return:
+        True for a cached request error (bool)
+    """
+    return response is ERROR_RESPONSE or response == ERROR_RESPONSE
+
+
+class MovieLookupCache:
+    """
+    A two layer cache of OMDb responses keyed by normalized title:
+    an in-memory LRU in front of a SQLite file that survives restarts.
+
+    Found movies are kept for hit_ttl seconds,
+    'Movie not found' responses for miss_ttl seconds
+    and failed requests for error_ttl seconds.
+    """
+    def __init__(self, database=None, max_entries=1024,
+                 hit_ttl=7 * 24 * 3600, miss_ttl=24 * 3600, error_ttl=60,
+                 clock=time.time):
+        self._database = database
+        self._max_entries = max_entries
+        self._hit_ttl = hit_ttl
+        self._miss_ttl = miss_ttl
+        self._error_ttl = error_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0}
+        if database is not None:
+            with self._connection() as connection:
+                connection.execute(SCHEMA)
+                connection.execute(DELETE_EXPIRED, (self._clock(),))
+
+    @property
+    def stats(self) -> dict:
+        """
+        Return the hit and miss counters and the hit rate
+        :return:
+            {'memory_hits', 'disk_hits', 'misses', 'expired', 'hit_rate'} (dict)
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return the SQLite connection of the current thread
+        :return:
+            sqlite3.Connection
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._database)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _remember(self, key: str, response: dict, expires_at: float):
+        """
+        Put an entry in the memory layer,
+        evicting the least recently used entries
+        :param key: normalized title
+        :param response: dict
+        :param expires_at: float
+        """
+        with self._lock:
+            self._entries[key] = (response, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, title: str) -> dict | None:
+        """
+        Return the cached OMDb response of a title
+        :param title: str
+        :return:
+            OMDb response (dict), ERROR_RESPONSE for a cached request error |
+            None if not cached or expired
+        """
+        key = normalize_title(title)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+                self._counters['expired'] += 1
+
+        if self._database is not None:
+            row = self._connection().execute(SELECT_LOOKUP, (key,)).fetchone()
+            if row is not None and row[1] > now:
+                response = json.loads(row[0])
+                if response == ERROR_RESPONSE:
+                    response = ERROR_RESPONSE
+                self._remember(key, response, row[1])
+                with self._lock:
+                    self._counters['disk_hits'] += 1
+                return response
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, title: str, response: dict):
+        """
+        Cache an OMDb response of a title,
+        with the hit or miss TTL depending on the response
+        :param title: str
+        :param response: dict
+        """
+        if is_error_response(response):
+            ttl = self._error_ttl
+        elif response.get('Response', 'True') == 'True':
+            ttl = self._hit_ttl
+        else:
+            ttl = self._miss_ttl
+        key = normalize_title(title)
+        expires_at = self._clock() + ttl
+        self._remember(key, response, expires_at)
+        if self._database is not None:
+            with self._connection() as connection:
+                connection.execute(UPSERT_LOOKUP, (key, json.dumps(response), expires_at))
+
+    def set_error(self, title: str):
+        """
+        Cache a failed request of a title for error_ttl seconds
+        :param title: str
+        """
+        self.set(title, ERROR_RESPONSE)
@@ -0,0 +1,187 @@
+"""
+OMDbClient class
+Fetching movie info from the OMDb API
+over a pooled keep-alive session,
+with deadlines, retries and a circuit breaker
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from movieflix.profiling import stages
+
+OMDB_URL = 'http://www.omdbapi.com/'
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of calling OMDb
+    while the circuit breaker is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Fails fast after failure_threshold failed calls in a row.
+    After reset_timeout seconds one trial call is let through:
+    success closes the circuit, failure opens it again.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Return the circuit state
+        :return:
+            'closed' | 'open' | 'half-open' (str)
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._clock() - self._opened_at >= self._reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow_request(self) -> bool:
+        """
+        Check if a call may be made now,
+        in half-open state only one trial call is allowed
+        :return:
+            True if the call may be made (bool)
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self._reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        """
+        Close the circuit after a successful call
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """
+        Count a failed call,
+        open the circuit at failure_threshold failures
+        """
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self._failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+class OMDbClient:
+    """
+    A client of the OMDb API
+
+    Connections are kept alive in a pool of pool_size connections.
+    Every attempt is limited by connect_timeout and read_timeout,
+    the whole call including retries by total_timeout.
+    Connection errors, timeouts and 429/5xx responses are retried
+    up to max_retries times with exponential backoff and full jitter.
+    """
+    def __init__(self, api_key, base_url=OMDB_URL,
+                 connect_timeout=1.0, read_timeout=2.0, total_timeout=4.0,
+                 max_retries=2, backoff=0.2, pool_size=10,
+                 circuit_breaker=None):
+        self._api_key = api_key
+        self._base_url = base_url
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._total_timeout = total_timeout
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def close(self):
+        """
+        Close the pooled connections
+        """
+        self._session.close()
+
+    @staticmethod
+    def _is_retryable(error: requests.exceptions.RequestException) -> bool:
+        """
+        Check if a failed attempt may succeed when retried
+        :param error: requests.exceptions.RequestException
+        :return:
+            True to retry (bool)
+        """
+        if isinstance(error, (requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return response is not None and response.status_code in RETRY_STATUS_CODES
+
+    def _get(self, title: str, timeout: tuple) -> dict:
+        """
+        Make one request for a movie title
+        :param title: str
+        :param timeout: (connect timeout, read timeout)
+        :return:
+            OMDb response (dict)
+        """
+        with stages.timed('omdb') as timer:
+            response = self._session.get(self._base_url,
+                                         params={'apikey': self._api_key, 't': title},
+                                         timeout=timeout)
+            timer.size = len(response.content)
+        response.raise_for_status()  # check if there was an error with the request
+        return response.json()
+
+    def fetch_movie(self, title: str) -> dict:
+        """
+        Fetch the OMDb response of a movie title
+        :param title: str
+        :return:
+            OMDb response (dict)
+        :raises:
+            requests.exceptions.RequestException when OMDb could not be reached,
+            CircuitOpenError without calling OMDb while the circuit is open
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError('OMDb circuit breaker is open')
+
+        deadline = time.monotonic() + self._total_timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout('OMDb total timeout exceeded')
+                movie_info = self._get(title, (min(self._connect_timeout, remaining),
+                                               min(self._read_timeout, remaining)))
+            except requests.exceptions.RequestException as error:
+                delay = random.uniform(0, self._backoff * 2 ** attempt)
+                if attempt >= self._max_retries or not self._is_retryable(error) \
+                        or time.monotonic() + delay >= deadline:
+                    self.circuit_breaker.record_failure()
+                    raise
+                attempt += 1
+                time.sleep(delay)
+            else:
+                self.circuit_breaker.record_success()
+                return movie_info
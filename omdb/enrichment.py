@@ -0,0 +1,123 @@
+"""
+MovieEnricher class
+Filling in movie details from OMDb in the background
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import normalize_title
+
+PENDING = 'pending'
+ENRICHED = 'enriched'
+FAILED = 'failed'
+NOT_FOUND = 'not_found'
+STALE = 'stale'
+UNKNOWN = 'unknown'
+
+
+class MovieEnricher:
+    """
+    A pool of background workers looking up movie titles
+    and applying the movie info to the stored movies
+
+    lookup(title) returns the movie info, an empty dict if the title
+    is not found or None if it failed, apply(user_id, movie_id, title, movie_info)
+    stores found movie info and returns True, False if the movie
+    is no longer the one queued for title (edited or deleted meanwhile,
+    its status is then 'stale') or None if the write failed.
+    A title already being looked up is not looked up again,
+    the movies waiting for it are all updated with one result.
+    The status of the last max_statuses movies is kept.
+    """
+    def __init__(self, lookup, apply, max_workers=4, max_statuses=10_000):
+        self._lookup = lookup
+        self._apply = apply
+        self._max_statuses = max_statuses
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='movie-enricher')
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._statuses = OrderedDict()
+
+    def _set_status(self, user_id: int, movie_id: int, status: str):
+        """
+        Record the status of a movie,
+        dropping the oldest statuses
+        the lock must be held
+        """
+        self._statuses[(user_id, movie_id)] = status
+        self._statuses.move_to_end((user_id, movie_id))
+        while len(self._statuses) > self._max_statuses:
+            self._statuses.popitem(last=False)
+
+    def submit(self, title: str, user_id: int, movie_id: int):
+        """
+        Queue a movie for enrichment
+        :param title: str
+        :param user_id: int
+        :param movie_id: int
+        """
+        key = normalize_title(title)
+        with self._lock:
+            self._set_status(user_id, movie_id, PENDING)
+            waiters = self._in_flight.get(key)
+            if waiters is not None:
+                waiters.append((user_id, movie_id, title))
+                return
+            self._in_flight[key] = [(user_id, movie_id, title)]
+        self._executor.submit(self._enrich, key, title)
+
+    def _enrich(self, key: str, title: str):
+        """
+        Look up a title and apply the result
+        to every movie waiting for it
+        :param key: normalized title
+        :param title: str
+        """
+        try:
+            movie_info = self._lookup(title)
+        except Exception:  # pylint: disable=broad-exception-caught
+            movie_info = None
+
+        with self._lock:
+            waiters = self._in_flight.pop(key, [])
+
+        for user_id, movie_id, queued_title in waiters:
+            status = FAILED if movie_info is None else NOT_FOUND
+            if movie_info:
+                try:
+                    result = self._apply(user_id, movie_id, queued_title, dict(movie_info))
+                except Exception:  # pylint: disable=broad-exception-caught
+                    result = None
+                status = ENRICHED if result else STALE if result is False else FAILED
+            with self._lock:
+                self._set_status(user_id, movie_id, status)
+
+    def status(self, user_id: int, movie_id: int) -> str:
+        """
+        Return the enrichment status of a movie
+        :param user_id: int
+        :param movie_id: int
+        :return:
+            'pending' | 'enriched' | 'not_found' | 'failed' | 'stale' | 'unknown' (str)
+        """
+        with self._lock:
+            return self._statuses.get((user_id, movie_id), UNKNOWN)
+
+    @property
+    def pending(self) -> int:
+        """
+        Return the number of titles being looked up
+        :return:
+            number of titles (int)
+        """
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers
+        :param wait: wait for the queued lookups to finish
+        """
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,198 @@
+"""
+FakeOMDbServer class
+A local stand-in for the OMDb API
+for tests, benchmarks and load tests
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+NOT_FOUND = {'Response': 'False', 'Error': 'Movie not found!'}
+POSTER_BASE_URL = 'https://m.media-amazon.com/images/M/'
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """
+    A threading HTTP server that ignores clients
+    hanging up before the response is written
+    """
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """
+        Ignore dropped connections, report other errors
+        """
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def fake_movie(title: str, poster_base_url: str = POSTER_BASE_URL) -> dict:
+    """
+    Return an OMDb style response for any title
+    :param title: str
+    :param poster_base_url: url the poster urls start with,
+        e.g. a FakeImageServer's url
+    :return:
+        OMDb response (dict)
+    """
+    imdb_number = zlib.crc32(title.casefold().encode('utf-8')) % 10_000_000
+    return {'Title': title,
+            'Year': '1997',
+            'Director': 'James Cameron',
+            'imdbRating': '7.9',
+            'Poster': f'{poster_base_url}{imdb_number}.jpg',
+            'imdbID': f'tt{imdb_number:07d}',
+            'Response': 'True'}
+
+
+class FakeOMDbServer:
+    """
+    An HTTP server answering OMDb '?t=<title>' requests
+    in a background thread
+
+    movies maps titles to responses, other titles are answered
+    with fake_movie(title) or 'Movie not found!' if known_only.
+    latency delays every response, the first fail_requests
+    requests are answered with fail_status.
+    Fake posters are linked below poster_base_url.
+    """
+    def __init__(self, movies=None, latency=0.0, fail_requests=0, fail_status=503,
+                 known_only=False, poster_base_url=POSTER_BASE_URL,
+                 host='127.0.0.1', port=0):
+        self.movies = {title.casefold(): movie for title, movie in (movies or {}).items()}
+        self.latency = latency
+        self.fail_requests = fail_requests
+        self.fail_status = fail_status
+        self.known_only = known_only
+        self.poster_base_url = poster_base_url
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Return the base url of the server
+        :return:
+            url (str)
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def _handler_class(self):
+        """
+        Return the request handler class bound to this server
+        """
+        fake_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Answer one OMDb request
+            """
+            def do_GET(self):  # pylint: disable=invalid-name
+                """
+                Answer GET /?t=<title>
+                """
+                with fake_server._lock:  # pylint: disable=protected-access
+                    fake_server.requests += 1
+                    failing = fake_server.requests <= fake_server.fail_requests
+                if fake_server.latency:
+                    time.sleep(fake_server.latency)
+                if failing:
+                    self._send(fake_server.fail_status, {'Response': 'False',
+                                                         'Error': 'Fake failure'})
+                    return
+                title = parse_qs(urlparse(self.path).query).get('t', [''])[0]
+                self._send(200, fake_server.response_for(title))
+
+            def _send(self, status: int, body: dict):
+                """
+                Send a json response
+                """
+                content = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """
+                Keep the test output quiet
+                """
+
+        return Handler
+
+    def response_for(self, title: str) -> dict:
+        """
+        Return the response to a title
+        :param title: str
+        :return:
+            OMDb response (dict)
+        """
+        movie = self.movies.get(title.casefold())
+        if movie is not None:
+            return movie
+        if self.known_only or not title:
+            return NOT_FOUND
+        return fake_movie(title, self.poster_base_url)
+
+    def start(self):
+        """
+        Serve requests in a background thread
+        :return:
+            self
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """
+        Serve requests in the current thread until stopped
+        """
+        self._server.serve_forever()
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    """
+    Run a fake OMDb server from the command line
+    """
+    parser = argparse.ArgumentParser(description='Run a fake OMDb server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds to wait before each response')
+    parser.add_argument('--poster-url', default=POSTER_BASE_URL,
+                        help='base url of the fake posters, e.g. a fake image server')
+    args = parser.parse_args()
+
+    server = FakeOMDbServer(latency=args.latency, poster_base_url=args.poster_url,
+                            port=args.port)
+    print(f'Fake OMDb serving on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Test MovieLookupCache using pytest
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from movieflix.omdb.cache import MovieLookupCache, is_error_response
+
+TITANIC = {"Title": "Titanic", "Year": "1997", "imdbID": "tt0120338", "Response": "True"}
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+
+
+class FakeClock:
+    """
+    A clock moved forward by the tests
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lookup_by_normalized_title():
+    """
+    Test titles differing in case and spaces share an entry
+    """
+    cache = MovieLookupCache()
+    cache.set('Titanic', TITANIC)
+    assert cache.get('  titanic ') == TITANIC
+    assert cache.get('Superman') is None
+    assert cache.stats['memory_hits'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.stats['hit_rate'] == 0.5
+
+
+def test_separate_ttls_for_hits_misses_and_errors():
+    """
+    Test not found and error responses expire
+    before found movies
+    """
+    clock = FakeClock()
+    cache = MovieLookupCache(hit_ttl=100, miss_ttl=50, error_ttl=10, clock=clock)
+    cache.set('Titanic', TITANIC)
+    cache.set('Unknown', NOT_FOUND)
+    cache.set_error('Superman')
+    assert is_error_response(cache.get('Superman'))
+
+    clock.now += 20
+    assert cache.get('Superman') is None
+    assert cache.get('Unknown') == NOT_FOUND
+
+    clock.now += 40
+    assert cache.get('Unknown') is None
+    assert cache.get('Titanic') == TITANIC
+    assert cache.stats['expired'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    """
+    Test the memory layer keeps max_entries entries
+    """
+    cache = MovieLookupCache(max_entries=2)
+    cache.set('Titanic', TITANIC)
+    cache.set('Superman', TITANIC)
+    cache.get('Titanic')
+    cache.set('Jaws', TITANIC)
+    assert cache.get('Superman') is None
+    assert cache.get('Titanic') == TITANIC
+
+
+def test_concurrent_lookups_are_all_counted():
+    """
+    Test lookups from many threads at once
+    are each counted once
+    """
+    cache = MovieLookupCache()
+    cache.set('Titanic', TITANIC)
+
+    def look_up(_number):
+        for title in ('Titanic', 'Unknown') * 500:
+            cache.get(title)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(look_up, range(8)))
+    assert cache.stats['memory_hits'] == 4000
+    assert cache.stats['misses'] == 4000
+
+
+def test_disk_layer_survives_restart(tmp_path):
+    """
+    Test a new cache on the same file
+    returns the responses cached before
+    """
+    database = tmp_path / 'omdb_cache.db'
+    MovieLookupCache(database).set('Titanic', TITANIC)
+    MovieLookupCache(database).set_error('Superman')
+
+    cache = MovieLookupCache(database)
+    assert cache.get('titanic') == TITANIC
+    assert is_error_response(cache.get('Superman'))
+    assert cache.stats['disk_hits'] == 2
+    assert cache.get('Titanic') == TITANIC
+    assert cache.stats['memory_hits'] == 1
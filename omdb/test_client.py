@@ -0,0 +1,84 @@
+"""
+Test OMDbClient against a local fake OMDb server using pytest
+"""
+import pytest
+import requests
+
+from movieflix.omdb.client import CircuitBreaker, CircuitOpenError, OMDbClient
+from movieflix.omdb.fake_server import FakeOMDbServer
+
+
+class FakeClock:
+    """
+    A clock moved forward by the tests
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fetch_movie():
+    """
+    Test a movie is fetched by title
+    """
+    with FakeOMDbServer() as server:
+        client = OMDbClient('test', base_url=server.url)
+        assert client.fetch_movie('Titanic & Co')['Title'] == 'Titanic & Co'
+
+
+def test_retry_after_server_error():
+    """
+    Test 5xx responses are retried
+    """
+    with FakeOMDbServer(fail_requests=2) as server:
+        client = OMDbClient('test', base_url=server.url, max_retries=2, backoff=0.01)
+        assert client.fetch_movie('Titanic')['Response'] == 'True'
+        assert server.requests == 3
+
+
+def test_client_error_is_not_retried():
+    """
+    Test 4xx responses fail without retrying
+    """
+    with FakeOMDbServer(fail_requests=5, fail_status=401) as server:
+        client = OMDbClient('test', base_url=server.url, backoff=0.01)
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.fetch_movie('Titanic')
+        assert server.requests == 1
+
+
+def test_total_timeout():
+    """
+    Test a slow server fails the call within the total timeout
+    """
+    with FakeOMDbServer(latency=0.5) as server:
+        client = OMDbClient('test', base_url=server.url,
+                            read_timeout=0.1, total_timeout=0.25, backoff=0.01)
+        with pytest.raises(requests.exceptions.Timeout):
+            client.fetch_movie('Titanic')
+
+
+def test_circuit_breaker_fails_fast():
+    """
+    Test the circuit opens after repeated failures
+    and closes after a successful trial call
+    """
+    clock = FakeClock()
+    with FakeOMDbServer(fail_requests=2) as server:
+        client = OMDbClient('test', base_url=server.url, max_retries=0,
+                            circuit_breaker=CircuitBreaker(2, 10.0, clock=clock))
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.fetch_movie('Titanic')
+
+        with pytest.raises(CircuitOpenError):
+            client.fetch_movie('Titanic')
+        assert server.requests == 2
+        assert client.circuit_breaker.state == 'open'
+
+        clock.now += 10
+        assert client.circuit_breaker.state == 'half-open'
+        assert client.fetch_movie('Titanic')['Response'] == 'True'
+        assert client.circuit_breaker.state == 'closed'
@@ -0,0 +1,87 @@
+"""
+Test MovieEnricher using pytest
+"""
+import threading
+
+from movieflix.omdb.enrichment import MovieEnricher
+
+
+def test_movies_waiting_for_a_title_share_one_lookup():
+    """
+    Test a title is looked up once
+    and applied to every movie queued for it
+    """
+    release = threading.Event()
+    lookups = []
+    applied = {}
+
+    def lookup(title):
+        lookups.append(title)
+        release.wait(5)
+        return {'name': title.title()}
+
+    def apply(user_id, movie_id, _title, movie_info):
+        applied[(user_id, movie_id)] = movie_info
+        return True
+
+    enricher = MovieEnricher(lookup, apply)
+    enricher.submit('titanic', 1, 1)
+    enricher.submit('Titanic ', 2, 5)
+    assert enricher.status(2, 5) == 'pending'
+    release.set()
+    enricher.shutdown()
+
+    assert lookups == ['titanic']
+    assert applied == {(1, 1): {'name': 'Titanic'}, (2, 5): {'name': 'Titanic'}}
+    assert enricher.status(1, 1) == 'enriched'
+    assert enricher.status(3, 1) == 'unknown'
+
+
+def test_failed_lookup():
+    """
+    Test a failed lookup leaves the movie unchanged
+    """
+    applied = []
+    enricher = MovieEnricher(lambda title: None,
+                             lambda *args: applied.append(args))
+    enricher.submit('Titanic', 1, 1)
+    enricher.shutdown()
+
+    assert not applied
+    assert enricher.status(1, 1) == 'failed'
+
+
+def test_title_not_found():
+    """
+    Test a title OMDb does not know leaves the movie unchanged
+    """
+    applied = []
+    enricher = MovieEnricher(lambda title: {},
+                             lambda *args: applied.append(args))
+    enricher.submit('Unknown', 1, 1)
+    enricher.shutdown()
+
+    assert not applied
+    assert enricher.status(1, 1) == 'not_found'
+
+
+def test_changed_movie_is_stale():
+    """
+    Test a movie changed while its title was looked up
+    is reported stale, a failed write as failed
+    """
+    results = {1: False, 2: None}
+    titles = []
+
+    def apply(_user_id, movie_id, title, _movie_info):
+        titles.append(title)
+        return results[movie_id]
+
+    enricher = MovieEnricher(lambda title: {'name': 'Titanic'}, apply)
+    enricher.submit('Titanic', 1, 1)
+    enricher.submit('titanic', 1, 2)
+    enricher.shutdown()
+
+    assert sorted(titles) == ['Titanic', 'titanic']
+    assert enricher.status(1, 1) == 'stale'
+    assert enricher.status(1, 2) == 'failed'
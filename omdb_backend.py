@@ -0,0 +1,76 @@
+"""
+OMDb backend of the app:
+the OMDb client and the movie lookup cache,
+built from the app config and shared by all requests
+"""
+from flask import Flask, current_app
+from werkzeug.local import LocalProxy
+
+from movieflix.omdb.cache import MovieLookupCache
+from movieflix.omdb.client import OMDB_URL, CircuitBreaker, OMDbClient
+
+LOOKUP_CACHE_NAME = 'omdb_lookup_cache'
+CLIENT_NAME = 'omdb_client'
+
+DEFAULT_CONFIG = {'OMDB_API_KEY': 'Your_API_KEY',
+                  'OMDB_URL': OMDB_URL,
+                  'OMDB_CONNECT_TIMEOUT': 1.0,
+                  'OMDB_READ_TIMEOUT': 2.0,
+                  'OMDB_TOTAL_TIMEOUT': 4.0,
+                  'OMDB_MAX_RETRIES': 2,
+                  'OMDB_POOL_SIZE': 10,
+                  'OMDB_BREAKER_FAILURES': 5,
+                  'OMDB_BREAKER_RESET': 30.0,
+                  'OMDB_CACHE_FILE': 'data/omdb_cache.db',
+                  'OMDB_CACHE_SIZE': 1024,
+                  'OMDB_HIT_TTL': 7 * 24 * 3600,
+                  'OMDB_MISS_TTL': 24 * 3600,
+                  'OMDB_ERROR_TTL': 60}
+
+
+def init_app(app: Flask):
+    """
+    Set the default OMDb config
+    and build the app's OMDb client and movie lookup cache
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.extensions[CLIENT_NAME] = OMDbClient(
+        app.config['OMDB_API_KEY'],
+        base_url=app.config['OMDB_URL'],
+        connect_timeout=app.config['OMDB_CONNECT_TIMEOUT'],
+        read_timeout=app.config['OMDB_READ_TIMEOUT'],
+        total_timeout=app.config['OMDB_TOTAL_TIMEOUT'],
+        max_retries=app.config['OMDB_MAX_RETRIES'],
+        pool_size=app.config['OMDB_POOL_SIZE'],
+        circuit_breaker=CircuitBreaker(app.config['OMDB_BREAKER_FAILURES'],
+                                       app.config['OMDB_BREAKER_RESET']))
+    app.extensions[LOOKUP_CACHE_NAME] = MovieLookupCache(
+        app.config['OMDB_CACHE_FILE'],
+        max_entries=app.config['OMDB_CACHE_SIZE'],
+        hit_ttl=app.config['OMDB_HIT_TTL'],
+        miss_ttl=app.config['OMDB_MISS_TTL'],
+        error_ttl=app.config['OMDB_ERROR_TTL'])
+
+
+def get_omdb_client() -> OMDbClient:
+    """
+    Return the OMDb client of the current app
+    :return:
+        OMDbClient
+    """
+    return current_app.extensions[CLIENT_NAME]
+
+
+def get_movie_lookup_cache() -> MovieLookupCache:
+    """
+    Return the movie lookup cache of the current app
+    :return:
+        MovieLookupCache
+    """
+    return current_app.extensions[LOOKUP_CACHE_NAME]
+
+
+omdb_client: OMDbClient = LocalProxy(get_omdb_client)
+movie_lookup_cache: MovieLookupCache = LocalProxy(get_movie_lookup_cache)
@@ -0,0 +1,82 @@
+"""
+Paging of the users and movies listings:
+reading the page arguments of a request
+and rendering large pages as a stream
+"""
+from flask import Flask, Response, abort, current_app, render_template, request, \
+    stream_template, url_for
+
+DEFAULT_CONFIG = {'PAGE_SIZE': 50,
+                  'MAX_PAGE_SIZE': 500,
+                  'STREAM_MIN_ITEMS': 100}
+
+
+def init_app(app: Flask):
+    """
+    Set the default paging config
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+
+
+def get_page_args() -> dict:
+    """
+    Get the page arguments of the request:
+    ?limit=<page size>&offset=<position> or
+    ?limit=<page size>&after=<id of the last item of the previous page>
+    :return:
+        {'limit', 'offset', 'after'} (dict) |
+        bad request error message
+    """
+    try:
+        limit = int(request.args.get('limit', current_app.config['PAGE_SIZE']))
+        offset = int(request.args.get('offset', 0))
+        after = request.args.get('after')
+        after = int(after) if after is not None else None
+    except ValueError:
+        abort(400, ['Page limit, offset and after must be whole numbers'])
+
+    if not 1 <= limit <= current_app.config['MAX_PAGE_SIZE'] or offset < 0:
+        abort(400, [f"Page limit must be between 1 and {current_app.config['MAX_PAGE_SIZE']} "
+                    f"and offset cannot be negative"])
+    return {'limit': limit, 'offset': offset, 'after': after}
+
+
+def get_page_urls(page: dict) -> dict:
+    """
+    Return the urls of the previous and next pages
+    of the current listing, keeping its other arguments
+    :param page: dict, see pagination.make_page
+    :return:
+        {'prev_url', 'next_url'}, None where there is no such page (dict)
+    """
+    listing_args = {key: value for key, value in request.args.items()
+                    if key not in ('limit', 'offset', 'after')}
+
+    def page_url(**page_args) -> str:
+        return url_for(request.endpoint, **request.view_args, **listing_args,
+                       limit=page['limit'], **page_args)
+
+    return {'prev_url': page_url(offset=page['prev_offset'])
+            if page['prev_offset'] is not None else None,
+            'next_url': page_url(after=page['next_after'])
+            if page['next_after'] is not None else None}
+
+
+def render_page(template_name: str, page: dict, **context) -> str | Response:
+    """
+    Render a page of a listing,
+    pages of STREAM_MIN_ITEMS items or more are streamed
+    while the template is rendered
+    :param template_name: str
+    :param page: dict, see pagination.make_page
+    :param context: template variables
+    :return:
+        rendered page (str) |
+        streamed response (Response)
+    """
+    context.update(page=page, **get_page_urls(page))
+    if len(page['items']) >= current_app.config['STREAM_MIN_ITEMS']:
+        return Response(stream_template(template_name, **context), mimetype='text/html')
+    return render_template(template_name, **context)
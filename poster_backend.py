@@ -0,0 +1,63 @@
+"""
+Poster backend of the app:
+the poster image cache,
+built from the app config and shared by all requests
+"""
+from flask import Flask, current_app
+from werkzeug.local import LocalProxy
+
+from movieflix.posters.cache import DEFAULT_ALLOWED_HOSTS, PosterCache, can_resize
+
+EXTENSION_NAME = 'poster_cache'
+
+DEFAULT_WIDTHS = (128, 256)
+
+DEFAULT_CONFIG = {'POSTER_CACHE_DIR': 'data/posters',
+                  'POSTER_WIDTHS': None,
+                  'POSTER_ALLOWED_HOSTS': DEFAULT_ALLOWED_HOSTS,
+                  'POSTER_MAX_BYTES': 5 * 1024 * 1024,
+                  'POSTER_CONNECT_TIMEOUT': 1.0,
+                  'POSTER_READ_TIMEOUT': 4.0,
+                  'POSTER_ERROR_TTL': 300,
+                  'POSTER_MAX_AGE': 365 * 24 * 3600,
+                  'POSTER_PREFETCH': True}
+
+
+def init_app(app: Flask):
+    """
+    Set the default poster config
+    and build the app's poster cache,
+    thumbnails are made in DEFAULT_WIDTHS if Pillow is installed
+    and POSTER_WIDTHS is not set
+    :param app: Flask
+    :raises:
+        ValueError if POSTER_WIDTHS is set but Pillow is not installed
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    widths = app.config['POSTER_WIDTHS']
+    if widths is None:
+        widths = DEFAULT_WIDTHS if can_resize() else ()
+    elif widths and not can_resize():
+        raise ValueError('POSTER_WIDTHS needs Pillow to resize posters, '
+                         'install it or set POSTER_WIDTHS to []')
+    app.extensions[EXTENSION_NAME] = PosterCache(
+        app.config['POSTER_CACHE_DIR'],
+        widths=widths,
+        allowed_hosts=app.config['POSTER_ALLOWED_HOSTS'],
+        max_bytes=app.config['POSTER_MAX_BYTES'],
+        connect_timeout=app.config['POSTER_CONNECT_TIMEOUT'],
+        read_timeout=app.config['POSTER_READ_TIMEOUT'],
+        error_ttl=app.config['POSTER_ERROR_TTL'])
+
+
+def get_poster_cache() -> PosterCache:
+    """
+    Return the poster cache of the current app
+    :return:
+        PosterCache
+    """
+    return current_app.extensions[EXTENSION_NAME]
+
+
+poster_cache: PosterCache = LocalProxy(get_poster_cache)
@@ -0,0 +1,384 @@
+"""
+PosterCache class
+Fetching movie posters once into a content-addressed
+disk cache and serving resized thumbnails of them
+"""
+import hashlib
+import io
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from movieflix.data_manager.file_utils import atomic_write
+from movieflix.profiling import stages
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency, posters are served unresized without it
+    Image = None
+
+LOCK_STRIPES = 64
+# images Pillow cannot read, or refuses to as decompression bombs, are served unresized
+RESIZE_ERRORS = (OSError, ValueError) + ((Image.DecompressionBombError,) if Image else ())
+DEFAULT_ALLOWED_HOSTS = ('m.media-amazon.com',)
+
+
+def can_resize() -> bool:
+    """
+    Check if thumbnails can be made, Pillow is installed
+    :return:
+        True or False (bool)
+    """
+    return Image is not None
+
+
+def is_poster_url(url) -> bool:
+    """
+    Check if a movie's poster is a fetchable url,
+    OMDb answers 'N/A' for movies without a poster
+    :param url: str | None
+    :return:
+        True for an http(s) url (bool)
+    """
+    return isinstance(url, str) and url.startswith(('http://', 'https://'))
+
+
+def is_public_address(address: str) -> bool:
+    """
+    Check if an IP address is a public internet address,
+    not a private, loopback, link-local, reserved or multicast one
+    :param address: str
+    :return:
+        True or False (bool)
+    """
+    ip_address = ipaddress.ip_address(address)
+    return ip_address.is_global and not ip_address.is_multicast
+
+
+def source_key(url: str) -> str:
+    """
+    Return the cache key of a poster url
+    :param url: str
+    :return:
+        hex digest (str)
+    """
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class PosterCache:
+    """
+    A disk cache of poster images in directory
+
+    Every poster url is fetched once. The image is stored under
+    the sha256 of its content (objects/<ab>/<sha256>), so posters
+    shared by many movies or urls are stored once; the url is
+    mapped to its image by a small record (sources/<ab>/<key>.json).
+    Thumbnails are stored next to the image they are made from
+    (<sha256>.w<width>), resized with Pillow when installed and
+    otherwise served as the original image.
+
+    Requested widths are rounded up to the nearest of widths,
+    so a few thumbnail sizes are kept per poster.
+
+    Only urls on allowed_hosts are fetched, redirects are not
+    followed. A host name must resolve to public addresses only;
+    a host listed as an IP address, e.g. a local test server,
+    is fetched from whatever it is.
+    Images larger than max_bytes or not served as image/* are
+    refused, failed fetches are not retried for error_ttl seconds.
+    """
+    def __init__(self, directory, widths=(128, 256), max_bytes=5 * 1024 * 1024,
+                 connect_timeout=1.0, read_timeout=4.0, error_ttl=300.0,
+                 max_entries=4096, pool_size=10, clock=time.monotonic,
+                 allowed_hosts=DEFAULT_ALLOWED_HOSTS):
+        self._directory = os.fspath(directory)
+        self._widths = tuple(sorted(widths))
+        self._allowed_hosts = frozenset(host.lower() for host in allowed_hosts)
+        self._max_bytes = max_bytes
+        self._timeout = (connect_timeout, read_timeout)
+        self._error_ttl = error_ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._sources = OrderedDict()
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._fetch_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._counters = {'hits': 0, 'fetches': 0, 'failures': 0, 'thumbnails': 0}
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Return the hit, fetch, failure and thumbnail counters
+        :return:
+            {'hits', 'fetches', 'failures', 'thumbnails'} (dict)
+        """
+        return dict(self._counters)
+
+    def close(self):
+        """
+        Close the pooled connections
+        """
+        self._session.close()
+
+    def _path(self, *parts: str) -> str:
+        """
+        Return a path in the cache directory
+        :param parts: path components
+        :return:
+            path (str)
+        """
+        return os.path.join(self._directory, *parts)
+
+    def _source_path(self, key: str) -> str:
+        """
+        Return the path of a url's record
+        :param key: source key
+        :return:
+            path (str)
+        """
+        return self._path('sources', key[:2], f'{key}.json')
+
+    def _object_path(self, digest: str, width: int | None = None) -> str:
+        """
+        Return the path of an image or of one of its thumbnails
+        :param digest: sha256 of the original image
+        :param width: thumbnail width | None for the original
+        :return:
+            path (str)
+        """
+        name = digest if width is None else f'{digest}.w{width}'
+        return self._path('objects', digest[:2], name)
+
+    def _write(self, path: str, content: bytes):
+        """
+        Write a cache file atomically, creating its directory
+        :param path: str
+        :param content: bytes
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, content, fsync=False)
+
+    def _remember(self, key: str, source: dict):
+        """
+        Keep a url's record in memory,
+        evicting the least recently used records
+        :param key: source key
+        :param source: dict
+        """
+        with self._lock:
+            self._sources[key] = source
+            self._sources.move_to_end(key)
+            while len(self._sources) > self._max_entries:
+                self._sources.popitem(last=False)
+
+    def _cached_source(self, key: str) -> dict | None:
+        """
+        Return the record of a fetched url
+        :param key: source key
+        :return:
+            {'url', 'sha256', 'content_type'} (dict) |
+            None if the url was not fetched yet
+        """
+        with self._lock:
+            source = self._sources.get(key)
+            if source is not None:
+                self._sources.move_to_end(key)
+                return source
+        try:
+            with open(self._source_path(key), 'rb') as file:
+                source = json.loads(file.read())
+        except FileNotFoundError:
+            return None
+        if not os.path.exists(self._object_path(source['sha256'])):
+            return None
+        self._remember(key, source)
+        return source
+
+    def _check_host(self, url: str):
+        """
+        Check a poster url is on an allowed host
+        that does not resolve to a private address
+        :param url: str
+        :raises:
+            requests.exceptions.InvalidURL for a url that must not be fetched,
+            requests.exceptions.ConnectionError if its host cannot be resolved
+        """
+        host = urlsplit(url).hostname
+        if host is None or host.lower() not in self._allowed_hosts:
+            raise requests.exceptions.InvalidURL(f'{url} is not on an allowed poster host')
+        try:
+            ipaddress.ip_address(host)
+            return
+        except ValueError:
+            pass
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+        except OSError as error:
+            raise requests.exceptions.ConnectionError(f'{host}: {error}') from error
+        if not all(is_public_address(address) for address in addresses):
+            raise requests.exceptions.InvalidURL(f'{host} resolves to a private address')
+
+    def _download(self, url: str) -> tuple:
+        """
+        Download an image from an allowed host
+        :param url: str
+        :return:
+            (content (bytes), content type (str))
+        :raises:
+            requests.exceptions.RequestException when the image
+            must not or could not be fetched or is not a usable image
+        """
+        self._check_host(url)
+        with stages.timed('poster_fetch') as timer, \
+                self._session.get(url, timeout=self._timeout, stream=True,
+                                  allow_redirects=False) as response:
+            response.raise_for_status()
+            if response.is_redirect:
+                raise requests.exceptions.InvalidURL(f'{url} redirects, it is not followed')
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+            if not content_type.startswith('image/'):
+                raise requests.exceptions.ContentDecodingError(
+                    f'{url} is not an image ({content_type or "no content type"})')
+            content = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                timer.size = len(content)
+                if len(content) > self._max_bytes:
+                    raise requests.exceptions.ContentDecodingError(
+                        f'{url} is larger than {self._max_bytes} bytes')
+        return bytes(content), content_type
+
+    def _fetch(self, url: str, key: str) -> dict | None:
+        """
+        Return the record of a url, fetching it if needed,
+        the url's fetch lock must be held
+        :param url: str
+        :param key: source key
+        :return:
+            {'url', 'sha256', 'content_type'} (dict) |
+            None if the url could not be fetched
+        """
+        source = self._cached_source(key)
+        if source is not None:
+            self._counters['hits'] += 1
+            return source
+        with self._lock:
+            retry_at = self._failures.get(key)
+        if retry_at is not None and retry_at > self._clock():
+            return None
+
+        try:
+            content, content_type = self._download(url)
+        except requests.exceptions.RequestException:
+            self._counters['failures'] += 1
+            now = self._clock()
+            with self._lock:
+                self._failures[key] = now + self._error_ttl
+                if len(self._failures) > self._max_entries:
+                    self._failures = {failed_key: retry_at
+                                      for failed_key, retry_at in self._failures.items()
+                                      if retry_at > now}
+            return None
+        self._counters['fetches'] += 1
+
+        digest = hashlib.sha256(content).hexdigest()
+        if not os.path.exists(self._object_path(digest)):
+            self._write(self._object_path(digest), content)
+        source = {'url': url, 'sha256': digest, 'content_type': content_type}
+        self._write(self._source_path(key), json.dumps(source).encode('utf-8'))
+        with self._lock:
+            self._failures.pop(key, None)
+        self._remember(key, source)
+        return source
+
+    def _fit_width(self, width: int | None) -> int | None:
+        """
+        Return the thumbnail width serving a requested width
+        :param width: requested width | None for the original
+        :return:
+            width (int) |
+            None for the original image
+        """
+        if width is None or Image is None:
+            return None
+        for fitting_width in self._widths:
+            if width <= fitting_width:
+                return fitting_width
+        return None
+
+    def _thumbnail(self, digest: str, width: int) -> str:
+        """
+        Return the path of a thumbnail, making it if needed
+        :param digest: sha256 of the original image
+        :param width: int
+        :return:
+            path (str), the original's if it cannot be resized
+        """
+        path = self._object_path(digest, width)
+        if os.path.exists(path):
+            return path
+        try:
+            with Image.open(self._object_path(digest)) as image:
+                if image.width <= width:
+                    return self._object_path(digest)
+                image_format = image.format
+                image.thumbnail((width, image.height * width // image.width))
+                content = io.BytesIO()
+                image.save(content, format=image_format)
+        except RESIZE_ERRORS:
+            return self._object_path(digest)
+        self._write(path, content.getvalue())
+        self._counters['thumbnails'] += 1
+        return path
+
+    def get(self, url: str, width: int | None = None) -> dict | None:
+        """
+        Return a poster image, fetched and resized once
+        :param url: poster url
+        :param width: requested width | None for the original
+        :return:
+            {'path', 'content_type', 'etag'} (dict) |
+            None if the poster could not be fetched
+        """
+        if not is_poster_url(url):
+            return None
+        key = source_key(url)
+        with self._fetch_locks[int(key[:8], 16) % LOCK_STRIPES]:
+            source = self._fetch(url, key)
+            if source is None:
+                return None
+            width = self._fit_width(width)
+            path = self._object_path(source['sha256'])
+            if width is not None:
+                path = self._thumbnail(source['sha256'], width)
+        # a thumbnail that could not be made is served as the original, with its ETag
+        resized = path != self._object_path(source['sha256'])
+        return {'path': path,
+                'content_type': source['content_type'],
+                'etag': f"{source['sha256']}-w{width}" if resized else source['sha256']}
+
+    def prefetch(self, url: str) -> bool:
+        """
+        Fetch a poster and make its thumbnails ahead of the first page showing it
+        :param url: poster url
+        :return:
+            True if the poster is cached (bool)
+        """
+        if self.get(url) is None:
+            return False
+        if Image is not None:
+            for width in self._widths:
+                self.get(url, width)
+        return True
@@ -0,0 +1,191 @@
+"""
+FakeImageServer class
+A local stand-in for the poster image host
+for tests, benchmarks and load tests
+"""
+import argparse
+import struct
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """
+    A threading HTTP server that ignores clients
+    hanging up before the response is written
+    """
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """
+        Ignore dropped connections, report other errors
+        """
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def png_image(width: int, height: int, color: tuple) -> bytes:
+    """
+    Return a PNG image of one color
+    :param width: int
+    :param height: int
+    :param color: (red, green, blue)
+    :return:
+        PNG file content (bytes)
+    """
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return (struct.pack('>I', len(data)) + chunk_type + data
+                + struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+    row = b'\x00' + bytes(color) * width
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+
+def fake_poster(path: str, width=300, height=444) -> bytes:
+    """
+    Return the poster image of any path,
+    a PNG of a color derived from the path
+    :param path: str
+    :param width: int
+    :param height: int
+    :return:
+        PNG file content (bytes)
+    """
+    checksum = zlib.crc32(path.encode('utf-8'))
+    return png_image(width, height, (checksum & 0xff, checksum >> 8 & 0xff, checksum >> 16 & 0xff))
+
+
+class FakeImageServer:
+    """
+    An HTTP server answering GET <path> with a poster image
+    in a background thread
+
+    images maps paths to (content, content type), other paths
+    are answered with fake_poster(path) or 404 if known_only.
+    latency delays every response.
+    """
+    def __init__(self, images=None, latency=0.0, known_only=False,
+                 host='127.0.0.1', port=0):
+        self.images = dict(images or {})
+        self.latency = latency
+        self.known_only = known_only
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Return the base url of the server
+        :return:
+            url (str)
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def _handler_class(self):
+        """
+        Return the request handler class bound to this server
+        """
+        fake_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Answer one image request
+            """
+            def do_GET(self):  # pylint: disable=invalid-name
+                """
+                Answer GET <path>
+                """
+                with fake_server._lock:  # pylint: disable=protected-access
+                    fake_server.requests += 1
+                if fake_server.latency:
+                    time.sleep(fake_server.latency)
+                image = fake_server.image_for(self.path)
+                if image is None:
+                    self.send_error(404)
+                    return
+                content, content_type = image
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """
+                Keep the test output quiet
+                """
+
+        return Handler
+
+    def image_for(self, path: str) -> tuple | None:
+        """
+        Return the image served at a path
+        :param path: str
+        :return:
+            (content (bytes), content type (str)) |
+            None if not found
+        """
+        image = self.images.get(path)
+        if image is not None or self.known_only:
+            return image
+        return fake_poster(path), 'image/png'
+
+    def start(self):
+        """
+        Serve requests in a background thread
+        :return:
+            self
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """
+        Serve requests in the current thread until stopped
+        """
+        self._server.serve_forever()
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    """
+    Run a fake poster image server from the command line
+    """
+    parser = argparse.ArgumentParser(description='Run a fake poster image server')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds to wait before each response')
+    args = parser.parse_args()
+
+    server = FakeImageServer(latency=args.latency, port=args.port)
+    print(f'Fake poster images serving on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Test PosterCache against a local fake image server using pytest
+"""
+import pytest
+
+from movieflix.posters.cache import Image, PosterCache, is_poster_url, is_public_address
+from movieflix.posters.fake_server import FakeImageServer, png_image
+
+TEST_HOSTS = ('127.0.0.1',)
+
+
+class FakeClock:
+    """
+    A clock moved forward by the tests
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_is_poster_url():
+    """
+    Test only http(s) urls are fetched
+    """
+    assert is_poster_url('https://m.media-amazon.com/images/M/1.jpg')
+    assert not is_poster_url('N/A')
+    assert not is_poster_url('')
+    assert not is_poster_url(None)
+
+
+def test_is_public_address():
+    """
+    Test private, loopback and link-local addresses are not public
+    """
+    assert is_public_address('93.184.216.34')
+    assert not is_public_address('127.0.0.1')
+    assert not is_public_address('10.0.0.1')
+    assert not is_public_address('169.254.169.254')
+    assert not is_public_address('::1')
+
+
+def test_only_allowed_hosts_are_fetched(tmp_path):
+    """
+    Test posters on other hosts, or on allowed host names
+    resolving to private addresses, are not fetched
+    """
+    with FakeImageServer() as server:
+        cache = PosterCache(tmp_path)
+        assert cache.get(f'{server.url}titanic.jpg') is None
+        cache = PosterCache(tmp_path, allowed_hosts=('localhost',))
+        assert cache.get(server.url.replace('127.0.0.1', 'localhost') + 'titanic.jpg') is None
+        assert server.requests == 0
+        assert cache.stats['failures'] == 1
+
+
+def test_poster_is_fetched_once(tmp_path):
+    """
+    Test a poster is fetched once, also by a new cache
+    on the same directory, and served from disk
+    """
+    with FakeImageServer() as server:
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS)
+        poster = cache.get(f'{server.url}titanic.jpg')
+        assert poster['content_type'] == 'image/png'
+        assert cache.get(f'{server.url}titanic.jpg') == poster
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS)
+        assert cache.get(f'{server.url}titanic.jpg') == poster
+        assert server.requests == 1
+        with open(poster['path'], 'rb') as file:
+            assert file.read()[:8] == b'\x89PNG\r\n\x1a\n'
+
+
+def test_same_image_is_stored_once(tmp_path):
+    """
+    Test posters are stored by content,
+    two urls of the same image share its file
+    """
+    image = (png_image(4, 6, (1, 2, 3)), 'image/png')
+    with FakeImageServer(images={'/a.png': image, '/b.png': image}) as server:
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS)
+        assert cache.get(f'{server.url}a.png')['path'] == cache.get(f'{server.url}b.png')['path']
+    assert len(list((tmp_path / 'objects').rglob('*'))) == 2  # one directory, one image
+
+
+def test_failed_fetch_is_not_retried_at_once(tmp_path):
+    """
+    Test missing or non image posters are not fetched again
+    until the error ttl passed
+    """
+    clock = FakeClock()
+    images = {'/page.html': (b'<html></html>', 'text/html')}
+    with FakeImageServer(images=images, known_only=True) as server:
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS, error_ttl=60, clock=clock)
+        assert cache.get(f'{server.url}missing.jpg') is None
+        assert cache.get(f'{server.url}missing.jpg') is None
+        assert cache.get(f'{server.url}page.html') is None
+        assert server.requests == 2
+        clock.now = 61
+        assert cache.get(f'{server.url}missing.jpg') is None
+        assert server.requests == 3
+        assert cache.stats['failures'] == 3
+
+
+def test_prefetch(tmp_path):
+    """
+    Test a poster and its thumbnails are cached by prefetch
+    """
+    with FakeImageServer() as server:
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS)
+        assert cache.prefetch(f'{server.url}titanic.jpg')
+        assert not cache.prefetch('N/A')
+        cache.get(f'{server.url}titanic.jpg', 128)
+        assert server.requests == 1
+
+
+@pytest.mark.skipif(Image is None, reason='Pillow is not installed')
+def test_thumbnail(tmp_path):
+    """
+    Test thumbnails are resized to the nearest larger width
+    """
+    with FakeImageServer() as server:
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS, widths=(128, 256))
+        poster = cache.get(f'{server.url}titanic.jpg', 100)
+        assert poster['etag'].endswith('-w128')
+        with Image.open(poster['path']) as image:
+            assert image.size == (128, 189)
+        assert cache.get(f'{server.url}titanic.jpg', 1000)['etag'] == \
+            cache.get(f'{server.url}titanic.jpg')['etag']
+
+
+@pytest.mark.skipif(Image is None, reason='Pillow is not installed')
+def test_unresized_poster_has_the_original_etag(tmp_path, monkeypatch):
+    """
+    Test a poster no wider than the thumbnail, or refused
+    as a decompression bomb, is served as the original with its ETag
+    """
+    with FakeImageServer() as server:
+        cache = PosterCache(tmp_path, allowed_hosts=TEST_HOSTS, widths=(128, 2000))
+        original = cache.get(f'{server.url}titanic.jpg')
+        assert cache.get(f'{server.url}titanic.jpg', 1000) == original
+
+        monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 100)
+        assert cache.get(f'{server.url}titanic.jpg', 100) == original
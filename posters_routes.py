@@ -0,0 +1,76 @@
+"""
+Posters Blueprint routes page:
+implementing
+movie poster thumbnails
+routes
+"""
+from flask import Blueprint, abort, current_app, redirect, request, send_file, url_for
+
+from movieflix.data_backend import users_data_manager
+from movieflix.poster_backend import poster_cache
+from movieflix.posters.cache import is_poster_url, source_key
+
+posters_bp = Blueprint('posters', __name__)
+
+VERSION_LENGTH = 16
+
+
+def poster_version(poster: str) -> str:
+    """
+    Return the version of a poster url,
+    a poster page url with it can be cached for good
+    :param poster: poster url
+    :return:
+        version (str)
+    """
+    return source_key(poster)[:VERSION_LENGTH]
+
+
+@posters_bp.app_template_global()
+def poster_url(user_id: int, movie: dict, width: int | None = None) -> str:
+    """
+    Return the url of a movie's poster served by this app,
+    for templates: <img src="{{ poster_url(user.user_id, movie, 128) }}">
+    :param user_id: int
+    :param movie: dict
+    :param width: thumbnail width | None for the original
+    :return:
+        poster url (str), the movie's own poster if it is not a url
+    """
+    poster = movie.get('poster')
+    if not is_poster_url(poster):
+        return poster or ''
+    return url_for('posters.get_poster', user_id=user_id, movie_id=movie['movie_id'],
+                   w=width, v=poster_version(poster))
+
+
+@posters_bp.route('/posters/<int:user_id>/<int:movie_id>', methods=['GET'])
+def get_poster(user_id: int, movie_id: int):
+    """
+    Get the poster of a user's movie from the poster cache,
+    ?w=<width> for a thumbnail, ?v=<poster version> for an url
+    that is cached for good
+    :param user_id: int
+    :param movie_id: int
+    :return:
+        poster image |
+        redirect to the poster's current version or its origin |
+        movie not found error message
+    """
+    movie = users_data_manager.get_user_movie(user_id, movie_id)
+    if movie is None or not is_poster_url(movie.get('poster')):
+        abort(404)
+    version = request.args.get('v')
+    if version is not None and version != poster_version(movie['poster']):
+        return redirect(poster_url(user_id, movie, request.args.get('w', type=int)))
+
+    poster = poster_cache.get(movie['poster'], request.args.get('w', type=int))
+    if poster is None:
+        return redirect(movie['poster'])
+    response = send_file(poster['path'], mimetype=poster['content_type'],
+                         etag=poster['etag'], conditional=True,
+                         max_age=current_app.config['POSTER_MAX_AGE'] if version else 0)
+    response.cache_control.public = True
+    if version:
+        response.cache_control.immutable = True
+    return response
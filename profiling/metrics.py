@@ -0,0 +1,199 @@
+"""
+Counters and histograms
+written in the Prometheus text exposition format
+"""
+import bisect
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_value(value) -> str:
+    """
+    Return a sample value as Prometheus writes it
+    :param value: int | float
+    :return:
+        str
+    """
+    if value == math.inf:
+        return '+Inf'
+    return repr(value)
+
+
+def format_labels(label_names: tuple, label_values: tuple, extra: str = '') -> str:
+    """
+    Return the label set of a sample, e.g. {route="/users",le="0.5"}
+    :param label_names: tuple
+    :param label_values: tuple
+    :param extra: label already formatted, added last
+    :return:
+        str
+    """
+    labels = [f'{name}="{escape(str(value))}"'
+              for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def escape(value: str) -> str:
+    """
+    Escape a label value
+    :param value: str
+    :return:
+        str
+    """
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric:
+    """
+    A metric with a value per label set
+    """
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        """
+        Return the label values of a sample
+        :param labels: {label name: value}
+        :return:
+            tuple
+        """
+        return tuple(labels[name] for name in self.label_names)
+
+    def samples(self) -> list:
+        """
+        Return the metric's samples
+        :return:
+            [(sample name, labels (str), value)] (list)
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """
+        Return the metric in the text exposition format
+        :return:
+            str
+        """
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.TYPE}']
+        lines.extend(f'{name}{labels} {format_value(value)}'
+                     for name, labels, value in self.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(Metric):
+    """
+    A total only going up
+    """
+    TYPE = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Add to the counter of a label set
+        :param amount: int | float
+        :param labels: label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(f'{self.name}_total', format_labels(self.label_names, key), value)
+                for key, value in values]
+
+
+class Histogram(Metric):
+    """
+    Observed values counted in cumulative buckets,
+    with their count and sum
+    """
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """
+        Count a value in the histogram of a label set
+        :param value: float
+        :param labels: label values
+        """
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per bucket counts (the last one is +Inf) and the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[position] += 1
+            counts[-1] += value
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        samples = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket',
+                                format_labels(self.label_names, key,
+                                              f'le="{format_value(float(bound))}"'),
+                                cumulative))
+            labels = format_labels(self.label_names, key)
+            samples.append((f'{self.name}_count', labels, cumulative))
+            samples.append((f'{self.name}_sum', labels, counts[-1]))
+        return samples
+
+
+class Registry:
+    """
+    The metrics of an app
+    """
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric to the registry
+        :param metric: Metric
+        :return:
+            the metric
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names=()) -> Counter:
+        """
+        Return a new registered counter
+        """
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names=(),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        """
+        Return a new registered histogram
+        """
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """
+        Return all the metrics in the text exposition format
+        :return:
+            str
+        """
+        return ''.join(metric.render() for metric in self._metrics)
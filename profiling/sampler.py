@@ -0,0 +1,99 @@
+"""
+SamplingProfiler class
+Sampling the stacks of request threads
+into folded stacks for flame graphs
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def fold_stack(frame) -> str:
+    """
+    Return a stack as one folded line, outermost frame first,
+    e.g. flask.app:wsgi_app;users_routes:list_users
+    :param frame: innermost frame
+    :return:
+        str
+    """
+    names = []
+    while frame is not None:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def write_folded(path, stacks: dict):
+    """
+    Write folded stacks, one "<stack> <samples>" line each,
+    the input of flamegraph.pl, speedscope or inferno
+    :param path: file name
+    :param stacks: {folded stack: samples}
+    """
+    os.makedirs(os.path.dirname(os.fspath(path)) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        for stack, samples in sorted(stacks.items()):
+            file.write(f'{stack} {samples}\n')
+
+
+class SamplingProfiler:
+    """
+    A profiler sampling, every interval seconds,
+    the stacks of the threads it was started for
+
+    One background thread samples every profiled thread,
+    it sleeps while no thread is profiled. Sampling reads
+    the frames of other threads and costs the profiled
+    threads nothing but the GIL it holds meanwhile.
+    """
+    def __init__(self, interval: float = 0.005):
+        self._interval = interval
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._profiling = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int | None = None):
+        """
+        Start sampling a thread
+        :param thread_id: thread ident, the current thread by default
+        """
+        thread_id = threading.get_ident() if thread_id is None else thread_id
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            self._profiling.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler',
+                                                daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: int | None = None) -> dict:
+        """
+        Stop sampling a thread
+        :param thread_id: thread ident, the current thread by default
+        :return:
+            {folded stack: samples} (dict)
+        """
+        thread_id = threading.get_ident() if thread_id is None else thread_id
+        with self._lock:
+            samples = self._samples.pop(thread_id, Counter())
+            if not self._samples:
+                self._profiling.clear()
+        return dict(samples)
+
+    def _run(self):
+        """
+        Sample the profiled threads until the process exits
+        """
+        while True:
+            self._profiling.wait()
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[fold_stack(frame)] += 1
+            del frames
+            time.sleep(self._interval)
@@ -0,0 +1,105 @@
+"""
+Stage timings of a request:
+time and bytes spent reading and writing storage,
+calling OMDb or rendering templates, collected per request
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_timings = ContextVar('movieflix_stage_timings', default=None)
+
+
+class StageTimings:
+    """
+    The calls, seconds and bytes of each stage of one request
+    """
+    __slots__ = ('_stages',)
+
+    def __init__(self):
+        self._stages = {}
+
+    def add(self, stage: str, seconds: float, size: int = 0):
+        """
+        Add a call to a stage
+        :param stage: stage name, e.g. 'storage_read'
+        :param seconds: duration of the call
+        :param size: bytes read or written by the call
+        """
+        totals = self._stages.get(stage)
+        if totals is None:
+            self._stages[stage] = [1, seconds, size]
+        else:
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += size
+
+    def items(self) -> list:
+        """
+        Return the totals of every stage, in the order they first ran
+        :return:
+            [(stage, calls, seconds, bytes)] (list)
+        """
+        return [(stage, *totals) for stage, totals in self._stages.items()]
+
+
+def start() -> tuple:
+    """
+    Start collecting the stage timings of the current context
+    :return:
+        (StageTimings, token to pass to stop)
+    """
+    timings = StageTimings()
+    return timings, _current_timings.set(timings)
+
+
+def stop(token):
+    """
+    Stop collecting the stage timings of the current context
+    :param token: token returned by start
+    """
+    try:
+        _current_timings.reset(token)
+    except ValueError:  # started in another context
+        _current_timings.set(None)
+
+
+def record(stage: str, seconds: float, size: int = 0):
+    """
+    Add a call to a stage of the current request,
+    nothing is recorded outside of a request
+    :param stage: stage name
+    :param seconds: duration of the call
+    :param size: bytes read or written by the call
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds, size)
+
+
+class Timer:
+    """
+    The bytes of a timed call, set by the timed code
+    """
+    __slots__ = ('size',)
+
+    def __init__(self):
+        self.size = 0
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Time a block of code as a call to a stage
+    of the current request, the block may set
+    the bytes it read or wrote on the yielded timer
+    :param stage: stage name
+    :return:
+        context manager yielding a Timer
+    """
+    timer = Timer()
+    start_time = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        record(stage, time.perf_counter() - start_time, timer.size)
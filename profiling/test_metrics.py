@@ -0,0 +1,49 @@
+"""
+Test the metrics registry and the stage timings using pytest
+"""
+from movieflix.profiling import stages
+from movieflix.profiling.metrics import Registry
+
+
+def test_counters_and_histograms_are_rendered():
+    """
+    Test counters and histograms are written
+    in the Prometheus text format
+    """
+    registry = Registry()
+    calls = registry.counter('calls', 'Calls', ('stage',))
+    duration = registry.histogram('duration_seconds', 'Duration', ('route',), buckets=(0.1, 1.0))
+    calls.inc(2, stage='omdb')
+    calls.inc(stage='omdb')
+    duration.observe(0.05, route='/users/<int:user_id>')
+    duration.observe(0.5, route='/users/<int:user_id>')
+    duration.observe(5.0, route='/users/<int:user_id>')
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ['# HELP calls Calls', '# TYPE calls counter',
+                         'calls_total{stage="omdb"} 3']
+    assert lines[5:] == [
+        'duration_seconds_bucket{route="/users/<int:user_id>",le="0.1"} 1',
+        'duration_seconds_bucket{route="/users/<int:user_id>",le="1.0"} 2',
+        'duration_seconds_bucket{route="/users/<int:user_id>",le="+Inf"} 3',
+        'duration_seconds_count{route="/users/<int:user_id>"} 3',
+        'duration_seconds_sum{route="/users/<int:user_id>"} 5.55']
+
+
+def test_stages_are_recorded_while_collecting():
+    """
+    Test stage calls are added up per stage
+    between start and stop only
+    """
+    stages.record('storage_read', 1.0, 10)
+    timings, token = stages.start()
+    stages.record('storage_read', 0.5, 100)
+    with stages.timed('omdb') as timer:
+        timer.size = 7
+    stages.record('storage_read', 0.25, 50)
+    stages.stop(token)
+    stages.record('storage_read', 1.0, 10)
+
+    (read, omdb) = timings.items()
+    assert read == ('storage_read', 2, 0.75, 150)
+    assert omdb[:2] == ('omdb', 1) and omdb[3] == 7
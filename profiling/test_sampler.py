@@ -0,0 +1,41 @@
+"""
+Test the sampling profiler using pytest
+"""
+import threading
+import time
+
+from movieflix.profiling.sampler import SamplingProfiler, write_folded
+
+
+def busy_loop(stop: threading.Event):
+    """
+    Keep a thread busy until stop is set
+    """
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_samples_a_thread_into_folded_stacks(tmp_path):
+    """
+    Test a profiled thread's stacks are sampled
+    and written one folded stack per line
+    """
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,))
+    thread.start()
+    profiler = SamplingProfiler(interval=0.001)
+    try:
+        profiler.start(thread.ident)
+        time.sleep(0.1)
+        samples = profiler.stop(thread.ident)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert samples and all(stack.startswith('threading:_bootstrap') for stack in samples)
+    assert any(':busy_loop' in stack for stack in samples)
+    assert profiler.stop(thread.ident) == {}
+
+    write_folded(tmp_path / 'profiles' / 'slow.folded', samples)
+    lines = (tmp_path / 'profiles' / 'slow.folded').read_text().splitlines()
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == sum(samples.values())
@@ -0,0 +1,166 @@
+"""
+Static assets of the app:
+url_for('static') links fingerprinted file names cached
+for good by browsers, text assets are compressed once
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Flask, current_app, request, send_from_directory
+
+from movieflix import compression
+
+EXTENSION_NAME = 'static_assets'
+
+DEFAULT_CONFIG = {'STATIC_FINGERPRINT': True,
+                  'STATIC_MAX_AGE': 365 * 24 * 3600}
+
+FINGERPRINT_LENGTH = 12
+FINGERPRINTED_NAME = re.compile(rf'^(.+)\.([0-9a-f]{{{FINGERPRINT_LENGTH}}})(\.[^./]+)$')
+
+
+class StaticAssets:
+    """
+    The files of a static folder, read once:
+    each file's fingerprint (start of the sha256 of its content)
+    and the gzip and brotli encoded content of its text files
+
+    style.css is linked as style.<fingerprint>.css, so a changed
+    file gets a new url and urls can be cached for good.
+    Files changed or added after startup are served,
+    under their plain name, but not fingerprinted.
+    """
+    def __init__(self, folder: str, compress_mimetypes=(), level: int = 9):
+        self._fingerprints = {}
+        self._encoded = {}
+        if not os.path.isdir(folder):
+            return
+        for directory, _, file_names in os.walk(folder):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                filename = os.path.relpath(path, folder).replace(os.sep, '/')
+                with open(path, 'rb') as file:
+                    content = file.read()
+                self._fingerprints[filename] = \
+                    hashlib.sha256(content).hexdigest()[:FINGERPRINT_LENGTH]
+                if mimetypes.guess_type(filename)[0] in compress_mimetypes:
+                    self._encoded[filename] = {encoding: compression.compress(content, encoding, level)
+                                               for encoding in compression.available_encodings()}
+
+    def fingerprint(self, filename: str) -> str | None:
+        """
+        Return the fingerprint of a file
+        :param filename: path in the static folder
+        :return:
+            fingerprint (str) |
+            None for an unknown file
+        """
+        return self._fingerprints.get(filename)
+
+    def fingerprinted_name(self, filename: str) -> str:
+        """
+        Return the name a file is linked with
+        :param filename: path in the static folder
+        :return:
+            <name>.<fingerprint><extension> (str) |
+            filename of an unknown file
+        """
+        fingerprint = self._fingerprints.get(filename)
+        if fingerprint is None:
+            return filename
+        name, extension = os.path.splitext(filename)
+        return f'{name}.{fingerprint}{extension}'
+
+    def resolve(self, filename: str) -> tuple:
+        """
+        Return the file a requested name stands for
+        :param filename: requested path
+        :return:
+            (path in the static folder (str),
+             True if it was requested by its current fingerprint (bool))
+        """
+        match = FINGERPRINTED_NAME.match(filename)
+        if match is not None:
+            name = match.group(1) + match.group(3)
+            if name in self._fingerprints:
+                return name, self._fingerprints[name] == match.group(2)
+        return filename, False
+
+    def encoded(self, filename: str, encoding: str) -> bytes | None:
+        """
+        Return the compressed content of a text file
+        :param filename: path in the static folder
+        :param encoding: 'br' | 'gzip'
+        :return:
+            content (bytes) |
+            None if the file is not kept compressed
+        """
+        return self._encoded.get(filename, {}).get(encoding)
+
+    def is_compressed(self, filename: str) -> bool:
+        """
+        Check if a file is kept compressed
+        :param filename: path in the static folder
+        :return:
+            bool
+        """
+        return filename in self._encoded
+
+
+def static_file(filename: str):
+    """
+    The app's static view:
+    files requested by their current fingerprint are cached
+    public and immutable for STATIC_MAX_AGE, text files are sent
+    compressed when the client accepts it
+    :param filename: requested path
+    :return:
+        Response
+    """
+    assets = current_app.extensions[EXTENSION_NAME]
+    filename, current = assets.resolve(filename)
+    max_age = current_app.config['STATIC_MAX_AGE'] if current else None
+    encoding = compression.accepted_encoding() if assets.is_compressed(filename) else None
+    content = assets.encoded(filename, encoding) if encoding else None
+
+    if content is None:
+        response = send_from_directory(current_app.static_folder, filename, max_age=max_age)
+    else:
+        response = current_app.response_class(
+            content, mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{assets.fingerprint(filename)}-{encoding}')
+        response.cache_control.no_cache = None if current else True
+        response.cache_control.max_age = max_age
+        response.make_conditional(request)
+    if assets.is_compressed(filename):
+        response.vary.add('Accept-Encoding')
+    if current:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+
+def init_app(app: Flask):
+    """
+    Set the default static config, read the static folder
+    and serve it with fingerprinted urls
+    :param app: Flask
+    """
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    if not app.has_static_folder:
+        return
+    assets = StaticAssets(app.static_folder,
+                          app.config.get('COMPRESS_MIMETYPES',
+                                         compression.DEFAULT_CONFIG['COMPRESS_MIMETYPES']))
+    app.extensions[EXTENSION_NAME] = assets
+    app.view_functions['static'] = static_file
+
+    if app.config['STATIC_FINGERPRINT']:
+        @app.url_defaults
+        def fingerprint_static_urls(endpoint: str, values: dict):
+            if endpoint == 'static' and 'filename' in values:
+                values['filename'] = assets.fingerprinted_name(values['filename'])
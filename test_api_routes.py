@@ -0,0 +1,103 @@
+"""
+Test the JSON API routes using pytest
+"""
+from movieflix.test_app import create_test_app
+
+
+def test_users_pages_and_fields(tmp_path):
+    """
+    Test users are listed page by page,
+    with the fields asked for and their id
+    """
+    client = create_test_app(tmp_path).test_client()
+    page = client.get('/api/v1/users?limit=1').get_json()
+    assert page['items'] == [{'user_id': 1, 'name': 'Test_user'}]
+    assert (page['total'], page['next_after']) == (2, 1)
+    assert page['links']['next'] is not None
+
+    page = client.get('/api/v1/users?limit=1&after=1&fields=user_id').get_json()
+    assert page['items'] == [{'user_id': 2}]
+    assert page['next_after'] is None
+    assert client.get('/api/v1/users/1?fields=name').get_json() == \
+           {'user_id': 1, 'name': 'Test_user'}
+
+
+def test_movies_fields_and_validation(tmp_path):
+    """
+    Test movies are added with defaults and validated,
+    and read with the fields asked for
+    """
+    client = create_test_app(tmp_path).test_client()
+    response = client.post('/api/v1/users/1/movies', json={'name': 'Jaws', 'year': 1975})
+    assert response.status_code == 201
+    assert response.headers['Location'].endswith('/api/v1/users/1/movies/2')
+    assert response.get_json()['director'] == ''
+
+    page = client.get('/api/v1/users/1/movies?fields=name,year&sort=year').get_json()
+    assert page['items'] == [{'movie_id': 2, 'name': 'Jaws', 'year': 1975},
+                             {'movie_id': 1, 'name': 'Titanic', 'year': 1997}]
+
+    for movie, message in (({'name': 'Abc', 'director': 5}, 'Movie director must be a string'),
+                           ({'name': 'Abc', 'director': '5th'},
+                            'Director name must start with letter'),
+                           ({'year': 1975}, 'Movie name cannot be empty'),
+                           ({'name': 'Abc', 'rating': 11}, 'Rating must be between 1.0 - 10.0, '
+                                                           'or 0 if unknown')):
+        response = client.post('/api/v1/users/1/movies', json=movie)
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'Bad Request', 'messages': [message]}
+    response = client.patch('/api/v1/users/1/movies/1', data='[]',
+                            content_type='application/json')
+    assert response.get_json()['messages'] == ['Request body must be a JSON object']
+
+
+def test_batch(tmp_path):
+    """
+    Test a batch changes all its movies at once,
+    or nothing if a movie is missing or the batch is too large
+    """
+    client = create_test_app(tmp_path, API_MAX_BATCH=3).test_client()
+    response = client.post('/api/v1/users/1/movies/batch',
+                           json={'create': [{'name': 'Jaws'}],
+                                 'update': [{'movie_id': 1, 'rating': 8.0}],
+                                 'delete': [7]})
+    assert response.status_code == 404
+    assert response.get_json()['missing'] == [7]
+    assert client.get('/api/v1/users/1/movies/1').get_json()['rating'] == 7.9
+    assert len(client.get('/api/v1/users/1/movies').get_json()['items']) == 1
+
+    response = client.post('/api/v1/users/1/movies/batch',
+                           json={'create': [{'name': 'Jaws'}, {'name': 'Alien'}],
+                                 'update': [{'movie_id': 1, 'rating': 8.0}],
+                                 'delete': [1]})
+    assert response.status_code == 400
+    assert response.get_json()['messages'] == ['At most 3 movies can be changed at once']
+
+    response = client.post('/api/v1/users/1/movies/batch',
+                           json={'create': [{'name': 'Jaws'}],
+                                 'update': [{'movie_id': 1, 'rating': 8.0}]})
+    assert response.status_code == 200
+    assert [movie['movie_id'] for movie in response.get_json()['created']] == [2]
+    assert response.get_json()['updated'] == [1]
+    assert client.get('/api/v1/users/1/movies/1').get_json()['rating'] == 8.0
+
+
+def test_json_errors(tmp_path):
+    """
+    Test missing users and movies, unknown API urls and methods
+    are answered with JSON errors, other pages keep HTML errors
+    """
+    client = create_test_app(tmp_path).test_client()
+    for url in ('/api/v1/users/9', '/api/v1/users/1/movies/9', '/api/v1/unknown', '/api/v1'):
+        response = client.get(url)
+        assert response.status_code == 404
+        assert response.get_json()['error'] == 'Not Found'
+
+    response = client.put('/api/v1/users/1')
+    assert response.status_code == 405
+    assert response.get_json()['error'] == 'Method Not Allowed'
+
+    response = client.put('/users')
+    assert (response.status_code, response.mimetype) == (405, 'text/html')
+    response = client.get('/unknown')
+    assert (response.status_code, response.mimetype) == (404, 'text/html')
@@ -0,0 +1,115 @@
+"""
+Test the app factory and its error pages using pytest
+"""
+import json
+
+from flask import Flask
+
+import app as app_module
+from app import create_app
+from movieflix.data_manager.data_manager_interface import StaleDataError
+
+TEST_USERS = [{"user_id": 1,
+               "name": "Test_user",
+               "movies": [{"movie_id": 1,
+                           "name": "Titanic",
+                           "director": "James Cameron",
+                           "year": 1997,
+                           "rating": 7.9,
+                           "poster": "",
+                           "website": "https://www.imdb.com/title/tt0120338"}]},
+              {"user_id": 2,
+               "name": "Second_user",
+               "movies": []}]
+
+
+def create_test_app(tmp_path, **config) -> Flask:
+    """
+    An app on a test data file in tmp_path is created,
+    its OMDb and poster caches are kept in tmp_path too
+    """
+    data_file = tmp_path / 'movies.json'
+    with open(data_file, 'w', encoding='utf-8') as file:
+        json.dump(TEST_USERS, file)
+    return create_app({'TESTING': True,
+                       'DATA_FILE': str(data_file),
+                       'OMDB_CACHE_FILE': str(tmp_path / 'omdb_cache.db'),
+                       'OMDB_ASYNC_ENRICHMENT': False,
+                       'POSTER_CACHE_DIR': str(tmp_path / 'posters'),
+                       'POSTER_PREFETCH': False,
+                       **config})
+
+
+def test_module_level_app(tmp_path, monkeypatch):
+    """
+    Test app:app is built with the default config
+    on first access only, and then kept
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    monkeypatch.delitem(vars(app_module), 'app', raising=False)
+    assert 'app' not in vars(app_module)
+    app = app_module.app
+    assert isinstance(app, Flask) and app_module.app is app
+    assert app.config['DATA_FILE'] == 'data/movies.json'
+    monkeypatch.delitem(vars(app_module), 'app')
+
+
+def test_pages_and_not_found(tmp_path):
+    """
+    Test the home and users pages are served
+    and unknown pages get the not found page
+    """
+    client = create_test_app(tmp_path).test_client()
+    assert client.get('/').status_code == 200
+    response = client.get('/users')
+    assert b'Test_user' in response.data
+    response.close()
+    response = client.get('/missing')
+    assert response.status_code == 404
+    response.close()
+
+
+def test_conflicting_changes(tmp_path, monkeypatch):
+    """
+    Test a change that kept colliding with other changes
+    is answered with 409, as JSON by the API
+    """
+    app = create_test_app(tmp_path)
+    client = app.test_client()
+
+    def keeps_changing(*_args, **_kwargs):
+        raise StaleDataError('User 1 kept changing')
+
+    monkeypatch.setattr(app.extensions['users_data_manager'], 'update_user_movie',
+                        keeps_changing)
+    response = client.post('/users/1/update_movie/1', data={'name': 'Titanic', 'director': '',
+                                                            'year': '1997', 'rating': '8'})
+    assert response.status_code == 409
+    assert b'please try again' in response.data
+
+    response = client.patch('/api/v1/users/1/movies/1', json={'rating': 8.0})
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Conflict'
+
+
+def test_not_modified_pages(tmp_path):
+    """
+    Test the users and movies pages are answered with 304
+    while the data is unchanged, and rendered again after a change
+    """
+    client = create_test_app(tmp_path).test_client()
+    etags = {}
+    for url in ('/users', '/users/1', '/users/1/update_movie/1'):
+        response = client.get(url)
+        etags[url] = response.headers['ETag']
+        response.close()
+        response = client.get(url, headers={'If-None-Match': etags[url]})
+        assert (response.status_code, response.headers['ETag']) == (304, etags[url])
+
+    client.post('/users/1/update_movie/1', data={'name': 'Titanic', 'director': '',
+                                                 'year': '1997', 'rating': '8'})
+    response = client.get('/users/1', headers={'If-None-Match': etags['/users/1']})
+    assert response.status_code == 200
+    assert b'8.0' in response.data
+    response.close()
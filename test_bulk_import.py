@@ -0,0 +1,69 @@
+"""
+Test bulk movie import using pytest
+"""
+from movieflix.bulk_import import import_movies, parse_titles
+from movieflix.data_manager.json_data_manager import JSONDataManager
+from movieflix.data_manager.test_json_data_manager import create_test_file
+from movieflix.data_manager.users import Users
+from movieflix.omdb.fake_server import FakeOMDbServer
+from movieflix.test_app import create_test_app
+
+
+def test_parse_titles():
+    """
+    Test titles are read from text, JSON and CSV
+    """
+    assert parse_titles('Titanic\n\n  Jaws \n') == ['Titanic', 'Jaws']
+    assert parse_titles('["Titanic", {"title": "Jaws"}]') == ['Titanic', 'Jaws']
+    assert parse_titles('{"titles": ["Titanic"]}', 'list.json') == ['Titanic']
+    assert parse_titles('year,title\n1997,Titanic\n1975,Jaws\n', 'list.csv') == ['Titanic', 'Jaws']
+    assert parse_titles('Titanic,1997\nJaws,1975\n', 'list.csv') == ['Titanic', 'Jaws']
+
+
+def test_import_movies(tmp_path):
+    """
+    Test each distinct title is looked up once,
+    failed and not found lookups fall back to empty info
+    and all movies are added in one write
+    """
+    file_path = tmp_path / 'movies.json'
+    create_test_file(file_path)
+    data_manager = JSONDataManager(file_path, 'user_id', cache=True)
+    lookups = []
+
+    def lookup(title):
+        lookups.append(title)
+        if title == 'Broken':
+            raise ValueError(title)
+        return {'Unknown': None, 'Missing': {}}.get(title, {'name': title.title()})
+
+    results = import_movies(Users(data_manager), 1,
+                            ['titanic', 'Unknown', 'TITANIC', 'Missing', 'Broken'],
+                            lookup, lambda title: {'name': title})
+
+    assert sorted(lookups) == ['Broken', 'Missing', 'Unknown', 'titanic']
+    assert [(result['movie_id'], result['name'], result['status']) for result in results] == \
+           [(1, 'Titanic', 'found'), (2, 'Unknown', 'empty'), (3, 'Titanic', 'found'),
+            (4, 'Missing', 'not_found'), (5, 'Broken', 'empty')]
+    assert data_manager.write_stats['writes'] == 1
+    assert import_movies(Users(data_manager), 7, ['Jaws'], lookup, dict) is None
+
+
+def test_import_route_with_omdb(tmp_path):
+    """
+    Test importing through the app reports titles
+    OMDb does not know as not found, and reads N/A years and ratings as 0
+    """
+    no_rating = {'Title': 'Home Movie', 'Year': 'N/A', 'imdbRating': 'N/A',
+                 'imdbID': 'tt0000001', 'Response': 'True'}
+    with FakeOMDbServer(movies={'Home Movie': no_rating}, known_only=True) as server:
+        client = create_test_app(tmp_path, OMDB_URL=server.url).test_client()
+        response = client.post('/users/2/import_movies',
+                               json={'titles': ['Home Movie', 'Unknown Movie']})
+
+    assert response.status_code == 200
+    assert [(result['name'], result['status']) for result in response.get_json()['results']] == \
+           [('Home Movie', 'found'), ('Unknown Movie', 'not_found')]
+    movies = client.get('/api/v1/users/2/movies').get_json()['items']
+    assert [(movie['year'], movie['rating'], movie['website']) for movie in movies] == \
+           [(0, 0.0, 'https://www.imdb.com/title/tt0000001'), (0, 0.0, '')]
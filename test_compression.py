@@ -0,0 +1,111 @@
+"""
+Test response compression and fingerprinted static files using pytest
+"""
+import gzip
+
+from flask import Flask, stream_with_context, url_for
+
+from movieflix import compression, http_cache, static_assets
+
+STYLE = b'body { color: black; }\n' * 100
+
+
+def create_test_app(static_folder) -> Flask:
+    """
+    An app with a static folder, a large and a small page,
+    a streamed page and a versioned page is created
+    """
+    static_folder.mkdir(exist_ok=True)
+    (static_folder / 'style.css').write_bytes(STYLE)
+    (static_folder / 'logo.png').write_bytes(b'\x89PNG not really')
+    app = Flask(__name__, static_folder=str(static_folder))
+    compression.init_app(app)
+    static_assets.init_app(app)
+    http_cache.init_app(app)
+
+    @app.route('/large')
+    def large():
+        return '<p>movie</p>' * 1000
+
+    @app.route('/small')
+    def small():
+        return '<p>movie</p>'
+
+    @app.route('/streamed')
+    def streamed():
+        return app.response_class(stream_with_context(f'<p>{i}</p>' for i in range(100)))
+
+    @app.route('/versioned')
+    @http_cache.conditional(lambda: 1)
+    def versioned():
+        return '<p>movie</p>' * 1000
+
+    return app
+
+
+def test_pages_are_compressed_above_the_threshold(tmp_path):
+    """
+    Test large and streamed pages are gzip encoded
+    for clients accepting it, small pages are not
+    """
+    client = create_test_app(tmp_path / 'static').test_client()
+    gzip_header = {'Accept-Encoding': 'gzip'}
+
+    response = client.get('/large', headers=gzip_header)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.data) == b'<p>movie</p>' * 1000
+    assert 'Content-Encoding' not in client.get('/large').headers
+    assert 'Content-Encoding' not in client.get('/small', headers=gzip_header).headers
+
+    response = client.get('/streamed', headers=gzip_header)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == ''.join(f'<p>{i}</p>' for i in range(100)).encode()
+
+
+def test_compressed_pages_keep_answering_conditional_requests(tmp_path):
+    """
+    Test a compressed page gets a weak ETag
+    still matching its If-None-Match
+    """
+    client = create_test_app(tmp_path / 'static').test_client()
+    response = client.get('/versioned', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    response = client.get('/versioned', headers={'Accept-Encoding': 'gzip',
+                                                 'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_static_files_are_fingerprinted(tmp_path):
+    """
+    Test static urls carry the file's fingerprint,
+    fingerprinted files are immutable and CSS is sent compressed
+    """
+    app = create_test_app(tmp_path / 'static')
+    with app.test_request_context():
+        style_url = url_for('static', filename='style.css')
+        logo_url = url_for('static', filename='logo.png')
+        missing_url = url_for('static', filename='missing.css')
+    assert style_url.startswith('/static/style.') and style_url.endswith('.css')
+    assert missing_url == '/static/missing.css'
+    client = app.test_client()
+
+    response = client.get(style_url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == STYLE
+    assert response.cache_control.immutable and response.cache_control.public
+    assert client.get(style_url, headers={'Accept-Encoding': 'gzip',
+                                          'If-None-Match': response.headers['ETag']}
+                      ).status_code == 304
+
+    response = client.get(logo_url)
+    assert response.cache_control.immutable and response.data == b'\x89PNG not really'
+    response.close()
+    response = client.get('/static/style.css')
+    assert not response.cache_control.immutable and response.data == STYLE
+    response.close()
+    response = client.get('/static/style.000000000000.css')
+    assert not response.cache_control.immutable and response.data == STYLE
+    response.close()
+    assert client.get(missing_url).status_code == 404
@@ -0,0 +1,58 @@
+"""
+Test conditional GETs of rendered pages using pytest
+"""
+from flask import Flask
+
+from movieflix import http_cache
+
+
+def create_test_app(versions: dict, renders: list) -> Flask:
+    """
+    An app with one page per item,
+    versioned by versions, is created
+    """
+    app = Flask(__name__)
+    http_cache.init_app(app)
+
+    @app.route('/items/<int:item_id>', methods=['GET', 'POST'])
+    @http_cache.conditional(lambda item_id: versions.get(item_id))
+    def get_item(item_id: int):
+        renders.append(item_id)
+        return f'item {item_id}'
+
+    return app
+
+
+def test_not_modified_until_the_version_changes():
+    """
+    Test a page is answered with 304 while its version
+    is unchanged, without being rendered
+    """
+    versions = {1: 10}
+    renders = []
+    client = create_test_app(versions, renders).test_client()
+
+    response = client.get('/items/1')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    response = client.get('/items/1', headers={'If-None-Match': etag})
+    assert (response.status_code, response.data, response.headers['ETag']) == (304, b'', etag)
+    assert client.get('/items/1?sort=name', headers={'If-None-Match': etag}).status_code == 200
+
+    versions[1] = 11
+    response = client.get('/items/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert renders == [1, 1, 1]
+
+
+def test_unversioned_and_post_requests_are_not_cached():
+    """
+    Test pages without a version and POST requests
+    get no ETag
+    """
+    renders = []
+    client = create_test_app({1: 10}, renders).test_client()
+    assert 'ETag' not in client.get('/items/2').headers
+    assert 'ETag' not in client.post('/items/1').headers
+    assert renders == [2, 1]
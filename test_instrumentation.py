@@ -0,0 +1,84 @@
+"""
+Test the request metrics, Server-Timing headers
+and slow request profiles using pytest
+"""
+import time
+
+from flask import Flask, render_template_string, stream_template_string
+
+from movieflix import instrumentation
+from movieflix.profiling import stages
+
+
+def create_test_app(config: dict | None = None) -> Flask:
+    """
+    An app with a page reading storage, a streamed page
+    and a slow page is created
+    """
+    app = Flask(__name__)
+    app.config.update(config or {})
+    instrumentation.init_app(app)
+
+    @app.route('/items/<int:item_id>')
+    def get_item(item_id: int):
+        stages.record('storage_read', 0.002, 1000)
+        return render_template_string('item {{ item_id }}', item_id=item_id)
+
+    @app.route('/items')
+    def list_items():
+        stages.record('storage_read', 0.001, 500)
+        return app.response_class(stream_template_string(
+            '{% for i in items %}<p>{{ i }}</p>{% endfor %}', items=range(100)))
+
+    @app.route('/slow')
+    def slow():
+        time.sleep(0.05)
+        return 'slow'
+
+    return app
+
+
+def test_server_timing_and_metrics():
+    """
+    Test a page's stages are in its Server-Timing header
+    and requests are counted per route, streamed ones once sent
+    """
+    client = create_test_app().test_client()
+    response = client.get('/items/1')
+    assert response.headers['Server-Timing'].startswith(
+        'storage_read;dur=2.0;desc="1 call, 1000 bytes", render;dur=')
+    client.get('/items/2')
+    response = client.get('/items')
+    assert response.data.count(b'<p>') == 100
+    response.close()
+    client.get('/missing').close()
+
+    metrics = client.get('/metrics')
+    assert metrics.content_type.startswith('text/plain; version=0.0.4')
+    lines = metrics.data.decode().splitlines()
+    assert 'movieflix_request_duration_seconds_count' \
+           '{method="GET",route="/items/<int:item_id>",status="200"} 2' in lines
+    assert 'movieflix_request_duration_seconds_count' \
+           '{method="GET",route="/items",status="200"} 1' in lines
+    assert 'movieflix_request_duration_seconds_count' \
+           '{method="GET",route="unmatched",status="404"} 1' in lines
+    assert 'movieflix_stage_calls_total{stage="render"} 3' in lines
+    assert 'movieflix_stage_bytes_total{stage="storage_read"} 2500' in lines
+
+
+def test_slow_requests_are_profiled(tmp_path):
+    """
+    Test requests slower than PROFILE_SLOW_REQUESTS
+    leave a folded stacks file
+    """
+    client = create_test_app({'PROFILE_SLOW_REQUESTS': 0.02,
+                              'PROFILE_INTERVAL': 0.001,
+                              'PROFILE_DIR': str(tmp_path),
+                              'SERVER_TIMING': False}).test_client()
+    assert 'Server-Timing' not in client.get('/items/1').headers
+    assert list(tmp_path.iterdir()) == []
+
+    client.get('/slow')
+    (profile,) = tmp_path.iterdir()
+    assert profile.name.endswith('.folded') and '-slow-' in profile.name
+    assert 'test_instrumentation:slow' in profile.read_text()
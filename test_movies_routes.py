@@ -0,0 +1,56 @@
+"""
+Test the movies routes with a fake OMDb using pytest
+"""
+from movieflix.omdb.fake_server import FakeOMDbServer, fake_movie
+from movieflix.test_app import create_test_app
+
+
+def test_background_enrichment(tmp_path):
+    """
+    Test movies are added at once and filled in from OMDb in the background:
+    found, not found and N/A years and ratings
+    """
+    no_rating = {**fake_movie('Home Movie'), 'Year': 'N/A', 'imdbRating': 'N/A'}
+    with FakeOMDbServer(movies={'Titanic': fake_movie('Titanic'), 'Home Movie': no_rating},
+                        known_only=True) as server:
+        app = create_test_app(tmp_path, OMDB_URL=server.url, OMDB_ASYNC_ENRICHMENT=True)
+        client = app.test_client()
+        for name in ('Titanic', 'Unknown Movie', 'Home Movie'):
+            response = client.post('/users/2/add_movie', data={'name': name})
+            assert response.status_code == 302
+        app.extensions['movie_enricher'].shutdown()
+
+    statuses = [client.get(f'/users/2/movies/{movie_id}/status').get_json()['status']
+                for movie_id in (1, 2, 3)]
+    assert statuses == ['enriched', 'not_found', 'enriched']
+    movies = client.get('/api/v1/users/2/movies').get_json()['items']
+    assert [(movie['name'], movie['director'], movie['year'], movie['rating'])
+            for movie in movies] == [('Titanic', 'James Cameron', 1997, 7.9),
+                                     ('Unknown Movie', '', 0, 0.0),
+                                     ('Home Movie', 'James Cameron', 0, 0.0)]
+    assert client.get('/users/2/movies/9/status').status_code == 404
+
+
+def test_changed_movie_is_not_enriched(tmp_path):
+    """
+    Test a lookup result is not applied to a movie that is no longer
+    the queued one, e.g. edited during the lookup or its movie_id reused
+    """
+    with FakeOMDbServer(movies={'Titanic': fake_movie('Titanic')}) as server:
+        app = create_test_app(tmp_path, OMDB_URL=server.url, OMDB_ASYNC_ENRICHMENT=True)
+        client = app.test_client()
+        client.patch('/api/v1/users/1/movies/1', json={'rating': 9.5})
+        app.extensions['movie_enricher'].submit('Titanic', 1, 1)
+        app.extensions['movie_enricher'].shutdown()
+
+    assert client.get('/users/1/movies/1/status').get_json()['status'] == 'stale'
+    assert client.get('/api/v1/users/1/movies/1').get_json()['rating'] == 9.5
+
+
+def test_unknown_status(tmp_path):
+    """
+    Test a movie never queued for enrichment has an unknown status
+    """
+    client = create_test_app(tmp_path).test_client()
+    assert client.get('/users/1/movies/1/status').get_json() == \
+           {'user_id': 1, 'movie_id': 1, 'status': 'unknown'}
@@ -0,0 +1,41 @@
+"""
+Test the poster routes with a fake image server using pytest
+"""
+import pytest
+
+from movieflix.posters.fake_server import FakeImageServer
+from movieflix.test_app import create_test_app
+
+
+def test_posters_of_allowed_hosts_only(tmp_path):
+    """
+    Test posters on allowed hosts are served by the app,
+    others are not fetched but redirected to
+    """
+    with FakeImageServer() as server:
+        app = create_test_app(tmp_path, POSTER_ALLOWED_HOSTS=['127.0.0.1'])
+        client = app.test_client()
+        for poster in (f'{server.url}titanic.jpg', 'http://169.254.169.254/latest/meta-data'):
+            response = client.post('/api/v1/users/2/movies', json={'name': 'Titanic',
+                                                                   'poster': poster})
+            assert response.status_code == 201
+
+        response = client.get('/posters/2/1')
+        assert (response.status_code, response.mimetype) == (200, 'image/png')
+        response.close()
+        response = client.get('/posters/2/2')
+        assert (response.status_code, response.location) == \
+               (302, 'http://169.254.169.254/latest/meta-data')
+        assert server.requests == 1
+
+
+def test_poster_widths_need_pillow(tmp_path, monkeypatch):
+    """
+    Test thumbnails are only made by default with Pillow,
+    and asking for them without Pillow fails at startup
+    """
+    monkeypatch.setattr('movieflix.posters.cache.Image', None)
+    poster_cache = create_test_app(tmp_path).extensions['poster_cache']
+    assert poster_cache._widths == ()  # pylint: disable=protected-access
+    with pytest.raises(ValueError):
+        create_test_app(tmp_path, POSTER_WIDTHS=[128])
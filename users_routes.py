@@ -8,27 +8,27 @@ routes
 
 from flask import Blueprint, render_template, request, redirect, url_for, abort
 
-from movieflix.data_manager.json_data_manager import JSONDataManager
-from movieflix.data_manager.users import Users
+from movieflix.data_backend import users_data_manager, users_generation
+from movieflix.http_cache import conditional
+from movieflix.paging import get_page_args, render_page
 
 users_bp = Blueprint('users', __name__)
 
-FILEPATH = 'data/movies.json'
-users_data_manager = Users(JSONDataManager(FILEPATH, 'user_id'))
-
 
 @users_bp.route('/users', methods=['GET'])
+@conditional(users_generation)
 def list_users():
     """
-    Get a list of all users
+    Get a page of the list of users,
+    ?limit=&offset= or ?limit=&after=<user_id>
     :return:
-        - Response object containing a list of users
+        - Response object containing a page of users
         - Bad request error message
     """
-    users = users_data_manager.get_all_users()
-    if users is None:
+    page = users_data_manager.get_users_page(**get_page_args())
+    if page is None:
         abort(404)
-    return render_template('users.html', users=users)
+    return render_page('users.html', page, users=page['items'])
 
 
 def validate_user_input(user_info: dict) -> list: